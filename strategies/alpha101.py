@@ -7,10 +7,11 @@ from pandas import DataFrame
 import numpy as np
 
 # 引入 Alpha 因子函数
-from ..utils.alpha_operators import (
+from utils.alpha_operators import (
     alpha_001, alpha_006, alpha_012, alpha_021, alpha_033,
     alpha_041, alpha_053, alpha_054, alpha_085, alpha_101
 )
+from utils.rolling_rank import rolling_rank
 
 
 class Alpha101Strategy(IStrategy):
@@ -65,9 +66,10 @@ class Alpha101Strategy(IStrategy):
         dataframe['alpha_101'] = alpha_101(close, open_, high, low)
 
         # 各因子标准化为排名百分位
-        for name in self.factor_weights:
-            col = dataframe[name]
-            dataframe[f'{name}_rank'] = col.rolling(120).rank(pct=True)
+        names = list(self.factor_weights)
+        ranks = rolling_rank(dataframe[names], 120)
+        for name in names:
+            dataframe[f'{name}_rank'] = ranks[name]
 
         # 加权综合得分
         dataframe['composite_score'] = sum(
@@ -76,7 +78,7 @@ class Alpha101Strategy(IStrategy):
         )
 
         # 综合得分的排名
-        dataframe['score_percentile'] = dataframe['composite_score'].rolling(60).rank(pct=True)
+        dataframe['score_percentile'] = rolling_rank(dataframe['composite_score'], 60)
 
         return dataframe
 
@@ -4,9 +4,10 @@
 
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from pandas import DataFrame
-import talib.abstract as ta
 import numpy as np
 
+from utils.indicator_cache import shared_indicator
+
 
 class BollingerMeanRevert(IStrategy):
     """
@@ -36,32 +37,41 @@ class BollingerMeanRevert(IStrategy):
     trailing_only_offset_is_reached = True
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # 布林带
-        bb = ta.BBANDS(dataframe, timeperiod=self.bb_period.value,
-                       nbdevup=self.bb_std.value, nbdevdn=self.bb_std.value)
-        dataframe['bb_upper'] = bb['upperband']
-        dataframe['bb_middle'] = bb['middleband']
-        dataframe['bb_lower'] = bb['lowerband']
-
-        # Z-score：标准化的偏离程度
-        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
-        rolling_mean = dataframe['close'].rolling(self.bb_period.value).mean()
-        rolling_std = dataframe['close'].rolling(self.bb_period.value).std()
-        dataframe['zscore'] = (dataframe['close'] - rolling_mean) / rolling_std
+        # 布林带和 Z-score 依赖可优化参数，放到 _add_band_columns 里按参数值取缓存
 
         # 趋势过滤
-        dataframe['ema_200'] = ta.EMA(dataframe, timeperiod=200)
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
+        dataframe['ema_200'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=200)
+        dataframe['adx'] = shared_indicator(dataframe, metadata, self.timeframe, 'adx_talib', period=14)
 
         # 成交量确认
         dataframe['volume_sma'] = dataframe['volume'].rolling(20).mean()
 
         # RSI 辅助确认
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
 
         return dataframe
 
+    def _add_band_columns(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """
+        布林带 / Z-score 按当前 bb_period、bb_std 从指标登记表取
+
+        放在 populate_entry/exit_trend 里调用，hyperopt 每个 epoch 换参数都能生效，
+        同一参数值在后续 epoch 里直接复用（设置 FT_INDICATOR_CACHE 时其他 worker 也能复用）
+        """
+        for band, column in (('upperband', 'bb_upper'), ('middleband', 'bb_middle'),
+                             ('lowerband', 'bb_lower')):
+            dataframe[column] = shared_indicator(dataframe, metadata, self.timeframe, 'bbands_band',
+                                                 period=self.bb_period.value,
+                                                 std=float(self.bb_std.value), band=band)
+        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_middle']
+
+        # Z-score：标准化的偏离程度
+        dataframe['zscore'] = shared_indicator(dataframe, metadata, self.timeframe, 'rolling_zscore',
+                                               period=self.bb_period.value)
+        return dataframe
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._add_band_columns(dataframe, metadata)
         dataframe.loc[
             (
                 (dataframe['zscore'] < self.zscore_entry.value) &
@@ -76,6 +86,7 @@ class BollingerMeanRevert(IStrategy):
         return dataframe
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._add_band_columns(dataframe, metadata)
         dataframe.loc[
             (
                 (dataframe['zscore'] > self.zscore_exit.value) |
@@ -5,6 +5,8 @@
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
+from utils.indicator_cache import shared_indicator
+from utils.swing_utils import swing_points
 
 
 class BrooksPriceActionStrategy(IStrategy):
@@ -50,7 +52,7 @@ class BrooksPriceActionStrategy(IStrategy):
         )
 
         # 市场状态判断
-        dataframe['ema_20'] = dataframe['close'].ewm(span=20).mean()
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=20)
         dataframe['ema_slope'] = dataframe['ema_20'].diff(5) / dataframe['ema_20'].shift(5)
 
         # 连续同向 K 线计数
@@ -95,12 +97,8 @@ class BrooksPriceActionStrategy(IStrategy):
         ).astype(int)
 
         # 楔形检测（简化）
-        dataframe['is_swing_low'] = (
-            (dataframe['low'] < dataframe['low'].shift(1)) &
-            (dataframe['low'] < dataframe['low'].shift(-1)) &
-            (dataframe['low'] < dataframe['low'].shift(2)) &
-            (dataframe['low'] < dataframe['low'].shift(-2))
-        ).astype(int)
+        swings = swing_points(dataframe['high'], dataframe['low'], left=2)
+        dataframe['is_swing_low'] = swings['swing_low'].notna().astype(int)
 
         dataframe['swing_low_count'] = dataframe['is_swing_low'].rolling(30).sum()
         dataframe['price_declining'] = (dataframe['low'] < dataframe['low'].rolling(30).mean()).astype(int)
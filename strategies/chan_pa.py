@@ -1,43 +1,12 @@
 # -*- coding: utf-8 -*-
 # Source: day19.md - ChanPriceActionStrategy
 # Freqtrade 21 天从入门到精通
-# 注意：此策略需要缠论工具函数，实际使用需先实现 chan_utils 模块
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
-
-
-# 缠论工具函数占位符 - 实际使用需要实现这些函数
-# 可以参考 day19.md 中的完整实现
-def merge_bars(dataframe):
-    """K 线包含处理"""
-    raise NotImplementedError("需要实现缠论 K 线包含处理函数")
-
-def find_fractals(merged_bars):
-    """识别分型"""
-    raise NotImplementedError("需要实现缠论分型识别函数")
-
-def construct_bis(fractals, min_bars=4):
-    """构建笔"""
-    raise NotImplementedError("需要实现缠论笔构建函数")
-
-def find_zhongshu(bis):
-    """识别中枢"""
-    raise NotImplementedError("需要实现缠论中枢识别函数")
-
-def find_chan_signals(bis, zhongshus):
-    """识别缠论买卖点"""
-    raise NotImplementedError("需要实现缠论买卖点识别函数")
-
-def detect_chan_divergence(bis, dataframe):
-    """检测背驰"""
-    raise NotImplementedError("需要实现缠论背驰检测函数")
-
-
-class Direction:
-    UP = 1
-    DOWN = -1
+from utils.chan_utils import ChanEngine, Direction, paint_zhongshu, signal_flags
+from utils.indicator_cache import shared_indicator
 
 
 class ChanPriceActionStrategy(IStrategy):
@@ -49,7 +18,8 @@ class ChanPriceActionStrategy(IStrategy):
     2. 价格行为确认入场时机（反转 K 线、订单块）
     3. 背驰信号作为趋势衰竭的预警
 
-    注意：此策略需要实现缠论工具函数才能正常运行
+    缠论结构（包含处理、分型、笔、中枢、买卖点）由 ChanEngine 逐根流式计算，
+    每个交易对保留一个引擎，实盘每次只处理新增的 K 线
     """
 
     INTERFACE_VERSION = 3
@@ -64,61 +34,35 @@ class ChanPriceActionStrategy(IStrategy):
     min_bi_bars = 4
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # 缠论分析（需要实现工具函数）
-        try:
-            merged = merge_bars(dataframe)
-            fractals = find_fractals(merged)
-            bis = construct_bis(fractals, min_bars=self.min_bi_bars)
-            zhongshus = find_zhongshu(bis)
-        except NotImplementedError:
-            # 工具函数未实现时，使用简单替代方案
-            zhongshus = []
-            bis = []
-
-        # 标记中枢区间
-        dataframe['zs_high'] = np.nan
-        dataframe['zs_low'] = np.nan
-
-        for zs in zhongshus:
-            start = max(0, zs.start_index)
-            end = min(len(dataframe) - 1, zs.end_index)
-            dataframe.loc[start:end, 'zs_high'] = zs.high
-            dataframe.loc[start:end, 'zs_low'] = zs.low
-
-        dataframe['zs_high'] = dataframe['zs_high'].ffill()
-        dataframe['zs_low'] = dataframe['zs_low'].ffill()
+        # 缠论结构：每个交易对一个流式引擎，只追加新 K 线；窗口之前的中枢 / 信号随之丢弃，
+        # 下面逐根列的开销只和窗口长度有关。引擎有状态：回测传入完整 dataframe 时重置后全量处理，
+        # 实盘沿滑动窗口续算
+        engines = getattr(self, '_chan_engines', None)
+        if engines is None:
+            engines = self._chan_engines = {}
+        engine = engines.get(metadata['pair'])
+        if engine is None:
+            engine = engines[metadata['pair']] = ChanEngine(min_bars=self.min_bi_bars, macd=(12, 26, 9))
+        offset = engine.update_frame(dataframe)
+        n = len(dataframe)
+
+        # MACD（背驰力度用 MACD 柱面积）由引擎逐根续算：每根 K 线的值与窗口起点无关，
+        # 实盘和回测在同一根 K 线上看到的 MACD 一致
+        dataframe['macd'], dataframe['macd_signal'], dataframe['macd_hist'] = engine.macd_columns(n, offset)
+
+        # 中枢区间：从中枢成立的 K 线起生效，直到下一个中枢成立
+        dataframe['zs_high'], dataframe['zs_low'] = paint_zhongshu(engine.zhongshus, n, offset)
 
         # 价格相对中枢的位置
         zs_range = dataframe['zs_high'] - dataframe['zs_low']
         zs_range = zs_range.replace(0, 1e-8)
         dataframe['zs_position'] = (dataframe['close'] - dataframe['zs_low']) / zs_range
 
-        # 缠论买卖点
-        try:
-            chan_signals = find_chan_signals(bis, zhongshus)
-        except NotImplementedError:
-            chan_signals = []
-
-        dataframe['chan_buy1'] = 0
-        dataframe['chan_buy3'] = 0
-
-        for sig in chan_signals:
-            if sig.index < len(dataframe):
-                if sig.type_ == 'buy1':
-                    dataframe.loc[sig.index, 'chan_buy1'] = 1
-                elif sig.type_ == 'buy3':
-                    dataframe.loc[sig.index, 'chan_buy3'] = 1
-
-        # 背驰检测
-        try:
-            divergences = detect_chan_divergence(bis, dataframe)
-        except NotImplementedError:
-            divergences = []
-
-        dataframe['chan_divergence'] = 0
-        for div in divergences:
-            if div['index'] < len(dataframe) and div['direction'] == Direction.DOWN:
-                dataframe.loc[div['index'], 'chan_divergence'] = 1
+        # 缠论买卖点与背驰（标记在确认它们的 K 线上）
+        dataframe['chan_buy1'] = signal_flags(engine.signals, 'buy1', n, offset)
+        dataframe['chan_buy3'] = signal_flags(engine.signals, 'buy3', n, offset)
+        dataframe['chan_divergence'] = signal_flags(engine.signals, 'divergence', n, offset,
+                                                    direction=Direction.DOWN)
 
         # 价格行为指标
         range_ = (dataframe['high'] - dataframe['low']).replace(0, 1e-8)
@@ -138,14 +82,7 @@ class ChanPriceActionStrategy(IStrategy):
             (dataframe['close'] > dataframe['open'])
         ).astype(int)
 
-        # MACD 辅助
-        ema12 = dataframe['close'].ewm(span=12).mean()
-        ema26 = dataframe['close'].ewm(span=26).mean()
-        dataframe['macd'] = ema12 - ema26
-        dataframe['macd_signal'] = dataframe['macd'].ewm(span=9).mean()
-        dataframe['macd_hist'] = dataframe['macd'] - dataframe['macd_signal']
-
-        dataframe['ema_20'] = dataframe['close'].ewm(span=20).mean()
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=20)
 
         return dataframe
 
@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+# Source: day14.md - CompositeStrategy
+# Freqtrade 21 天从入门到精通
+
+import inspect
+
+from freqtrade.strategy import IStrategy
+from pandas import DataFrame
+import pandas as pd
+
+from utils.data_quality import timeframe_to_minutes
+from utils.ohlcv_utils import resample_ohlcv
+from utils.signal_utils import compose_tags
+
+
+# 子策略共用、不做命名空间的原始 K 线列
+BASE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+
+class CompositeStrategy(IStrategy):
+    """
+    组合策略基类：在同一个 dataframe 上运行现成的子策略类，按权重投票
+
+    - 子策略原样调用自己的 populate_indicators / populate_entry_trend / populate_exit_trend，
+      新增的列以 '{标签}__{列名}' 存回共享 dataframe，互不覆盖（子策略里都叫 'adx'、'ema_200'）
+    - 子策略保留自己的 timeframe：与组合策略相同的直接跑在共享 dataframe 上，
+      它们经 shared_indicator 计算的公共指标（ADX、EMA 200 等）在指标登记表里
+      同名同参数同 K 线，只算一次；组合的开销接近各子策略指标的并集，而不是总和
+    - 周期更长的子策略（如 1h 组合里的 4h 策略）跑在由组合 K 线合成的该周期 K 线上
+      （丢弃未走完的桶），结果按 merge_informative_pair 的口径并回：高周期 K 线的值
+      落在它收盘时的那根组合 K 线上，指标列向后填充，enter_* / exit_* 列只出现在那一根上，
+      不引入未来数据。startup_candle_count 要按组合周期覆盖子策略在高周期上的预热长度
+    - 子策略的参数（IntParameter / DecimalParameter 等）按 freqtrade 的规则加载：
+      子策略文件旁的 <文件名>.json 优先，其次 buy_params / sell_params，最后是默认值；
+      组合策略 hyperopt 时子策略参数保持不变
+    - 入场：最近 vote_window 根 K 线内给出 enter_long 的子策略各投一票，
+      票的加权和 meta_score >= signal_threshold，且当根至少有一个子策略触发；
+      enter_tag 标出投票的子策略（meta_MR_BO 之类）
+    - 离场：按 exit_vote_window 投票，meta_exit_score >= exit_threshold 且当根有子策略触发
+
+    子类实现 sub_strategies()，返回 [(标签, 策略类, 权重), ...]
+    """
+
+    INTERFACE_VERSION = 3
+
+    signal_threshold: float = 0.5
+    exit_threshold: float = 0.5
+    # 投票窗口：子策略的信号在之后 vote_window 根 K 线内都算一票（1 = 只看同一根 K 线）。
+    # 不同类型的子策略很少在同一根 K 线上同时触发，窗口投票看的是"最近是否都认同"
+    vote_window: int = 1
+    # 离场票的窗口：子策略的离场条件多是状态（如 zscore 回到均值以上），通常只看当根
+    exit_vote_window: int = 1
+    tag_prefix: str = 'meta_'
+
+    def sub_strategies(self) -> list:
+        """子类实现：[(标签, 策略类, 权重), ...]"""
+        return []
+
+    def _children(self) -> dict:
+        """按标签缓存子策略实例（每个组合策略实例各一份）"""
+        children = getattr(self, '_child_strategies', None)
+        if children is None:
+            children = self._child_strategies = {}
+        for label, strategy_cls, _ in self.sub_strategies():
+            if label not in children:
+                child = strategy_cls(self.config)
+                # freqtrade 只给按路径加载的组合策略设置 __file__ 并加载参数，子策略在这里补上
+                child.__file__ = inspect.getfile(strategy_cls)
+                child._ft_params_from_file = child.load_params_from_file().get('params', {})
+                child.ft_load_hyper_params(False)
+                children[label] = child
+            if getattr(self, 'dp', None) is not None:
+                children[label].dp = self.dp
+        return children
+
+    @staticmethod
+    def _child_view(dataframe: DataFrame, label: str) -> DataFrame:
+        """子策略看到的 dataframe：原始 K 线列 + 去掉前缀的自有列"""
+        prefix = f'{label}__'
+        base = [col for col in BASE_COLUMNS if col in dataframe.columns]
+        own = [col for col in dataframe.columns if isinstance(col, str) and col.startswith(prefix)]
+        view = dataframe[base + own]
+        view.columns = base + [col[len(prefix):] for col in own]
+        return view
+
+    def _informative_view(self, dataframe: DataFrame, metadata: dict, label: str,
+                          child: IStrategy, method: str) -> DataFrame:
+        """高周期子策略看到的 dataframe：populate_indicators 时由组合 K 线合成，之后沿用上一步的结果"""
+        frames = getattr(self, '_child_frames', None)
+        if frames is None:
+            frames = self._child_frames = {}
+        key = (metadata['pair'], label)
+        if method == 'populate_indicators' or key not in frames:
+            base = dataframe[[col for col in BASE_COLUMNS if col in dataframe.columns]]
+            frames[key] = resample_ohlcv(base, child.timeframe, drop_incomplete=True,
+                                         source_minutes=timeframe_to_minutes(self.timeframe))
+        return frames[key]
+
+    def _merge_informative(self, dataframe: DataFrame, informative: DataFrame,
+                           timeframe: str, columns: list) -> DataFrame:
+        """把高周期列并回组合 K 线：值落在高周期 K 线收盘时的那根组合 K 线上"""
+        shift = pd.Timedelta(minutes=timeframe_to_minutes(timeframe) - timeframe_to_minutes(self.timeframe))
+        merged = informative[columns].set_axis(informative['date'] + shift).reindex(dataframe['date'])
+        merged.index = dataframe.index
+        states = [col for col in columns if not col.startswith(('enter_', 'exit_'))]
+        merged[states] = merged[states].ffill()
+        return merged
+
+    def _run_children(self, dataframe: DataFrame, metadata: dict, method: str,
+                      signals=()) -> DataFrame:
+        """逐个子策略调用 method，把新增列（及 signals 列）加前缀后一次性并回 dataframe"""
+        new = {}
+        for label, child in self._children().items():
+            retimed = child.timeframe != self.timeframe
+            if retimed:
+                view = self._informative_view(dataframe, metadata, label, child, method)
+            else:
+                view = self._child_view(dataframe, label)
+            before = set(view.columns)
+            view = getattr(child, method)(view, metadata)
+            columns = [col for col in view.columns if col not in before or col in signals]
+            if retimed:
+                self._child_frames[(metadata['pair'], label)] = view
+                view = self._merge_informative(dataframe, view, child.timeframe, columns)
+            for col in columns:
+                new[f'{label}__{col}'] = view[col]
+            # 子策略这一轮没有触发过信号时不会有该列
+            for col in signals:
+                new.setdefault(f'{label}__{col}', 0)
+        if not new:
+            return dataframe
+        added = pd.DataFrame(new, index=dataframe.index)
+        return pd.concat([dataframe.drop(columns=[col for col in new if col in dataframe.columns]),
+                          added], axis=1)
+
+    def _votes(self, dataframe: DataFrame, signal: str, window: int) -> dict:
+        """各子策略的票：最近 window 根 K 线内 signal 列出现过 1"""
+        votes = {}
+        for label, _, _ in self.sub_strategies():
+            fired = (dataframe[f'{label}__{signal}'] == 1).astype(float)
+            votes[label] = fired.rolling(window, min_periods=1).max()
+        return votes
+
+    def _vote(self, dataframe: DataFrame, votes: dict) -> pd.Series:
+        """票的加权和"""
+        score = pd.Series(0.0, index=dataframe.index)
+        for label, _, weight in self.sub_strategies():
+            score += weight * votes[label]
+        return score
+
+    def _fired(self, dataframe: DataFrame, signal: str) -> pd.Series:
+        """当根 K 线上至少一个子策略给出 signal"""
+        return pd.concat([dataframe[f'{label}__{signal}'] == 1
+                          for label, _, _ in self.sub_strategies()], axis=1).any(axis=1)
+
+    @staticmethod
+    def _signal_tags(votes: dict, prefix: str) -> pd.Series:
+        return compose_tags(pd.DataFrame(votes), {label: label for label in votes}, prefix=prefix)
+
+    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        return self._run_children(dataframe, metadata, 'populate_indicators')
+
+    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._run_children(dataframe, metadata, 'populate_entry_trend',
+                                       signals=('enter_long',))
+        votes = self._votes(dataframe, 'enter_long', self.vote_window)
+        dataframe['meta_score'] = self._vote(dataframe, votes)
+        entry = (
+            (dataframe['meta_score'] >= self.signal_threshold) &
+            self._fired(dataframe, 'enter_long') &
+            (dataframe['volume'] > 0)
+        )
+        dataframe.loc[entry, 'enter_long'] = 1
+        tags = self._signal_tags(votes, self.tag_prefix)
+        dataframe.loc[entry, 'enter_tag'] = tags[entry]
+        return dataframe
+
+    def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._run_children(dataframe, metadata, 'populate_exit_trend',
+                                       signals=('exit_long',))
+        votes = self._votes(dataframe, 'exit_long', self.exit_vote_window)
+        dataframe['meta_exit_score'] = self._vote(dataframe, votes)
+        exit_ = (dataframe['meta_exit_score'] >= self.exit_threshold) & self._fired(dataframe, 'exit_long')
+        dataframe.loc[exit_, 'exit_long'] = 1
+        tags = self._signal_tags(votes, f'{self.tag_prefix}exit_')
+        dataframe.loc[exit_, 'exit_tag'] = tags[exit_]
+        return dataframe
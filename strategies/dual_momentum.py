@@ -5,7 +5,8 @@
 from freqtrade.strategy import IStrategy, IntParameter
 from pandas import DataFrame
 import numpy as np
-import talib.abstract as ta
+
+from utils.indicator_cache import shared_indicator
 
 
 class DualMomentumStrategy(IStrategy):
@@ -45,11 +46,11 @@ class DualMomentumStrategy(IStrategy):
         dataframe['risk_adj_momentum'] = dataframe['momentum'] / (vol * np.sqrt(period))
 
         # 趋势强度
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
+        dataframe['adx'] = shared_indicator(dataframe, metadata, self.timeframe, 'adx_talib', period=14)
 
         # 均线系统
-        dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=20)
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=50)
 
         # 成交量动量
         dataframe['volume_momentum'] = (
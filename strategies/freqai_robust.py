@@ -7,6 +7,8 @@ from pandas import DataFrame
 import numpy as np
 import talib.abstract as ta
 
+from utils.indicator_cache import shared_indicator
+
 
 class FreqAIRobustStrategy(IStrategy):
     """
@@ -60,9 +62,9 @@ class FreqAIRobustStrategy(IStrategy):
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         dataframe = self.freqai.start(dataframe, metadata, self)
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
-        dataframe['ema_200'] = ta.EMA(dataframe, timeperiod=200)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=50)
+        dataframe['ema_200'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=200)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -4,7 +4,8 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from utils.indicator_cache import shared_indicator
 
 
 class FundingRateStrategy(IStrategy):
@@ -28,8 +29,8 @@ class FundingRateStrategy(IStrategy):
                 pass
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=20)
 
         dataframe['extreme_bullish'] = (dataframe['rsi'] > 80).astype(int)
         dataframe['extreme_bearish'] = (dataframe['rsi'] < 20).astype(int)
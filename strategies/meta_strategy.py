@@ -2,20 +2,26 @@
 # Source: day14.md - MetaStrategy
 # Freqtrade 21 天从入门到精通
 
-from freqtrade.strategy import IStrategy
-from pandas import DataFrame
-import numpy as np
-import pandas as pd
+from composite_base import CompositeStrategy
+from bollinger_mean_revert import BollingerMeanRevert
+from modern_turtle import ModernTurtleStrategy
+from volatility_breakout import VolatilityBreakoutStrategy
 
 
-class MetaStrategy(IStrategy):
+class MetaStrategy(CompositeStrategy):
     """
     元策略：组合多个子策略的信号
 
     思路：
-    - 每个子策略独立产生信号和置信度
-    - 元策略根据权重加权投票
-    - 超过阈值才开仓
+    - 子策略直接用现成的策略类（布林带均值回归 / 海龟趋势 / 波动率突破），
+      同周期的公共指标只算一次（见 CompositeStrategy）
+    - 元策略根据权重加权投票：最近 48 根 K 线内给过入场信号的子策略各投一票，
+      至少两个子策略认同（0.3 + 0.35 >= 0.5）且当根有子策略触发才开仓；
+      离场要求至少两个子策略在最近 4 根 K 线（一根 4h K 线）内给出离场信号
+
+    ModernTurtleStrategy / VolatilityBreakoutStrategy 是 4h 策略，跑在由 1h 合成的 4h K 线上，
+    信号在 4h K 线收盘的那根 1h K 线上计票，与单独运行时同一根 4h K 线的信号一致；
+    它们的 EMA 200 在 4h 上预热，需要约 800 根 1h K 线
     """
 
     INTERFACE_VERSION = 3
@@ -23,6 +29,8 @@ class MetaStrategy(IStrategy):
     minimal_roi = {"0": 0.05, "30": 0.03, "60": 0.01}
     stoploss = -0.05
     timeframe = '1h'
+    # 4h 子策略的 EMA 200 按 1h 根数预热
+    startup_candle_count = 800
 
     # 子策略权重（可通过 hyperopt 优化）
     weight_mean_reversion = 0.3
@@ -31,98 +39,15 @@ class MetaStrategy(IStrategy):
 
     # 信号阈值
     signal_threshold = 0.5
-
-    def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # === 均值回归指标 ===
-        dataframe['bb_mid'] = dataframe['close'].rolling(20).mean()
-        dataframe['bb_std'] = dataframe['close'].rolling(20).std()
-        dataframe['bb_lower'] = dataframe['bb_mid'] - 2 * dataframe['bb_std']
-        dataframe['bb_upper'] = dataframe['bb_mid'] + 2 * dataframe['bb_std']
-        dataframe['bb_width'] = (dataframe['bb_upper'] - dataframe['bb_lower']) / dataframe['bb_mid']
-        dataframe['zscore'] = (dataframe['close'] - dataframe['bb_mid']) / dataframe['bb_std']
-
-        # === 趋势跟随指标 ===
-        dataframe['ema_fast'] = dataframe['close'].ewm(span=12).mean()
-        dataframe['ema_slow'] = dataframe['close'].ewm(span=26).mean()
-        dataframe['macd'] = dataframe['ema_fast'] - dataframe['ema_slow']
-        dataframe['macd_signal'] = dataframe['macd'].ewm(span=9).mean()
-
-        # ADX
-        high = dataframe['high']
-        low = dataframe['low']
-        close = dataframe['close']
-        tr = np.maximum(high - low, np.maximum(abs(high - close.shift(1)), abs(low - close.shift(1))))
-        dataframe['atr_14'] = tr.rolling(14).mean()
-
-        plus_dm = np.where((high - high.shift(1)) > (low.shift(1) - low),
-                           np.maximum(high - high.shift(1), 0), 0)
-        minus_dm = np.where((low.shift(1) - low) > (high - high.shift(1)),
-                            np.maximum(low.shift(1) - low, 0), 0)
-
-        plus_di = 100 * pd.Series(plus_dm).rolling(14).mean() / dataframe['atr_14']
-        minus_di = 100 * pd.Series(minus_dm).rolling(14).mean() / dataframe['atr_14']
-        dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-        dataframe['adx'] = dx.rolling(14).mean()
-
-        # === 突破指标 ===
-        dataframe['dc_upper'] = dataframe['high'].rolling(20).max()
-        dataframe['dc_lower'] = dataframe['low'].rolling(20).min()
-        dataframe['dc_mid'] = (dataframe['dc_upper'] + dataframe['dc_lower']) / 2
-
-        dataframe['atr_ratio'] = dataframe['atr_14'] / dataframe['atr_14'].rolling(50).mean()
-
-        # === 子策略信号 ===
-        dataframe['signal_mr'] = (
-            (dataframe['zscore'] < -2) &
-            (dataframe['atr_ratio'] < 1.2)
-        ).astype(float)
-
-        dataframe['signal_trend'] = (
-            (dataframe['macd'] > dataframe['macd_signal']) &
-            (dataframe['macd'].shift(1) <= dataframe['macd_signal'].shift(1)) &
-            (dataframe['adx'] > 25)
-        ).astype(float)
-
-        dataframe['signal_breakout'] = (
-            (dataframe['close'] > dataframe['dc_upper'].shift(1)) &
-            (dataframe['atr_ratio'] > 1.3)
-        ).astype(float)
-
-        # 加权综合得分
-        dataframe['meta_score'] = (
-            self.weight_mean_reversion * dataframe['signal_mr'] +
-            self.weight_trend * dataframe['signal_trend'] +
-            self.weight_breakout * dataframe['signal_breakout']
-        )
-
-        return dataframe
-
-    def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe.loc[
-            (
-                (dataframe['meta_score'] >= self.signal_threshold) &
-                (dataframe['volume'] > 0)
-            ),
-            ['enter_long', 'enter_tag']
-        ] = (1, 'meta_signal')
-
-        # 标记信号来源
-        for idx in dataframe.index[dataframe['enter_long'] == 1]:
-            sources = []
-            if dataframe.loc[idx, 'signal_mr'] > 0:
-                sources.append('MR')
-            if dataframe.loc[idx, 'signal_trend'] > 0:
-                sources.append('TF')
-            if dataframe.loc[idx, 'signal_breakout'] > 0:
-                sources.append('BO')
-            dataframe.loc[idx, 'enter_tag'] = f"meta_{'_'.join(sources)}"
-
-        return dataframe
-
-    def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe.loc[
-            (dataframe['zscore'] > 2) |
-            ((dataframe['macd'] < dataframe['macd_signal']) & (dataframe['adx'] > 20)),
-            'exit_long'
-        ] = 1
-        return dataframe
+    exit_threshold = 0.5
+    # 均值回归与趋势 / 突破很少在同一根 K 线上同时触发，按两天的窗口计票
+    vote_window = 48
+    # 4h 子策略的离场信号只落在 4h 收盘的那根 1h K 线上，按一根 4h K 线的跨度计票
+    exit_vote_window = 4
+
+    def sub_strategies(self) -> list:
+        return [
+            ('MR', BollingerMeanRevert, self.weight_mean_reversion),
+            ('TF', ModernTurtleStrategy, self.weight_trend),
+            ('BO', VolatilityBreakoutStrategy, self.weight_breakout),
+        ]
@@ -6,6 +6,8 @@ from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from pandas import DataFrame
 import talib.abstract as ta
 
+from utils.indicator_cache import shared_indicator
+
 
 class ModernTurtleStrategy(IStrategy):
     """
@@ -34,32 +36,42 @@ class ModernTurtleStrategy(IStrategy):
     minimal_roi = {"0": 0.30, "480": 0.15, "1440": 0.05}
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # Donchian 通道
-        dataframe['dc_upper'] = dataframe['high'].rolling(self.entry_period.value).max()
-        dataframe['dc_lower'] = dataframe['low'].rolling(self.entry_period.value).min()
-        dataframe['dc_mid'] = (dataframe['dc_upper'] + dataframe['dc_lower']) / 2
-
-        # 退出通道
-        dataframe['dc_exit_lower'] = dataframe['low'].rolling(self.exit_period.value).min()
-
-        # ATR
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=self.atr_period.value)
-        dataframe['atr_pct'] = dataframe['atr'] / dataframe['close']
-        dataframe['atr_sma'] = dataframe['atr'].rolling(50).mean()
+        # Donchian 通道和 ATR 依赖可优化参数，在 populate_entry/exit_trend 里按参数值取缓存
 
         # 趋势强度
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
+        dataframe['adx'] = shared_indicator(dataframe, metadata, self.timeframe, 'adx_talib', period=14)
 
         # 趋势方向确认
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
-        dataframe['ema_200'] = ta.EMA(dataframe, timeperiod=200)
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=50)
+        dataframe['ema_200'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=200)
 
         # 动量确认
         dataframe['roc'] = ta.ROC(dataframe, timeperiod=20)
 
         return dataframe
 
+    def _add_channel_columns(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """Donchian 通道 / ATR 按当前参数值从指标登记表取（hyperopt 换参数时不重算已有的值）"""
+        # Donchian 通道
+        dataframe['dc_upper'] = shared_indicator(dataframe, metadata, self.timeframe, 'donchian_upper',
+                                                 period=self.entry_period.value)
+        dataframe['dc_lower'] = shared_indicator(dataframe, metadata, self.timeframe, 'donchian_lower',
+                                                 period=self.entry_period.value)
+        dataframe['dc_mid'] = (dataframe['dc_upper'] + dataframe['dc_lower']) / 2
+
+        # 退出通道
+        dataframe['dc_exit_lower'] = shared_indicator(dataframe, metadata, self.timeframe,
+                                                      'donchian_lower', period=self.exit_period.value)
+
+        # ATR（custom_stoploss / custom_stake_amount 从分析后的 dataframe 读 'atr'）
+        dataframe['atr'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_talib',
+                                            period=self.atr_period.value)
+        dataframe['atr_pct'] = dataframe['atr'] / dataframe['close']
+        dataframe['atr_sma'] = dataframe['atr'].rolling(50).mean()
+        return dataframe
+
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._add_channel_columns(dataframe, metadata)
         dataframe.loc[
             (
                 (dataframe['close'] > dataframe['dc_upper'].shift(1)) &
@@ -75,6 +87,7 @@ class ModernTurtleStrategy(IStrategy):
         return dataframe
 
     def populate_exit_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        dataframe = self._add_channel_columns(dataframe, metadata)
         dataframe.loc[
             (
                 (dataframe['close'] < dataframe['dc_exit_lower'].shift(1))
@@ -5,7 +5,8 @@
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from pandas import DataFrame
 import pandas as pd
-import talib.abstract as ta
+
+from utils.indicator_cache import shared_indicator
 
 
 class MultiFactorStrategy(IStrategy):
@@ -90,11 +91,11 @@ class MultiFactorStrategy(IStrategy):
         self.top_pairs = score_df.nlargest(self.top_n.value, 'composite').index.tolist()
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
-        dataframe['ema_20'] = ta.EMA(dataframe, timeperiod=20)
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=20)
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=50)
+        dataframe['adx'] = shared_indicator(dataframe, metadata, self.timeframe, 'adx_talib', period=14)
+        dataframe['atr'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_talib', period=14)
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
@@ -5,6 +5,8 @@
 from freqtrade.strategy import IStrategy, DecimalParameter, IntParameter
 from pandas import DataFrame
 
+from utils.indicator_cache import shared_indicator
+
 
 class OptimizableStrategy(IStrategy):
     """
@@ -40,22 +42,20 @@ class OptimizableStrategy(IStrategy):
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # RSI
-        delta = dataframe['close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        dataframe['rsi'] = 100 - (100 / (1 + rs))
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_sma', period=14)
 
-        # 动态 EMA
-        for period in range(5, 61):
-            dataframe[f'ema_{period}'] = dataframe['close'].ewm(span=period).mean()
+        # EMA 周期是可优化参数，不在这里预先算 56 条，见 populate_entry_trend
 
         dataframe['vol_ma'] = dataframe['volume'].rolling(20).mean()
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        ema_short = dataframe[f'ema_{self.buy_ema_short.value}']
-        ema_long = dataframe[f'ema_{self.buy_ema_long.value}']
+        # 只算本轮参数用到的两条 EMA；同一周期在后续 epoch 直接命中登记表
+        # （设置 FT_INDICATOR_CACHE 时其他 worker 也能从磁盘命中）
+        ema_short = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm',
+                                     period=self.buy_ema_short.value)
+        ema_long = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm',
+                                    period=self.buy_ema_long.value)
 
         dataframe.loc[
             (
@@ -8,6 +8,10 @@ from abc import abstractmethod
 import numpy as np
 import logging
 
+from utils.indicator_cache import shared_indicator
+from utils.incremental_indicators import CommonIndicatorEngine
+from utils.rolling_rank import rolling_rank
+
 logger = logging.getLogger(__name__)
 
 
@@ -30,12 +34,21 @@ class ResearchStrategy(IStrategy):
     # 通用风控参数
     max_drawdown_pct: float = 0.15
 
+    # 增量模式：通用指标按交易对保存可续算状态，每次只算新增的 K 线（实盘 / dry-run 受益，
+    # 回测每个交易对只调用一次，结果与全量相同）
+    incremental_indicators: bool = False
+    # 增量结果逐列与全量重算比对，不一致时记日志并改用全量结果（排查用，会抵消增量的收益）
+    verify_incremental: bool = False
+
     def informative_pairs(self):
         """子类可覆盖"""
         return []
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        dataframe = self._add_common_indicators(dataframe)
+        if self.incremental_indicators:
+            dataframe = self._add_common_indicators_incremental(dataframe, metadata)
+        else:
+            dataframe = self._add_common_indicators(dataframe, metadata)
         dataframe = self.add_strategy_indicators(dataframe, metadata)
         return dataframe
 
@@ -44,25 +57,23 @@ class ResearchStrategy(IStrategy):
         """子类实现：添加策略特有指标"""
         pass
 
-    def _add_common_indicators(self, dataframe: DataFrame) -> DataFrame:
-        """所有策略共享的基础指标"""
+    def _add_common_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """所有策略共享的基础指标（EMA / ATR 走跨策略指标登记表）"""
         high = dataframe['high']
         low = dataframe['low']
         close = dataframe['close']
 
-        # ATR
-        tr = np.maximum(high - low,
-                        np.maximum(abs(high - close.shift(1)),
-                                   abs(low - close.shift(1))))
-        dataframe['atr_14'] = tr.rolling(14).mean()
+        # ATR（真实波幅的简单均值）
+        dataframe['atr_14'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_sma', period=14)
 
         # 波动率
         dataframe['volatility'] = close.pct_change().rolling(20).std()
-        dataframe['vol_percentile'] = dataframe['volatility'].rolling(120).rank(pct=True)
+        dataframe['vol_percentile'] = rolling_rank(dataframe['volatility'], 120)
 
         # EMA 族
         for period in [10, 20, 50, 200]:
-            dataframe[f'ema_{period}'] = close.ewm(span=period).mean()
+            dataframe[f'ema_{period}'] = shared_indicator(dataframe, metadata, self.timeframe,
+                                                          'ema_ewm', period=period)
 
         # 成交量
         dataframe['vol_ma_20'] = dataframe['volume'].rolling(20).mean()
@@ -75,6 +86,32 @@ class ResearchStrategy(IStrategy):
 
         return dataframe
 
+    def _add_common_indicators_incremental(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
+        """增量版 _add_common_indicators：列名与数值相同，直接写回传入的 dataframe"""
+        engines = getattr(self, '_common_engines', None)
+        if engines is None:
+            engines = self._common_engines = {}
+        pair = metadata['pair']
+        if pair not in engines:
+            engines[pair] = CommonIndicatorEngine()
+        columns = engines[pair].update(dataframe)
+
+        if self.verify_incremental:
+            full = self._add_common_indicators(dataframe[['date', 'open', 'high', 'low',
+                                                          'close', 'volume']].copy(), metadata)
+            # pandas rolling std 是在线算法，几千根后自身有 1e-7 量级的相对误差，容差取 1e-6
+            mismatched = [col for col, values in columns.items()
+                          if not np.allclose(values, full[col].to_numpy(dtype=np.float64),
+                                             rtol=1e-6, atol=1e-12, equal_nan=True)]
+            if mismatched:
+                logger.warning(f"{pair} 增量指标与全量重算不一致: {mismatched}，改用全量结果并重置状态")
+                engines[pair].reset()
+                columns = {col: full[col].to_numpy() for col in columns}
+
+        for col, values in columns.items():
+            dataframe[col] = values
+        return dataframe
+
     def custom_stake_amount(self, pair: str, current_time, current_rate: float,
                             proposed_stake: float, min_stake, max_stake,
                             leverage: float, entry_tag, side: str,
@@ -5,6 +5,7 @@
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import pandas as pd
+from utils.indicator_cache import shared_indicator
 
 
 class RPSRotationStrategy(IStrategy):
@@ -61,8 +62,8 @@ class RPSRotationStrategy(IStrategy):
             dataframe['rps_rank'] = 50
 
         # 趋势过滤
-        dataframe['ema_50'] = dataframe['close'].ewm(span=50).mean()
-        dataframe['ema_200'] = dataframe['close'].ewm(span=200).mean()
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=50)
+        dataframe['ema_200'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=200)
         dataframe['uptrend'] = (dataframe['ema_50'] > dataframe['ema_200']).astype(int)
 
         # 成交量确认
@@ -6,6 +6,7 @@ from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
 from sklearn.linear_model import LinearRegression
+from utils.indicator_cache import shared_indicator
 
 
 class RSRSStrategy(IStrategy):
@@ -78,15 +79,11 @@ class RSRSStrategy(IStrategy):
         dataframe = self._calculate_rsrs(dataframe)
 
         # 辅助指标
-        dataframe['ema_20'] = dataframe['close'].ewm(span=20).mean()
-        dataframe['ema_60'] = dataframe['close'].ewm(span=60).mean()
+        dataframe['ema_20'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=20)
+        dataframe['ema_60'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=60)
 
         # RSI 过滤
-        delta = dataframe['close'].diff()
-        gain = delta.where(delta > 0, 0).rolling(14).mean()
-        loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
-        rs = gain / loss
-        dataframe['rsi'] = 100 - (100 / (1 + rs))
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_sma', period=14)
 
         return dataframe
 
@@ -7,6 +7,8 @@ from pandas import DataFrame
 import numpy as np
 from sklearn.linear_model import LinearRegression
 
+from utils.rolling_rank import rolling_rank, rolling_quantile
+
 
 class RSRS_RPS_Strategy(IStrategy):
     """
@@ -60,10 +62,12 @@ class RSRS_RPS_Strategy(IStrategy):
         dataframe['momentum_20'] = dataframe['close'].pct_change(20)
         dataframe['momentum_60'] = dataframe['close'].pct_change(60)
         dataframe['rps_proxy'] = 0.6 * dataframe['momentum_20'] + 0.4 * dataframe['momentum_60']
+        dataframe['rps_upper'] = rolling_quantile(dataframe['rps_proxy'], 60, 0.8)
+        dataframe['rps_lower'] = rolling_quantile(dataframe['rps_proxy'], 60, 0.2)
 
         # 波动率过滤
         dataframe['volatility'] = dataframe['close'].pct_change().rolling(20).std()
-        dataframe['vol_percentile'] = dataframe['volatility'].rolling(120).rank(pct=True)
+        dataframe['vol_percentile'] = rolling_rank(dataframe['volatility'], 120)
 
         return dataframe
 
@@ -71,7 +75,7 @@ class RSRS_RPS_Strategy(IStrategy):
         dataframe.loc[
             (
                 (dataframe['rsrs_modified'] > 0.7) &
-                (dataframe['rps_proxy'] > dataframe['rps_proxy'].rolling(60).quantile(0.8)) &
+                (dataframe['rps_proxy'] > dataframe['rps_upper']) &
                 (dataframe['vol_percentile'] < 0.8) &
                 (dataframe['volume'] > 0)
             ),
@@ -84,7 +88,7 @@ class RSRS_RPS_Strategy(IStrategy):
         dataframe.loc[
             (
                 (dataframe['rsrs_modified'] < -0.7) |
-                (dataframe['rps_proxy'] < dataframe['rps_proxy'].rolling(60).quantile(0.2))
+                (dataframe['rps_proxy'] < dataframe['rps_lower'])
             ),
             'exit_long'
         ] = 1
@@ -5,7 +5,11 @@
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
-import talib.abstract as ta
+import pandas as pd
+
+from utils.indicator_cache import shared_indicator
+from utils.smc_utils import fvg_zones, marked_zones, order_blocks, track_zones
+from utils.swing_utils import swing_points
 
 
 class SMCStrategy(IStrategy):
@@ -25,15 +29,10 @@ class SMCStrategy(IStrategy):
     minimal_roi = {"0": 0.06, "180": 0.03, "480": 0.01}
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # Swing High / Swing Low 识别
-        lookback = 5
-        dataframe['swing_high'] = dataframe['high'].rolling(
-            lookback * 2 + 1, center=True
-        ).apply(lambda x: x[lookback] if x[lookback] == x.max() else np.nan)
-
-        dataframe['swing_low'] = dataframe['low'].rolling(
-            lookback * 2 + 1, center=True
-        ).apply(lambda x: x[lookback] if x[lookback] == x.min() else np.nan)
+        # Swing High / Swing Low 识别（左右各 5 根，右侧 5 根走完才确认，标记在确认 K 线上）
+        swings = swing_points(dataframe['high'], dataframe['low'], left=5, strict=False)
+        dataframe['swing_high'] = swings['swing_high']
+        dataframe['swing_low'] = swings['swing_low']
 
         dataframe['prev_swing_high'] = dataframe['swing_high'].ffill()
         dataframe['prev_swing_low'] = dataframe['swing_low'].ffill()
@@ -71,23 +70,36 @@ class SMCStrategy(IStrategy):
             dataframe['low'] <= dataframe['fvg_bottom']
         ).astype(int)
 
-        # Order Block 识别
-        dataframe['bull_ob_high'] = np.nan
-        dataframe['bull_ob_low'] = np.nan
-
-        for i in range(len(dataframe)):
-            if dataframe['bull_bos'].iloc[i] == 1:
-                for j in range(i-1, max(i-10, 0), -1):
-                    if dataframe['close'].iloc[j] < dataframe['open'].iloc[j]:
-                        dataframe.loc[dataframe.index[i], 'bull_ob_high'] = dataframe['high'].iloc[j]
-                        dataframe.loc[dataframe.index[i], 'bull_ob_low'] = dataframe['low'].iloc[j]
-                        break
-
-        dataframe['bull_ob_high'] = dataframe['bull_ob_high'].ffill()
-        dataframe['bull_ob_low'] = dataframe['bull_ob_low'].ffill()
+        # Order Block 识别：BOS 之前 9 根以内最后一根反向 K 线
+        obs = {}
+        for side in ('bull', 'bear'):
+            obs[side] = order_blocks(
+                dataframe['open'], dataframe['high'], dataframe['low'], dataframe['close'],
+                dataframe[f'{side}_bos'], lookback=10, side=side
+            )
+            dataframe[f'{side}_ob_high'] = pd.Series(obs[side][0], index=dataframe.index).ffill()
+            dataframe[f'{side}_ob_low'] = pd.Series(obs[side][1], index=dataframe.index).ffill()
+
+        # 所有未回补的 FVG、未失效的订单块都保留（不只是最近一个）：
+        # FVG 在 low 跌到下沿时回补，订单块在收盘跌破下沿时失效
+        fvg = fvg_zones(dataframe['high'], dataframe['low'])
+        fvg_state = track_zones(fvg['start'], fvg['bottom'], fvg['top'],
+                                dataframe['low'], dataframe['close'], dataframe['low'])
+        dataframe['in_fvg_zone'] = fvg_state['in_zone']
+        dataframe['open_fvgs'] = fvg_state['zone_count']
+
+        ob = marked_zones(*obs['bull'])
+        ob_state = track_zones(ob['start'], ob['bottom'], ob['top'],
+                               dataframe['low'], dataframe['close'], dataframe['close'],
+                               inclusive=False)
+        dataframe['in_ob_zone'] = ob_state['in_zone']
+        dataframe['ob_zone_top'] = ob_state['zone_top']
+        dataframe['ob_zone_bottom'] = ob_state['zone_bottom']
 
         # 辅助指标（先定义再使用）
         dataframe['is_bull'] = (dataframe['close'] > dataframe['open']).astype(int)
+        range_ = (dataframe['high'] - dataframe['low']).replace(0, 1e-8)
+        dataframe['body_ratio'] = abs(dataframe['close'] - dataframe['open']) / range_
 
         # Liquidity Sweep 检测
         dataframe['sweep_low'] = (
@@ -96,18 +108,17 @@ class SMCStrategy(IStrategy):
             (dataframe['is_bull'] == 1)
         ).astype(int)
 
-        dataframe['ema_50'] = ta.EMA(dataframe, timeperiod=50)
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=50)
+        dataframe['atr'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_talib', period=14)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
 
         return dataframe
 
     def populate_entry_trend(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
-        # 入场一：价格回到 Order Block 区域 + 反转确认
+        # 入场一：价格回到任一未失效的 Order Block 区域 + 反转确认
         dataframe.loc[
             (
-                (dataframe['low'] <= dataframe['bull_ob_high']) &
-                (dataframe['close'] >= dataframe['bull_ob_low']) &
+                (dataframe['in_ob_zone'] == 1) &
                 (dataframe['is_bull'] == 1) &
                 (dataframe['body_ratio'] > 0.4) &
                 (dataframe['close'] > dataframe['ema_50']) &
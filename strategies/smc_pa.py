@@ -6,6 +6,9 @@
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
+from utils.indicator_cache import shared_indicator
+from utils.smc_utils import liquidity_pools, marked_zones, track_zones
+from utils.swing_utils import swing_points
 
 
 class SMCPriceActionStrategy(IStrategy):
@@ -44,28 +47,19 @@ class SMCPriceActionStrategy(IStrategy):
         is_bullish = dataframe['close'] > dataframe['open']
         is_bearish = dataframe['close'] < dataframe['open']
 
-        # 市场结构
-        dataframe['swing_high_flag'] = (
-            (dataframe['high'] > dataframe['high'].shift(1)) &
-            (dataframe['high'] > dataframe['high'].shift(-1)) &
-            (dataframe['high'] > dataframe['high'].shift(2)) &
-            (dataframe['high'] > dataframe['high'].shift(-2))
-        ).astype(int)
-
-        dataframe['swing_low_flag'] = (
-            (dataframe['low'] < dataframe['low'].shift(1)) &
-            (dataframe['low'] < dataframe['low'].shift(-1)) &
-            (dataframe['low'] < dataframe['low'].shift(2)) &
-            (dataframe['low'] < dataframe['low'].shift(-2))
-        ).astype(int)
+        # 市场结构（左右各 2 根的摆动点，标记在确认 K 线上，不看未来）
+        swings = swing_points(dataframe['high'], dataframe['low'], left=2)
+        dataframe['swing_high_flag'] = swings['swing_high'].notna().astype(int)
+        dataframe['swing_low_flag'] = swings['swing_low'].notna().astype(int)
 
-        dataframe['last_sh'] = np.where(
-            dataframe['swing_high_flag'] == 1, dataframe['high'], np.nan)
-        dataframe['last_sh'] = dataframe['last_sh'].ffill()
+        dataframe['last_sh'] = swings['swing_high'].ffill()
+        dataframe['last_sl'] = swings['swing_low'].ffill()
 
-        dataframe['last_sl'] = np.where(
-            dataframe['swing_low_flag'] == 1, dataframe['low'], np.nan)
-        dataframe['last_sl'] = dataframe['last_sl'].ffill()
+        # 流动性池：等高点 / 等低点（相差 0.1% 以内的摆动点归为一池，至少触及两次）
+        pools = liquidity_pools(dataframe['high'], dataframe['low'], left=2,
+                                tolerance=0.001, min_touches=2)
+        for col in ('liq_above', 'liq_above_touches', 'liq_below', 'liq_below_touches'):
+            dataframe[col] = pools[col]
 
         # 趋势
         dataframe['hh'] = (dataframe['last_sh'] > dataframe['last_sh'].shift(5)).astype(int)
@@ -89,14 +83,16 @@ class SMCPriceActionStrategy(IStrategy):
         dataframe['ob_bottom'] = np.where(
             dataframe['bullish_ob'] == 1, dataframe['low'].shift(1), np.nan
         )
+        # 所有未失效的订单块（收盘跌破下沿即失效），价格回到其中任一个即算进入区域
+        ob = marked_zones(dataframe['ob_top'], dataframe['ob_bottom'])
+        ob_state = track_zones(ob['start'], ob['bottom'], ob['top'],
+                               dataframe['low'], dataframe['close'], dataframe['close'],
+                               inclusive=False)
+        dataframe['in_ob_zone'] = ob_state['in_zone']
+
         dataframe['ob_top'] = dataframe['ob_top'].ffill()
         dataframe['ob_bottom'] = dataframe['ob_bottom'].ffill()
 
-        dataframe['in_ob_zone'] = (
-            (dataframe['low'] <= dataframe['ob_top']) &
-            (dataframe['close'] >= dataframe['ob_bottom'])
-        ).astype(int)
-
         # FVG（修复：使用已完成的 K 线）
         dataframe['bull_fvg'] = (
             (dataframe['low'].shift(2) > dataframe['high'].shift(1)) &
@@ -108,14 +104,15 @@ class SMCPriceActionStrategy(IStrategy):
             dataframe['bull_fvg'] == 1, dataframe['low'].shift(2), np.nan)
         dataframe['fvg_bottom'] = np.where(
             dataframe['bull_fvg'] == 1, dataframe['high'].shift(1), np.nan)
+        # 所有未回补的 FVG（low 跌到下沿即回补）；缺口由前两根 K 线构成，当根即可参与判断
+        fvg = marked_zones(dataframe['fvg_top'], dataframe['fvg_bottom'], delay=0)
+        fvg_state = track_zones(fvg['start'], fvg['bottom'], fvg['top'],
+                                dataframe['low'], dataframe['close'], dataframe['low'])
+        dataframe['in_fvg_zone'] = fvg_state['in_zone']
+
         dataframe['fvg_top'] = dataframe['fvg_top'].ffill()
         dataframe['fvg_bottom'] = dataframe['fvg_bottom'].ffill()
 
-        dataframe['in_fvg_zone'] = (
-            (dataframe['low'] <= dataframe['fvg_top']) &
-            (dataframe['close'] >= dataframe['fvg_bottom'])
-        ).astype(int)
-
         # 反转 K 线（Brooks 风格）
         lower_wick = np.where(
             dataframe['close'] >= dataframe['open'],
@@ -131,8 +128,8 @@ class SMCPriceActionStrategy(IStrategy):
         ).astype(int)
 
         # EMA 过滤
-        dataframe['ema_50'] = dataframe['close'].ewm(span=50).mean()
-        dataframe['ema_200'] = dataframe['close'].ewm(span=200).mean()
+        dataframe['ema_50'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=50)
+        dataframe['ema_200'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_ewm', period=200)
 
         return dataframe
 
@@ -161,4 +158,13 @@ class SMCPriceActionStrategy(IStrategy):
             'exit_long'
         ] = 1
 
+        # 止盈：触及上方的等高点流动性池（用上一根 K 线已知的池）
+        dataframe.loc[
+            (
+                (dataframe['high'] >= dataframe['liq_above'].shift(1)) &
+                (dataframe['volume'] > 0)
+            ),
+            'exit_long'
+        ] = 1
+
         return dataframe
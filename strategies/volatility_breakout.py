@@ -4,7 +4,9 @@
 
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
-import talib.abstract as ta
+
+from utils.indicator_cache import shared_indicator
+from utils.rolling_rank import rolling_rank
 
 
 class VolatilityBreakoutStrategy(IStrategy):
@@ -36,19 +38,21 @@ class VolatilityBreakoutStrategy(IStrategy):
 
     def populate_indicators(self, dataframe: DataFrame, metadata: dict) -> DataFrame:
         # ATR 系列
-        dataframe['atr'] = ta.ATR(dataframe, timeperiod=14)
+        dataframe['atr'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_talib', period=14)
         dataframe['atr_sma_50'] = dataframe['atr'].rolling(50).mean()
 
         # 波动率比率
         dataframe['vol_ratio'] = dataframe['atr'] / dataframe['atr_sma_50']
 
         # 布林带宽度
-        bb = ta.BBANDS(dataframe, timeperiod=20, nbdevup=2, nbdevdn=2)
+        bb = {band: shared_indicator(dataframe, metadata, self.timeframe, 'bbands_band',
+                                     period=20, std=2.0, band=band)
+              for band in ('upperband', 'middleband', 'lowerband')}
         dataframe['bb_width'] = (bb['upperband'] - bb['lowerband']) / bb['middleband']
-        dataframe['bb_width_pctile'] = dataframe['bb_width'].rolling(100).rank(pct=True)
+        dataframe['bb_width_pctile'] = rolling_rank(dataframe['bb_width'], 100)
 
         # Keltner 通道
-        dataframe['kc_mid'] = ta.EMA(dataframe, timeperiod=20)
+        dataframe['kc_mid'] = shared_indicator(dataframe, metadata, self.timeframe, 'ema_talib', period=20)
         dataframe['kc_upper'] = dataframe['kc_mid'] + dataframe['atr'] * 1.5
         dataframe['kc_lower'] = dataframe['kc_mid'] - dataframe['atr'] * 1.5
 
@@ -74,7 +78,7 @@ class VolatilityBreakoutStrategy(IStrategy):
         dataframe['dc_lower_20'] = dataframe['low'].rolling(20).min()
 
         # ADX 趋势强度
-        dataframe['adx'] = ta.ADX(dataframe, timeperiod=14)
+        dataframe['adx'] = shared_indicator(dataframe, metadata, self.timeframe, 'adx_talib', period=14)
 
         return dataframe
 
@@ -5,7 +5,9 @@
 from freqtrade.strategy import IStrategy
 from pandas import DataFrame
 import numpy as np
-import talib.abstract as ta
+
+from utils.indicator_cache import shared_indicator
+from utils.rolling_rank import rolling_rank
 
 
 class VolatilitySellStrategy(IStrategy):
@@ -30,13 +32,13 @@ class VolatilitySellStrategy(IStrategy):
         dataframe['realized_vol'] = returns.rolling(24).std() * np.sqrt(24 * 365)
 
         # 波动率的百分位排名
-        dataframe['vol_percentile'] = dataframe['realized_vol'].rolling(500).rank(pct=True)
+        dataframe['vol_percentile'] = rolling_rank(dataframe['realized_vol'], 500)
 
         # 波动率的变化率
         dataframe['vol_change'] = dataframe['realized_vol'].pct_change(6)
 
         # RSI
-        dataframe['rsi'] = ta.RSI(dataframe, timeperiod=14)
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
 
         return dataframe
 
@@ -6,6 +6,8 @@ import numpy as np
 import pandas as pd
 from typing import Union
 
+from .rolling_rank import rolling_rank
+
 
 class AlphaOperators:
     """Alpha 101 基础算子库"""
@@ -18,9 +20,7 @@ class AlphaOperators:
     @staticmethod
     def ts_rank(series: pd.Series, window: int) -> pd.Series:
         """时序排名：当前值在过去 window 期中的排名百分位"""
-        return series.rolling(window).apply(
-            lambda x: pd.Series(x).rank().iloc[-1] / len(x), raw=False
-        )
+        return rolling_rank(series, window)
 
     @staticmethod
     def ts_max(series: pd.Series, window: int) -> pd.Series:
@@ -6,37 +6,130 @@ import numpy as np
 from scipy.stats import norm
 
 
-def deflated_sharpe_ratio(sharpe_ratio, num_trials, variance_of_sharpe, T):
+def expected_max_sharpe(num_trials, variance_of_sharpe):
+    """
+    N 次独立试验中最大夏普比率的期望（False Strategy Theorem）
+
+    E[max SR] ≈ √V · ((1-γ)·Φ⁻¹(1 - 1/N) + γ·Φ⁻¹(1 - 1/(N·e)))，γ 为欧拉常数
+    """
+    n = np.asarray(num_trials, dtype=np.float64)
+    safe_n = np.maximum(n, 2.0)
+    z = ((1 - np.euler_gamma) * norm.ppf(1 - 1 / safe_n)
+         + np.euler_gamma * norm.ppf(1 - 1 / (safe_n * np.e)))
+    return np.where(n > 1, np.sqrt(variance_of_sharpe) * z, 0.0)
+
+
+def probabilistic_sharpe_ratio(sharpe_ratio, benchmark_sharpe, T, skewness=0.0, kurtosis=3.0):
+    """
+    PSR：真实夏普比率大于 benchmark 的概率（考虑偏度和峰度）
+
+    所有参数都可以是数组（逐元素广播）；夏普比率用单期（非年化）口径，与 T 的频率一致
+    """
+    sr = np.asarray(sharpe_ratio, dtype=np.float64)
+    se = np.sqrt((1 - skewness * sr + (kurtosis - 1) / 4 * sr ** 2) / (np.asarray(T) - 1))
+    return norm.cdf((sr - benchmark_sharpe) / se)
+
+
+def deflated_sharpe_ratio(sharpe_ratio, num_trials, variance_of_sharpe, T,
+                          skewness=0.0, kurtosis=3.0):
     """
     Bailey & López de Prado (2014) 的 Deflated Sharpe Ratio
 
     Args:
-        sharpe_ratio: 最佳策略的夏普比率
+        sharpe_ratio: 最佳策略的夏普比率（单期口径）
         num_trials: 尝试了多少个策略变体
-        variance_of_sharpe: 夏普比率的方差
+        variance_of_sharpe: 各试验夏普比率的方差
         T: 回测的观测数量
+        skewness / kurtosis: 收益的偏度和（非超额）峰度
 
     Returns:
         DSR > 0.95 才算统计显著
     """
-    expected_max_sr = np.sqrt(variance_of_sharpe) * (
-        (1 - np.euler_gamma) * norm.ppf(1 - 1/num_trials)
-        + np.euler_gamma * norm.ppf(1 - 1/(num_trials * np.e))
-    )
+    sr0 = expected_max_sharpe(num_trials, variance_of_sharpe)
+    return probabilistic_sharpe_ratio(sharpe_ratio, sr0, T, skewness, kurtosis)
 
-    dsr = norm.cdf(
-        (sharpe_ratio - expected_max_sr) * np.sqrt(T - 1)
-        / np.sqrt(1 - sharpe_ratio * np.sqrt(1/T) + sharpe_ratio**2 / (4*T))
-    )
-
-    return dsr
 
+def min_trades_for_significance(sharpe_ratio, confidence=0.95, skewness=0.0,
+                                kurtosis=3.0, benchmark_sharpe=0.0):
+    """
+    计算达到统计显著性所需的最少交易数（最小样本长度 MinTRL）
 
-def min_trades_for_significance(sharpe_ratio, confidence=0.95):
-    """计算达到统计显著性所需的最少交易数"""
+    MinTRL = 1 + (1 - γ3·SR + (γ4-1)/4·SR²) · (z / (SR - SR*))²
+    支持数组输入；SR <= benchmark 时返回 inf
+    """
+    sr = np.asarray(sharpe_ratio, dtype=np.float64)
     z = norm.ppf(confidence)
-    min_T = (z / sharpe_ratio) ** 2
-    return int(np.ceil(min_T))
+    edge = sr - benchmark_sharpe
+    with np.errstate(divide='ignore', invalid='ignore'):
+        min_T = 1 + (1 - skewness * sr + (kurtosis - 1) / 4 * sr ** 2) * (z / edge) ** 2
+    min_T = np.where(edge > 0, np.ceil(min_T), np.inf)
+    if min_T.ndim == 0:
+        return int(min_T) if np.isfinite(min_T) else float('inf')
+    return min_T
+
+
+def holm_adjust(p_values):
+    """Holm 逐步校正后的 p 值（控制 FWER，比 Bonferroni 更有功效）"""
+    p = np.asarray(p_values, dtype=np.float64)
+    m = p.size
+    order = np.argsort(p)
+    stepped = np.maximum.accumulate(p[order] * (m - np.arange(m)))
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(stepped, 1.0)
+    return adjusted
+
+
+def benjamini_hochberg_adjust(p_values):
+    """Benjamini–Hochberg 校正后的 p 值（控制 FDR）"""
+    p = np.asarray(p_values, dtype=np.float64)
+    m = p.size
+    order = np.argsort(p)
+    scaled = p[order] * m / np.arange(1, m + 1)
+    stepped = np.minimum.accumulate(scaled[::-1])[::-1]
+    adjusted = np.empty(m)
+    adjusted[order] = np.minimum(stepped, 1.0)
+    return adjusted
+
+
+def evaluate_trials(sharpe_ratios, T, skewness=0.0, kurtosis=3.0,
+                    confidence=0.95, alpha=0.05) -> dict:
+    """
+    一次性评估全部 hyperopt 试验（全部向量化，不打印）
+
+    Args:
+        sharpe_ratios: 每个试验的单期夏普比率，shape (N,)
+        T: 每个试验的观测数（标量或数组）
+        skewness / kurtosis: 每个试验收益的偏度 / 峰度（标量或数组）
+        confidence: MinTRL 的置信度
+        alpha: 判定显著的阈值
+
+    Returns:
+        dict：各字段都是 shape (N,) 的数组，另含试验间夏普方差和期望最大夏普
+    """
+    sr = np.asarray(sharpe_ratios, dtype=np.float64)
+    n_trials = sr.size
+    variance = float(np.var(sr, ddof=1)) if n_trials > 1 else 0.0
+    sr0 = float(expected_max_sharpe(n_trials, variance))
+
+    psr = probabilistic_sharpe_ratio(sr, 0.0, T, skewness, kurtosis)
+    dsr = probabilistic_sharpe_ratio(sr, sr0, T, skewness, kurtosis)
+    p_values = 1 - psr
+    holm = holm_adjust(p_values)
+    bh = benjamini_hochberg_adjust(p_values)
+
+    return {
+        'sharpe_variance': variance,
+        'expected_max_sharpe': sr0,
+        'psr': psr,
+        'dsr': dsr,
+        'min_trl': min_trades_for_significance(sr, confidence, skewness, kurtosis),
+        'p_value': p_values,
+        'p_holm': holm,
+        'p_bh': bh,
+        'significant_dsr': dsr > 1 - alpha,
+        'significant_holm': holm < alpha,
+        'significant_bh': bh < alpha,
+    }
 
 
 def split_data(dataframe, train_ratio=0.6, val_ratio=0.2):
@@ -56,15 +149,163 @@ def split_data(dataframe, train_ratio=0.6, val_ratio=0.2):
     return train, val, test
 
 
-def bonferroni_correction(p_values, alpha=0.05):
-    """Bonferroni 校正：最简单但最保守"""
-    n = len(p_values)
+def bonferroni_correction(p_values, alpha=0.05, verbose=True):
+    """Bonferroni 校正：最简单但最保守（批量评估时传 verbose=False）"""
+    p = np.asarray(p_values, dtype=np.float64)
+    n = p.size
     adjusted_alpha = alpha / n
-    significant = [p < adjusted_alpha for p in p_values]
+    significant = p < adjusted_alpha
+
+    if not verbose:
+        return significant, adjusted_alpha
 
     print(f"测试了 {n} 个策略")
     print(f"原始显著性水平：{alpha}")
     print(f"校正后显著性水平：{adjusted_alpha:.6f}")
-    print(f"通过校正的策略数：{sum(significant)}/{n}")
+    print(f"通过校正的策略数：{int(significant.sum())}/{n}")
 
     return significant, adjusted_alpha
+
+
+class CombinatorialPurgedKFold:
+    """
+    组合清洗交叉验证（CPCV, López de Prado 2018）
+
+    把样本按时间切成 N 组，每次取 k 组做测试集，共 C(N, k) 种切分：
+    - 清洗（purge）：标签区间与测试集标签区间重叠的训练样本要删掉（测试集前后两侧），否则标签泄露
+    - 禁区（embargo）：清洗之后再往后的一段样本也不能用于训练（序列相关）
+
+    split() 是生成器，只产出位置索引数组（np.int64），不复制 DataFrame，
+    配合 df.iloc[idx] 或 ndarray[idx] 使用；内存只和单次切分的大小有关。
+    """
+
+    def __init__(self, n_groups: int = 6, n_test_groups: int = 2, embargo: float = 0.01):
+        if not 0 < n_test_groups < n_groups:
+            raise ValueError("需要 0 < n_test_groups < n_groups")
+        self.n_groups = n_groups
+        self.n_test_groups = n_test_groups
+        self.embargo = embargo
+
+    def get_n_splits(self) -> int:
+        """切分数 C(N, k)"""
+        from math import comb
+        return comb(self.n_groups, self.n_test_groups)
+
+    @property
+    def n_paths(self) -> int:
+        """可拼出的完整回测路径数 φ = k/N × C(N, k)"""
+        return self.get_n_splits() * self.n_test_groups // self.n_groups
+
+    def group_bounds(self, n_samples: int) -> np.ndarray:
+        """各组的 [start, end) 边界，shape (N+1,)"""
+        return np.linspace(0, n_samples, self.n_groups + 1).astype(np.int64)
+
+    def split(self, X, label_horizon=0):
+        """
+        逐个产出 (train_idx, test_idx)
+
+        Args:
+            X: 样本数或任意有 len() 的对象（DataFrame / ndarray）
+            label_horizon: 标签向前看的 K 线数（int），
+                或每个样本标签结束位置的数组 t1（t1[i] >= i）
+
+        Yields:
+            train_idx, test_idx: 升序位置索引
+        """
+        from itertools import combinations
+
+        n = X if isinstance(X, (int, np.integer)) else len(X)
+        bounds = self.group_bounds(n)
+
+        if np.ndim(label_horizon) == 0:
+            t1 = None
+            horizon = int(label_horizon)
+        else:
+            t1 = np.asarray(label_horizon, dtype=np.int64)
+            if len(t1) != n:
+                raise ValueError("label_horizon 数组长度必须等于样本数")
+            # 取前缀最大值让 t1 单调，searchsorted 即可求清洗起点（只会多删不会少删）
+            t1 = np.maximum.accumulate(np.maximum(t1, np.arange(n)))
+        embargo = int(np.ceil(n * self.embargo))
+
+        for test_groups in combinations(range(self.n_groups), self.n_test_groups):
+            test_idx = np.concatenate([
+                np.arange(bounds[g], bounds[g + 1], dtype=np.int64) for g in test_groups
+            ])
+
+            # 相邻测试组合并成连续区间
+            blocks = []
+            for g in test_groups:
+                start, end = bounds[g], bounds[g + 1]
+                if blocks and blocks[-1][1] == start:
+                    blocks[-1][1] = end
+                else:
+                    blocks.append([start, end])
+
+            # 每个测试区间两侧清洗、再向后加禁区，得到要从训练集剔除的区间：
+            # 之前的训练样本标签伸进测试区间要删；之后的训练样本起点落在测试标签区间内也要删
+            excluded = []
+            for start, end in blocks:
+                if t1 is None:
+                    purge_start = max(start - horizon, 0)
+                    purge_end = end + horizon
+                else:
+                    purge_start = int(np.searchsorted(t1[:start], start, side='left'))
+                    purge_end = int(t1[end - 1]) + 1
+                excluded.append((purge_start, min(purge_end + embargo, n)))
+
+            train_parts = []
+            cursor = 0
+            for lo, hi in excluded:
+                if lo > cursor:
+                    train_parts.append(np.arange(cursor, lo, dtype=np.int64))
+                cursor = max(cursor, hi)
+            if cursor < n:
+                train_parts.append(np.arange(cursor, n, dtype=np.int64))
+            train_idx = (np.concatenate(train_parts) if train_parts
+                         else np.empty(0, dtype=np.int64))
+
+            yield train_idx, test_idx
+
+    def paths(self):
+        """
+        逐条产出回测路径：每条路径是 N 个 (split_id, group) 元组，
+        覆盖全部 N 组，且每组取自不同的切分（split_id 与 split() 的顺序一致）
+        """
+        from itertools import combinations
+
+        splits = list(combinations(range(self.n_groups), self.n_test_groups))
+        used = {g: 0 for g in range(self.n_groups)}
+        owners = {g: [i for i, s in enumerate(splits) if g in s] for g in range(self.n_groups)}
+
+        for _ in range(self.n_paths):
+            path = []
+            for g in range(self.n_groups):
+                path.append((owners[g][used[g]], g))
+                used[g] += 1
+            yield path
+
+
+def store_folds(pair, timeframe, cv=None, label_horizon=0, start=None, end=None, store=None):
+    """
+    从 OHLCVStore 取 K 线，逐折产出 (train, test) DataFrame（CPCV / walk-forward）
+
+    整段数据是内存映射的零拷贝视图，每个 worker 只占用实际访问到的页；
+    每折只复制该折用到的行（训练集可能不连续，iloc 取行必然复制）
+
+    Args:
+        cv: CombinatorialPurgedKFold，缺省 CombinatorialPurgedKFold()
+        label_horizon: 同 CombinatorialPurgedKFold.split
+        store: OHLCVStore，缺省按 FT_OHLCV_STORE / user_data/ohlcv_store 打开
+
+    Example:
+        for train, test in store_folds('BTC/USDT', '1h', label_horizon=24):
+            ...
+    """
+    from .ohlcv_store import OHLCVStore
+
+    store = store or OHLCVStore()
+    cv = cv or CombinatorialPurgedKFold()
+    frame = store.frame(pair, timeframe, start=start, end=end)
+    for train_idx, test_idx in cv.split(len(frame), label_horizon):
+        yield frame.iloc[train_idx], frame.iloc[test_idx]
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+# Source: day19.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+
+class Direction:
+    UP = 1
+    DOWN = -1
+
+
+TOP = 1
+BOTTOM = -1
+
+
+class Fractal:
+    """分型：kind 为 TOP / BOTTOM；index 为极值所在的原始 K 线，confirmed 为确认它的 K 线"""
+    __slots__ = ('kind', 'price', 'index', 'merged', 'confirmed')
+
+    def __init__(self, kind, price, index, merged, confirmed):
+        self.kind = kind
+        self.price = price
+        self.index = index
+        self.merged = merged
+        self.confirmed = confirmed
+
+
+class Bi:
+    """笔：相邻的顶、底分型之间的一段走势"""
+    __slots__ = ('start', 'end')
+
+    def __init__(self, start: Fractal, end: Fractal):
+        self.start = start
+        self.end = end
+
+    @property
+    def direction(self) -> int:
+        return Direction.UP if self.end.kind == TOP else Direction.DOWN
+
+    @property
+    def high(self) -> float:
+        return max(self.start.price, self.end.price)
+
+    @property
+    def low(self) -> float:
+        return min(self.start.price, self.end.price)
+
+
+class Zhongshu:
+    """
+    中枢：连续三笔的重叠区间 [low, high]（ZD / ZG），之后仍与之重叠的笔算作延伸
+
+    start_index / end_index 是中枢覆盖的原始 K 线范围（事后画图用）；
+    known_index 是中枢成立的那根 K 线（第三笔被后一笔确认时），信号和逐根列只从这里开始使用
+    """
+    __slots__ = ('high', 'low', 'start_index', 'end_index', 'known_index', 'bi_count', 'exit')
+
+    def __init__(self, high, low, start_index, end_index, known_index):
+        self.high = high
+        self.low = low
+        self.start_index = start_index
+        self.end_index = end_index
+        self.known_index = known_index
+        self.bi_count = 3
+        self.exit = None
+
+
+class ChanSignal:
+    """买卖点 / 背驰：index 为信号出现（可知）的原始 K 线"""
+    __slots__ = ('type_', 'index', 'price', 'direction')
+
+    def __init__(self, type_, index, price, direction=Direction.DOWN):
+        self.type_ = type_
+        self.index = index
+        self.price = price
+        self.direction = direction
+
+
+class MACDState:
+    """
+    逐根续算的 MACD：EMA(fast) - EMA(slow)，信号线为其 EMA(signal)，即 pandas ewm(adjust=False)
+
+    每根 K 线的值只取决于此前处理过的收盘价，不随数据窗口的起点变化；
+    ewm(adjust=True) 在每个窗口上重新加权，同一根 K 线在不同窗口里的值不同
+
+    Example:
+        state = MACDState(12, 26, 9)
+        macd, signal, hist = state.update(close)
+    """
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.alphas = (2.0 / (fast + 1), 2.0 / (slow + 1), 2.0 / (signal + 1))
+        self.fast = self.slow = self.signal = None
+
+    def update(self, close: float) -> tuple:
+        """输入一根收盘价，返回 (macd, signal, hist)；收盘价为 NaN 时不更新，返回 NaN"""
+        if close != close:
+            return (np.nan, np.nan, np.nan)
+        a_fast, a_slow, a_signal = self.alphas
+        if self.fast is None:
+            self.fast = self.slow = close
+        else:
+            self.fast += a_fast * (close - self.fast)
+            self.slow += a_slow * (close - self.slow)
+        macd = self.fast - self.slow
+        self.signal = macd if self.signal is None else self.signal + a_signal * (macd - self.signal)
+        return (macd, self.signal, macd - self.signal)
+
+
+class ChanEngine:
+    """
+    缠论结构的流式状态机：包含处理 → 分型 → 笔 → 中枢 → 买卖点，每根 K 线摊还 O(1)
+
+    - 包含处理只保留最后三根合并 K 线，新 K 线要么并入最后一根，要么新开一根
+    - 新开合并 K 线时检查倒数第二根是否成为分型（之后的包含处理只会让它更确定），
+      分型记在当前这根原始 K 线上确认
+    - 笔只修改最后一笔：同类分型更极端时替换最后一个端点，异类分型间隔够 min_bars 根合并 K 线时新增端点；
+      新增端点后倒数第二笔定型，送入中枢状态机
+    - 中枢只由定型的笔构成：连续三笔重叠成立，重叠的笔延伸，不重叠的笔离开中枢
+    - 底分型端点设定（或被更低的底替换）时判断一买 / 三买 / 背驰；顶分型对称判断顶背驰
+
+    背驰力度用 hist（一般是 MACD 柱）在笔内同向部分的面积；不传时用笔的价格幅度。
+    给出 macd=(fast, slow, signal) 时引擎用 MACDState 从收盘价自己续算 MACD 柱，
+    每根 K 线的柱值在它被追加时算一次，之后不再变化（macd_columns 取出窗口内的值）
+
+    引擎是有状态的：一根 K 线上的结构和 MACD 取决于引擎从哪根 K 线开始处理。
+    update_frame 在 dataframe 不是已处理数据的延续（日期对不上，或起点早于引擎的第一根 K 线）
+    时重置后全量处理，所以回测（每个交易对一份完整 dataframe）的结果与之前处理过哪些
+    dataframe 无关；实盘沿滑动窗口续算，结果与从引擎第一根 K 线起全量处理一致
+
+    Example:
+        engine = ChanEngine(min_bars=4)
+        for h, l, m in zip(high, low, macd_hist):
+            new_signals = engine.update(h, l, m)          # 实盘每根 K 线一次
+        zs_high, zs_low = paint_zhongshu(engine.zhongshus, engine.bars)
+
+        engine = ChanEngine(min_bars=4, macd=(12, 26, 9))
+        offset = engine.update_frame(dataframe)           # MACD 柱由引擎续算
+        macd, signal, hist = engine.macd_columns(len(dataframe), offset)
+    """
+
+    def __init__(self, min_bars: int = 4, macd: tuple = None):
+        self.min_bars = min_bars
+        self.macd = tuple(macd) if macd else None
+        self.reset()
+
+    def reset(self):
+        self.bars = 0
+        self._merged = []          # 最后三根合并 K 线：[high, low, high 所在 K 线, low 所在 K 线]
+        self._merged_count = 0
+        self.endpoints = []        # 笔的端点（分型），最后一个可被修改
+        self.bis = []              # 已定型的笔
+        self.zhongshus = []
+        self.signals = []
+        self._window = []          # 尚未构成中枢的定型笔（最多三笔）
+        self._cum = {TOP: [0.0], BOTTOM: [0.0]}   # hist 同向部分的累计面积，按原始 K 线
+        self._cum_base = 0
+        self._has_hist = False
+        self.first_date = None
+        self.last_date = None
+        self._macd_state = MACDState(*self.macd) if self.macd else None
+        self._macd_rows = []       # 窗口内各 K 线的 (macd, signal, hist)
+        self._macd_base = 0        # _macd_rows[0] 对应的原始 K 线
+
+    # ------------------------------------------------------------------
+    # 包含处理与分型
+    # ------------------------------------------------------------------
+    def _merge(self, high: float, low: float, index: int):
+        merged = self._merged
+        if merged:
+            last = merged[-1]
+            if (last[0] >= high and last[1] <= low) or (high >= last[0] and low <= last[1]):
+                up = len(merged) < 2 or last[0] > merged[-2][0]
+                pick = max if up else min
+                new_high, new_low = pick(last[0], high), pick(last[1], low)
+                if new_high != last[0]:
+                    last[2] = index
+                if new_low != last[1]:
+                    last[3] = index
+                last[0], last[1] = new_high, new_low
+                return None
+
+        merged.append([high, low, index, index])
+        self._merged_count += 1
+        if len(merged) > 3:
+            merged.pop(0)
+        if len(merged) < 3:
+            return None
+        left, mid, right = merged
+        position = self._merged_count - 2
+        if mid[0] > left[0] and mid[0] > right[0]:
+            return Fractal(TOP, mid[0], mid[2], position, index)
+        if mid[1] < left[1] and mid[1] < right[1]:
+            return Fractal(BOTTOM, mid[1], mid[3], position, index)
+        return None
+
+    # ------------------------------------------------------------------
+    # 笔
+    # ------------------------------------------------------------------
+    def _add_fractal(self, fractal: Fractal) -> bool:
+        """返回端点是否变化（新增或替换）"""
+        ends = self.endpoints
+        if not ends:
+            ends.append(fractal)
+            return True
+        last = ends[-1]
+        beyond = fractal.price > last.price if fractal.kind == TOP else fractal.price < last.price
+        if fractal.kind == last.kind:
+            if beyond:
+                ends[-1] = fractal
+                return True
+            return False
+        if fractal.merged - last.merged >= self.min_bars and beyond:
+            ends.append(fractal)
+            if len(ends) >= 3:
+                bi = Bi(ends[-3], ends[-2])
+                self.bis.append(bi)
+                self._add_bi(bi, fractal.confirmed)
+            return True
+        return False
+
+    # ------------------------------------------------------------------
+    # 中枢
+    # ------------------------------------------------------------------
+    def _add_bi(self, bi: Bi, known_index: int):
+        current = self.zhongshus[-1] if self.zhongshus and self.zhongshus[-1].exit is None else None
+        if current is not None:
+            if bi.high >= current.low and bi.low <= current.high:
+                current.end_index = bi.end.index
+                current.bi_count += 1
+            else:
+                current.exit = bi
+                self._window = []
+            return
+
+        self._window.append(bi)
+        if len(self._window) > 3:
+            self._window.pop(0)
+        if len(self._window) == 3:
+            high = min(b.high for b in self._window)
+            low = max(b.low for b in self._window)
+            if high > low:
+                self.zhongshus.append(Zhongshu(high, low, self._window[0].start.index,
+                                               bi.end.index, known_index))
+                self._window = []
+
+    # ------------------------------------------------------------------
+    # 买卖点与背驰
+    # ------------------------------------------------------------------
+    def _area(self, start: Fractal, end: Fractal) -> float:
+        if not self._has_hist:
+            return abs(end.price - start.price)
+        cum = self._cum[end.kind]
+        return cum[end.index + 1 - self._cum_base] - cum[start.index + 1 - self._cum_base]
+
+    def _signals(self, index: int) -> list:
+        ends = self.endpoints
+        last = ends[-1]
+        out = []
+        # 背驰：与前一个同向笔相比创出新高 / 新低，但力度（面积）更小
+        if len(ends) >= 4:
+            prev = ends[-3]
+            beyond = last.price > prev.price if last.kind == TOP else last.price < prev.price
+            if beyond and self._area(ends[-2], last) < self._area(ends[-4], prev):
+                direction = Direction.UP if last.kind == TOP else Direction.DOWN
+                out.append(ChanSignal('divergence', index, last.price, direction))
+                # 一买：跌破最近中枢下沿的一笔出现底背驰
+                zone = self.zhongshus[-1] if self.zhongshus else None
+                if last.kind == BOTTOM and zone is not None and last.price < zone.low:
+                    out.append(ChanSignal('buy1', index, last.price))
+
+        # 三买：向上一笔离开中枢上沿后，回调这一笔的低点不回到上沿之下
+        zone = self.zhongshus[-1] if self.zhongshus else None
+        if (last.kind == BOTTOM and zone is not None and zone.exit is None and self.bis
+                and self.bis[-1].direction == Direction.UP and self.bis[-1].high > zone.high
+                and last.price > zone.high):
+            out.append(ChanSignal('buy3', index, last.price))
+        self.signals.extend(out)
+        return out
+
+    # ------------------------------------------------------------------
+    # 逐根更新
+    # ------------------------------------------------------------------
+    def update(self, high: float, low: float, hist: float = None, close: float = None) -> list:
+        """
+        追加一根 K 线，返回这根 K 线上出现的信号（ChanSignal 列表）
+
+        引擎带 MACDState 时传 close，hist 由引擎算出（传入的 hist 被忽略）
+        """
+        index = self.bars
+        self.bars += 1
+        if self._macd_state is not None:
+            row = self._macd_state.update(np.nan if close is None else close)
+            self._macd_rows.append(row)
+            hist = row[2]
+        if hist is None or hist != hist:
+            hist = 0.0
+        else:
+            self._has_hist = True
+        self._cum[TOP].append(self._cum[TOP][-1] + max(hist, 0.0))
+        self._cum[BOTTOM].append(self._cum[BOTTOM][-1] + max(-hist, 0.0))
+        if high != high or low != low:
+            return []
+
+        fractal = self._merge(high, low, index)
+        if fractal is None or not self._add_fractal(fractal):
+            return []
+        self._trim()
+        return self._signals(index)
+
+    def _trim(self):
+        """累计面积只需要保留到倒数第四个端点，之前的部分超过一半时丢掉"""
+        if len(self.endpoints) < 4:
+            return
+        keep_from = self.endpoints[-4].index + 1 - self._cum_base
+        if keep_from > len(self._cum[TOP]) // 2:
+            for kind in (TOP, BOTTOM):
+                del self._cum[kind][:keep_from]
+            self._cum_base += keep_from
+
+    def prune(self, before: int):
+        """
+        丢掉在原始 K 线 before 之前就已结束的结构，长期运行时各列表的长度只和窗口有关
+
+        保留最后 4 个端点（背驰比较要用）、最后一笔、before 时仍在生效的中枢及之后的中枢、
+        before 及之后的信号；每次只从头部删除，摊还 O(1)
+        """
+        def cut(items: list, key, keep: int):
+            k = 0
+            while k < len(items) - keep and key(items[k]) < before:
+                k += 1
+            if k:
+                del items[:k]
+
+        cut(self.signals, lambda sig: sig.index, 0)
+        if before > self._macd_base:
+            del self._macd_rows[:before - self._macd_base]
+            self._macd_base = before
+        cut(self.endpoints, lambda end: end.index, 4)
+        cut(self.bis, lambda bi: bi.end.index, 1)
+        # 后一个中枢在 before 之前已经成立，前一个才不会再画到窗口里
+        zs = self.zhongshus
+        k = 0
+        while k + 1 < len(zs) and zs[k + 1].known_index <= before:
+            k += 1
+        if k:
+            del zs[:k]
+
+    def update_many(self, high, low, hist=None, close=None) -> list:
+        """按顺序追加一段 K 线，返回其间出现的全部信号"""
+        high = np.asarray(high, dtype=np.float64).tolist()
+        low = np.asarray(low, dtype=np.float64).tolist()
+        hist = [None] * len(high) if hist is None else np.asarray(hist, dtype=np.float64).tolist()
+        close = [None] * len(high) if close is None else np.asarray(close, dtype=np.float64).tolist()
+        out = []
+        for h, l, m, c in zip(high, low, hist, close):
+            out.extend(self.update(h, l, m, c))
+        return out
+
+    def update_frame(self, dataframe: pd.DataFrame, hist=None) -> int:
+        """
+        实盘用：按日期只追加 dataframe 里新出现的 K 线（窗口前端滑动不影响已有状态），
+        日期对不上、或 dataframe 的起点早于引擎处理过的第一根 K 线时重置后全量处理。
+        处理完后 prune 掉窗口之前的结构，zhongshus / signals 只剩窗口内（及第 0 行仍在生效）的部分。
+        引擎带 MACDState 时用 dataframe['close'] 续算 MACD，不需要传 hist
+
+        Returns:
+            offset：引擎里的原始 K 线位置减去 offset 即 dataframe 中的行号
+        """
+        dates = pd.DatetimeIndex(dataframe['date']).as_unit('ns').asi8
+        n = len(dates)
+        first_new = 0
+        if self.last_date is not None and n:
+            first_new = int(np.searchsorted(dates, self.last_date, side='right'))
+            aligned = (first_new > 0 and dates[first_new - 1] == self.last_date
+                       and self.bars >= first_new and dates[0] >= self.first_date)
+            if not aligned:
+                self.reset()
+                first_new = 0
+        elif self.last_date is not None:
+            self.reset()
+
+        if first_new < n:
+            if self.first_date is None:
+                self.first_date = dates[0]
+            self.update_many(dataframe['high'].to_numpy()[first_new:],
+                             dataframe['low'].to_numpy()[first_new:],
+                             None if hist is None else np.asarray(hist)[first_new:],
+                             dataframe['close'].to_numpy()[first_new:] if self.macd else None)
+            self.last_date = dates[-1]
+        offset = self.bars - n
+        self.prune(offset)
+        return offset
+
+    def macd_columns(self, n: int, offset: int = 0) -> tuple:
+        """窗口内各 K 线的 (macd, signal, hist) 三个数组（需要引擎带 MACDState）"""
+        rows = np.asarray(self._macd_rows[offset - self._macd_base:offset - self._macd_base + n],
+                          dtype=np.float64).reshape(-1, 3)
+        return rows[:, 0], rows[:, 1], rows[:, 2]
+
+
+def paint_zhongshu(zhongshus: list, n: int, offset: int = 0) -> tuple:
+    """
+    把中枢画成逐根列：每个中枢从成立的那根 K 线起生效，直到下一个中枢成立
+
+    所有中枢的起点和持续长度一次 np.repeat 展开，不逐个中枢 .loc 赋值
+
+    Args:
+        n: 输出长度；offset: 第 0 行对应的原始 K 线位置（见 ChanEngine.update_frame）
+
+    Returns:
+        (zs_high, zs_low) ndarray
+    """
+    zs_high = np.full(n, np.nan)
+    zs_low = np.full(n, np.nan)
+    if not zhongshus or n == 0:
+        return zs_high, zs_low
+    starts = np.array([zs.known_index for zs in zhongshus], dtype=np.int64) - offset
+    highs = np.array([zs.high for zs in zhongshus])
+    lows = np.array([zs.low for zs in zhongshus])
+
+    # 窗口开始前已经成立的中枢里只有最后一个还在生效，把它的起点挪到第 0 行
+    first = max(int(np.searchsorted(starts, 0, side='right')) - 1, 0)
+    starts, highs, lows = starts[first:], highs[first:], lows[first:]
+    starts = np.clip(starts, 0, n)
+    lengths = np.diff(np.append(starts, n))
+    begin = starts[0]
+    zs_high[begin:] = np.repeat(highs, lengths)
+    zs_low[begin:] = np.repeat(lows, lengths)
+    return zs_high, zs_low
+
+
+def signal_flags(signals: list, type_: str, n: int, offset: int = 0,
+                 direction: int = None) -> np.ndarray:
+    """某类信号的 0/1 列（direction 不为 None 时只取该方向）"""
+    flags = np.zeros(n, dtype=np.int64)
+    rows = np.array([sig.index for sig in signals
+                     if sig.type_ == type_ and (direction is None or sig.direction == direction)],
+                    dtype=np.int64) - offset
+    rows = rows[(rows >= 0) & (rows < n)]
+    flags[rows] = 1
+    return flags
@@ -4,21 +4,58 @@
 
 import pandas as pd
 import numpy as np
+from pathlib import Path
 
 
-def check_data_gaps(dataframe, timeframe_minutes=15):
-    """检测数据缺口"""
+OHLCV_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def timeframe_to_minutes(timeframe: str) -> int:
+    """'15m' / '1h' / '4h' / '1d' / '1w' → 分钟数"""
+    units = {'m': 1, 'h': 60, 'd': 1440, 'w': 10080}
+    return int(timeframe[:-1]) * units[timeframe[-1]]
+
+
+def _gap_mask(dates: pd.Series, timeframe_minutes: int):
+    """返回 (缺口布尔掩码, 相邻时间差)"""
     expected_delta = pd.Timedelta(minutes=timeframe_minutes)
-    time_diffs = dataframe['date'].diff()
-    gaps = dataframe[time_diffs > expected_delta * 1.5]
+    time_diffs = dates.diff()
+    return (time_diffs > expected_delta * 1.5).to_numpy(), time_diffs
+
+
+def _outlier_mask(returns: pd.Series, z_threshold: float):
+    """返回 (异常值布尔掩码, Z-score)；用全样本均值/标准差"""
+    z_scores = (returns - returns.mean()) / returns.std()
+    return (z_scores.abs() > z_threshold).to_numpy(), z_scores
+
+
+def _wick_mask(dataframe: pd.DataFrame, wick_ratio: float) -> np.ndarray:
+    open_ = dataframe['open'].to_numpy()
+    close = dataframe['close'].to_numpy()
+    body = np.abs(close - open_)
+    upper_wick = dataframe['high'].to_numpy() - np.maximum(open_, close)
+    lower_wick = np.minimum(open_, close) - dataframe['low'].to_numpy()
+    return (upper_wick > body * wick_ratio) | (lower_wick > body * wick_ratio)
+
+
+def check_data_gaps(dataframe, timeframe_minutes=None, max_print=20):
+    """检测数据缺口（timeframe_minutes 缺省从数据推断）"""
+    if timeframe_minutes is None:
+        from .ohlcv_utils import infer_timeframe_minutes
+        timeframe_minutes = infer_timeframe_minutes(dataframe['date'])
+    mask, time_diffs = _gap_mask(dataframe['date'], timeframe_minutes)
+    gaps = dataframe[mask]
 
     if len(gaps) > 0:
         print(f"⚠️ 发现 {len(gaps)} 个数据缺口：")
-        for _, row in gaps.iterrows():
-            print(f"  {row['date']} (间隔 {time_diffs.loc[row.name]})")
+        shown = pd.DataFrame({'date': gaps['date'], 'gap': time_diffs[mask]}).head(max_print)
+        print(shown.to_string(index=False, header=False))
+        if len(gaps) > max_print:
+            print(f"  ...（其余 {len(gaps) - max_print} 个省略）")
     else:
         print("✅ 数据连续，无缺口")
 
+    expected_delta = pd.Timedelta(minutes=timeframe_minutes)
     total_expected = (dataframe['date'].max() - dataframe['date'].min()) / expected_delta
     actual = len(dataframe)
     completeness = actual / total_expected * 100
@@ -26,18 +63,22 @@ def check_data_gaps(dataframe, timeframe_minutes=15):
     return gaps
 
 
-def detect_outliers(dataframe, z_threshold=5):
+def detect_outliers(dataframe, z_threshold=5, max_print=20):
     """用 Z-score 检测价格异常值"""
     returns = dataframe['close'].pct_change()
-    z_scores = (returns - returns.mean()) / returns.std()
-    outliers = dataframe[z_scores.abs() > z_threshold]
+    mask, z_scores = _outlier_mask(returns, z_threshold)
+    outliers = dataframe[mask]
 
     if len(outliers) > 0:
         print(f"⚠️ 发现 {len(outliers)} 个异常 K 线（Z-score > {z_threshold}）：")
-        for _, row in outliers.iterrows():
-            ret = returns.loc[row.name]
-            z = z_scores.loc[row.name]
-            print(f"  {row['date']}: 涨跌幅 {ret:.2%}, Z-score {z:.1f}")
+        shown = pd.DataFrame({
+            'date': outliers['date'],
+            'return': returns[mask].map('{:.2%}'.format),
+            'z': z_scores[mask].round(1),
+        }).head(max_print)
+        print(shown.to_string(index=False))
+        if len(outliers) > max_print:
+            print(f"  ...（其余 {len(outliers) - max_print} 个省略）")
     else:
         print("✅ 未发现异常值")
     return outliers
@@ -45,18 +86,12 @@ def detect_outliers(dataframe, z_threshold=5):
 
 def detect_wicks(dataframe, wick_ratio=3.0):
     """检测异常长影线（可能是插针）"""
-    body = abs(dataframe['close'] - dataframe['open'])
-    upper_wick = dataframe['high'] - dataframe[['open', 'close']].max(axis=1)
-    lower_wick = dataframe[['open', 'close']].min(axis=1) - dataframe['low']
-
-    abnormal = dataframe[
-        (upper_wick > body * wick_ratio) | (lower_wick > body * wick_ratio)
-    ]
+    abnormal = dataframe[_wick_mask(dataframe, wick_ratio)]
     print(f"发现 {len(abnormal)} 根异常长影线 K 线（影线 > 实体 × {wick_ratio}）")
     return abnormal
 
 
-def full_data_audit(dataframe, pair, timeframe_minutes=15):
+def full_data_audit(dataframe, pair, timeframe_minutes=None):
     """一键数据质量审计"""
     print(f"\n{'='*50}")
     print(f"数据审计报告：{pair}")
@@ -84,3 +119,445 @@ def full_data_audit(dataframe, pair, timeframe_minutes=15):
     print(f"  零成交量 K 线：{(dataframe['volume'] == 0).sum()}")
 
     return {'gaps': len(gaps), 'outliers': len(outliers)}
+
+
+# ----------------------------------------------------------------------
+# 整个数据目录的并行审计（结构化输出，不打印）
+# ----------------------------------------------------------------------
+
+def load_ohlcv_file(path, since=None) -> pd.DataFrame:
+    """
+    读取 freqtrade 数据目录中的单个文件（feather / parquet / json / json.gz）
+
+    since: 只要 date >= since 的行；feather 文件会内存映射后只转换尾部
+    """
+    path = Path(path)
+    name = path.name
+    if name.endswith('.feather') and since is not None:
+        import pyarrow.feather as feather
+        table = feather.read_table(path, memory_map=True)
+        dates = pd.DatetimeIndex(table.column('date').to_pandas())
+        start = int(dates.searchsorted(pd.Timestamp(since)))
+        return table.slice(start).to_pandas()[OHLCV_COLUMNS]
+    if name.endswith('.feather'):
+        df = pd.read_feather(path)
+    elif name.endswith('.parquet'):
+        df = pd.read_parquet(path)
+    elif name.endswith(('.json', '.json.gz')):
+        df = pd.read_json(path, orient='values', compression='infer')
+        df.columns = OHLCV_COLUMNS
+        df['date'] = pd.to_datetime(df['date'], unit='ms', utc=True)
+    else:
+        raise ValueError(f"不支持的数据格式：{path}")
+    df = df[OHLCV_COLUMNS]
+    if since is not None:
+        df = df[df['date'] >= pd.Timestamp(since)].reset_index(drop=True)
+    return df
+
+
+def parse_data_filename(path):
+    """
+    'BTC_USDT-1h.feather' → ('BTC/USDT', '1h')
+    'BTC_USDT_USDT-1h-futures.feather' → ('BTC/USDT:USDT', '1h')
+    """
+    stem = Path(path).name.split('.')[0]
+    parts = stem.split('-')
+    symbol = parts[0].split('_')
+    pair = f"{symbol[0]}/{symbol[1]}" + (f":{symbol[2]}" if len(symbol) > 2 else "")
+    return pair, parts[1]
+
+
+def _is_candle_file(path) -> bool:
+    """只审计现货 / 合约 K 线文件，跳过 trades、funding_rate、mark 等"""
+    parts = Path(path).name.split('.')[0].split('-')
+    if len(parts) not in (2, 3) or (len(parts) == 3 and parts[2] != 'futures'):
+        return False
+    tf = parts[1]
+    return tf[:-1].isdigit() and tf[-1] in 'mhdw'
+
+
+def audit_frame(dataframe: pd.DataFrame, timeframe_minutes: int,
+                z_threshold: float = 5, wick_ratio: float = 3.0) -> dict:
+    """单个 dataframe 的审计指标：全部是向量化掩码计数，不打印"""
+    n = len(dataframe)
+    if n == 0:
+        return {'rows': 0}
+
+    dates = dataframe['date']
+    gap_mask, time_diffs = _gap_mask(dates, timeframe_minutes)
+    step = pd.Timedelta(minutes=timeframe_minutes)
+    missing = ((time_diffs[gap_mask] / step).round() - 1).sum()
+
+    returns = dataframe['close'].pct_change()
+    outlier_mask, _ = _outlier_mask(returns, z_threshold)
+    total_expected = (dates.iloc[-1] - dates.iloc[0]) / step + 1
+
+    return {
+        'rows': n,
+        'start': dates.iloc[0],
+        'end': dates.iloc[-1],
+        'gaps': int(gap_mask.sum()),
+        'missing_candles': int(missing),
+        'max_gap_minutes': float(time_diffs.max() / pd.Timedelta(minutes=1)) if n > 1 else 0.0,
+        'completeness': float(n / total_expected),
+        'duplicates': int(dates.duplicated().sum()),
+        'outliers': int(outlier_mask.sum()),
+        'wicks': int(_wick_mask(dataframe, wick_ratio).sum()),
+        'zero_volume': int((dataframe['volume'] == 0).sum()),
+        'return_std': float(returns.std()),
+        'max_return': float(returns.max()),
+        'min_return': float(returns.min()),
+    }
+
+
+# ----------------------------------------------------------------------
+# 增量审计：每个 (pair, timeframe) 持久化水位线和滚动统计
+# ----------------------------------------------------------------------
+
+class AuditWatermarks:
+    """
+    审计水位线存储（一个 JSON 文件）
+
+    每个 (pair, timeframe) 记录：最后一根 K 线的时间和收盘价、收益率的
+    计数/均值/M2（Welford 算法，可合并），以及缺口、异常值等累计计数
+    """
+
+    def __init__(self, path: str = "user_data/data_audit_state.json"):
+        self.path = Path(path)
+        self.states = {}
+        if self.path.exists():
+            import json
+            self.states = json.loads(self.path.read_text())
+
+    @staticmethod
+    def key(pair: str, timeframe: str) -> str:
+        return f"{pair}|{timeframe}"
+
+    def get(self, pair: str, timeframe: str):
+        return self.states.get(self.key(pair, timeframe))
+
+    def set(self, pair: str, timeframe: str, state: dict):
+        self.states[self.key(pair, timeframe)] = state
+
+    def save(self):
+        """先写临时文件再替换，中途崩溃不会留下半个 JSON"""
+        import json
+        import os
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.states, indent=1, default=str))
+        os.replace(tmp, self.path)
+
+
+def _merge_moments(n_a, mean_a, m2_a, values):
+    """把一批新样本并入 (n, mean, M2)（Chan 等人的并行合并公式）"""
+    n_b = len(values)
+    if n_b == 0:
+        return n_a, mean_a, m2_a
+    mean_b = float(values.mean())
+    m2_b = float(((values - mean_b) ** 2).sum())
+    n = n_a + n_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * n_b / n
+    m2 = m2_a + m2_b + delta ** 2 * n_a * n_b / n
+    return n, mean, m2
+
+
+def incremental_audit_frame(dataframe: pd.DataFrame, timeframe_minutes: int,
+                            state: dict = None, overlap: int = 3,
+                            z_threshold: float = 5, wick_ratio: float = 3.0):
+    """
+    只审计水位线之后的新 K 线，并更新累计统计
+
+    Args:
+        dataframe: 至少包含水位线前 overlap 根和之后的全部 K 线（可以是完整历史）
+        state: 上一次的状态，None 表示首次（等价于全量审计）
+        overlap: 水位线之前多看的 K 线数：用来接上收益率/时间差；
+            同时校验水位线那根 K 线是否还在、收盘价是否一致，不一致则全量重算
+
+    Returns:
+        (record, new_state)：record 的字段与 audit_frame 相同（累计值）
+
+    注意：异常值用"截至本次"的滚动均值/方差判定，早先已计数的异常值不回溯修正，
+    因此长期累计的 outliers 与一次性全量审计可能略有出入
+    """
+    dates = dataframe['date']
+    close = dataframe['close'].to_numpy(dtype=np.float64)
+    step = pd.Timedelta(minutes=timeframe_minutes)
+
+    start = 0
+    if state is not None:
+        last_date = pd.Timestamp(state['last_date'])
+        pos = int(dates.searchsorted(last_date, side='left'))
+        rewritten = (pos >= len(dataframe) or dates.iloc[pos] != last_date
+                     or not np.isclose(close[pos], state['last_close']))
+        if rewritten:
+            state = None
+        else:
+            start = pos + 1
+
+    if state is None:
+        state = {'first_date': str(dates.iloc[0]) if len(dataframe) else None,
+                 'rows': 0, 'n': 0, 'mean': 0.0, 'm2': 0.0, 'gaps': 0, 'missing_candles': 0,
+                 'max_gap_minutes': 0.0, 'duplicates': 0, 'outliers': 0, 'wicks': 0,
+                 'zero_volume': 0, 'max_return': -np.inf, 'min_return': np.inf}
+        start = 0
+    else:
+        state = dict(state)
+
+    new = dataframe.iloc[start:]
+    if len(new) == 0:
+        return _state_to_record(state, step), state
+
+    # 带上 overlap 的上下文：第一根新 K 线也能算出时间差和收益率
+    ctx_start = max(0, start - max(overlap, 1))
+    ctx = dataframe.iloc[ctx_start:]
+    skip = start - ctx_start
+
+    time_diffs = ctx['date'].diff().iloc[skip:]
+    gap_mask = (time_diffs > step * 1.5).to_numpy()
+    returns = ctx['close'].pct_change().iloc[skip:].dropna().to_numpy()
+
+    state['n'], state['mean'], state['m2'] = _merge_moments(
+        state['n'], state['mean'], state['m2'], returns)
+    std = np.sqrt(state['m2'] / (state['n'] - 1)) if state['n'] > 1 else np.nan
+
+    state['rows'] += len(new)
+    state['gaps'] += int(gap_mask.sum())
+    state['missing_candles'] += int(((time_diffs[gap_mask] / step).round() - 1).sum())
+    if len(time_diffs.dropna()):
+        state['max_gap_minutes'] = max(state['max_gap_minutes'],
+                                       float(time_diffs.max() / pd.Timedelta(minutes=1)))
+    state['duplicates'] += int(new['date'].duplicated().sum())
+    if std > 0:
+        state['outliers'] += int((np.abs(returns - state['mean']) / std > z_threshold).sum())
+    state['wicks'] += int(_wick_mask(new, wick_ratio).sum())
+    state['zero_volume'] += int((new['volume'] == 0).sum())
+    if len(returns):
+        state['max_return'] = max(state['max_return'], float(returns.max()))
+        state['min_return'] = min(state['min_return'], float(returns.min()))
+    state['last_date'] = str(dates.iloc[-1])
+    state['last_close'] = float(close[-1])
+
+    return _state_to_record(state, step), state
+
+
+def _state_to_record(state: dict, step: pd.Timedelta) -> dict:
+    start, end = pd.Timestamp(state['first_date']), pd.Timestamp(state['last_date'])
+    total_expected = (end - start) / step + 1
+    n = state['n']
+    return {
+        'rows': state['rows'],
+        'start': start,
+        'end': end,
+        'gaps': state['gaps'],
+        'missing_candles': state['missing_candles'],
+        'max_gap_minutes': state['max_gap_minutes'],
+        'completeness': float(state['rows'] / total_expected),
+        'duplicates': state['duplicates'],
+        'outliers': state['outliers'],
+        'wicks': state['wicks'],
+        'zero_volume': state['zero_volume'],
+        'return_std': float(np.sqrt(state['m2'] / (n - 1))) if n > 1 else np.nan,
+        'max_return': state['max_return'],
+        'min_return': state['min_return'],
+    }
+
+
+def _audit_file(task):
+    """进程池 worker：读文件 + 审计（必须是模块级函数才能被 pickle）"""
+    path, z_threshold, wick_ratio, state, overlap = task
+    pair, timeframe = parse_data_filename(path)
+    record = {'pair': pair, 'timeframe': timeframe, 'file': str(path)}
+    new_state = state
+    try:
+        minutes = timeframe_to_minutes(timeframe)
+        if overlap is None:
+            df = load_ohlcv_file(path)
+            record.update(audit_frame(df, minutes, z_threshold, wick_ratio))
+        else:
+            since = None
+            if state is not None:
+                since = pd.Timestamp(state['last_date']) - pd.Timedelta(minutes=minutes * overlap)
+            df = load_ohlcv_file(path, since=since)
+            result, new_state = incremental_audit_frame(
+                df, minutes, state, overlap, z_threshold, wick_ratio)
+            if state is not None and new_state.get('first_date') != state.get('first_date'):
+                # 历史被改写：读回完整文件重算
+                df = load_ohlcv_file(path)
+                result, new_state = incremental_audit_frame(
+                    df, minutes, None, overlap, z_threshold, wick_ratio)
+            record.update(result)
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    return record, new_state
+
+
+def audit_datadir(datadir: str = "user_data/data/binance", timeframes: list = None,
+                  max_workers: int = None, z_threshold: float = 5,
+                  wick_ratio: float = 3.0, output: str = None,
+                  state_path: str = None, overlap: int = 3) -> pd.DataFrame:
+    """
+    并行审计数据目录下的全部 pair/timeframe 文件
+
+    Args:
+        datadir: freqtrade 数据目录（如 user_data/data/binance）
+        timeframes: 只审计这些周期，None 表示全部
+        max_workers: 进程数，None 为 CPU 核数
+        output: 可选，把报告写成 .json 或 .csv
+        state_path: 给出则启用增量审计：读取/更新该文件里的水位线，
+            每个文件只检查上次之后的新 K 线（外加 overlap 根）
+
+    Returns:
+        每个文件一行的报告 DataFrame（读取失败的文件在 error 列给出原因）
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    files = [p for p in sorted(Path(datadir).rglob('*-*.*'))
+             if p.name.endswith(('.feather', '.parquet', '.json', '.json.gz'))
+             and _is_candle_file(p)]
+    if timeframes:
+        files = [p for p in files if parse_data_filename(p)[1] in timeframes]
+
+    watermarks = AuditWatermarks(state_path) if state_path else None
+    tasks = []
+    for p in files:
+        state = watermarks.get(*parse_data_filename(p)) if watermarks else None
+        tasks.append((p, z_threshold, wick_ratio, state, overlap if watermarks else None))
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        results = list(pool.map(_audit_file, tasks, chunksize=max(1, len(tasks) // 64)))
+
+    records = [record for record, _ in results]
+    if watermarks is not None:
+        for record, state in results:
+            if state is not None and 'error' not in record:
+                watermarks.set(record['pair'], record['timeframe'], state)
+        watermarks.save()
+
+    report = pd.DataFrame(records)
+    if output:
+        if output.endswith('.json'):
+            report.to_json(output, orient='records', date_format='iso', indent=2)
+        else:
+            report.to_csv(output, index=False)
+    return report
+
+
+class BadTickGuard:
+    """
+    实时插针守卫：逐根 K 线因果地检测价格尖刺和异常长影线
+
+    detect_outliers 用全样本均值/标准差，有未来函数，只能离线用。这里每个交易对维护
+    最近 window 根 K 线对数收益的滑动中位数 / MAD（跳表顺序统计，每根 K 线 O(log w)），
+    新 K 线只和它之前的窗口比较：
+    - 尖刺：|r - median| > z_threshold × 1.4826 × MAD
+    - 长影线：影线 > 实体 × wick_ratio（同 detect_wicks），且影线长度（对数）> wick_z × 鲁棒 σ
+
+    scan() 按 date 记住每个交易对处理到哪根 K 线，重复调用只处理新 K 线，
+    回测时一次处理全部历史，结果与实盘逐根处理完全一致
+
+    Example:
+        guard = BadTickGuard()          # 放在策略实例上，跨 populate_* 调用保留状态
+        flags = guard.scan(dataframe, metadata['pair'])
+        dataframe.loc[flags['bad_tick'], 'enter_long'] = 0
+    """
+
+    def __init__(self, window: int = 500, z_threshold: float = 8.0,
+                 wick_ratio: float = 3.0, wick_z: float = 6.0,
+                 min_periods: int = 100, min_sigma: float = 1e-4,
+                 max_history: int = 5000):
+        self.window = window
+        self.z_threshold = z_threshold
+        self.wick_ratio = wick_ratio
+        self.wick_z = wick_z
+        self.min_periods = min_periods
+        self.min_sigma = min_sigma
+        self.max_history = max_history
+        self._pairs = {}
+
+    def _pair_state(self, pair: str) -> dict:
+        if pair not in self._pairs:
+            from .order_stats import RollingOrderStatistics
+            self._pairs[pair] = {'stats': RollingOrderStatistics(self.window),
+                                 'prev_close': None, 'last_date': None, 'flags': {}}
+        return self._pairs[pair]
+
+    def reset(self, pair: str = None):
+        """清空某个交易对（None 为全部）的状态"""
+        if pair is None:
+            self._pairs.clear()
+        else:
+            self._pairs.pop(pair, None)
+
+    def _beyond(self, stats, center: float, distance: float, z: float) -> bool:
+        """
+        distance > z × 1.4826 × MAD ？
+
+        不直接求 MAD（O(log² w)）：MAD < d 等价于窗口里超过一半的值落在 (center-d, center+d)，
+        两次计数查询即可，O(log w)。偶数窗口下比精确 MAD 略保守
+        """
+        if distance <= z * self.min_sigma:
+            return False
+        radius = distance / (1.4826 * z)
+        return stats.count_within(center, radius) > len(stats) // 2
+
+    def update(self, pair: str, open_: float, high: float, low: float, close: float) -> dict:
+        """
+        输入一根新收盘的 K 线
+
+        Returns:
+            {'spike': bool, 'long_wick': bool, 'bad_tick': bool}
+        """
+        state = self._pair_state(pair)
+        stats = state['stats']
+        prev_close = state['prev_close']
+        spike = long_wick = False
+
+        r = np.nan
+        if prev_close and prev_close > 0 and close > 0:
+            r = float(np.log(close / prev_close))
+
+        if len(stats) >= self.min_periods:
+            center = stats.median()
+            if r == r:
+                spike = self._beyond(stats, center, abs(r - center), self.z_threshold)
+            top, bottom = max(open_, close), min(open_, close)
+            body = top - bottom
+            upper, lower = high - top, bottom - low
+            if (upper > body * self.wick_ratio or lower > body * self.wick_ratio) and low > 0:
+                wick = max(np.log(high / top), np.log(bottom / low))
+                long_wick = self._beyond(stats, 0.0, wick, self.wick_z)
+
+        stats.push(r)
+        state['prev_close'] = close
+        return {'spike': spike, 'long_wick': long_wick, 'bad_tick': spike or long_wick}
+
+    def scan(self, dataframe: pd.DataFrame, pair: str) -> pd.DataFrame:
+        """
+        处理 dataframe 中尚未见过的 K 线，返回与 dataframe 对齐的
+        bad_tick_spike / bad_tick_wick / bad_tick 三列（布尔）
+        """
+        state = self._pair_state(pair)
+        dates = dataframe['date']
+        start = 0
+        if state['last_date'] is not None:
+            start = int(dates.searchsorted(state['last_date'], side='right'))
+
+        flags = state['flags']
+        columns = [dataframe[c].to_numpy(dtype=np.float64)[start:] for c in ('open', 'high', 'low', 'close')]
+        for date, o, h, l, c in zip(dates.iloc[start:], *columns):
+            result = self.update(pair, o, h, l, c)
+            if result['bad_tick']:
+                flags[date] = 1 * result['spike'] + 2 * result['long_wick']
+        if len(dataframe) > start:
+            state['last_date'] = dates.iloc[-1]
+        while len(flags) > self.max_history:
+            flags.pop(next(iter(flags)))
+
+        codes = dates.map(flags).fillna(0).astype(int).to_numpy()
+        return pd.DataFrame({
+            'bad_tick_spike': (codes & 1) > 0,
+            'bad_tick_wick': (codes & 2) > 0,
+            'bad_tick': codes > 0,
+        }, index=dataframe.index)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+# Source: day20.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+
+def expand_grid(grid: dict) -> pd.DataFrame:
+    """{'a': [1, 2], 'b': [0.1, 0.2]} → 参数组合的笛卡尔积，每行一组"""
+    keys = list(grid)
+    rows = list(itertools.product(*(np.atleast_1d(grid[k]) for k in keys)))
+    return pd.DataFrame(rows, columns=keys)
+
+
+def positions_from_signals(entry: np.ndarray, exit_: np.ndarray) -> np.ndarray:
+    """
+    (P × T) 入场 / 出场信号 → 持仓状态（按 K 线 t 收盘后的状态，t+1 开盘执行）
+
+    只做多、单仓位：空仓时遇到入场信号开仓，持仓时遇到出场信号平仓；
+    同一根 K 线入场和出场同时出现不开仓（与 VectorBacktester 一致）。
+    "最近一次入场信号晚于最近一次出场信号" 等价于这个状态机，用累计最大值一次求出
+    """
+    entry, exit_ = np.broadcast_arrays(entry, exit_)
+    t = np.arange(entry.shape[-1])
+    last_entry = np.maximum.accumulate(np.where(entry & ~exit_, t, -1), axis=-1)
+    last_exit = np.maximum.accumulate(np.where(exit_, t, -1), axis=-1)
+    return last_entry > last_exit
+
+
+def next_open_returns(open_: np.ndarray) -> np.ndarray:
+    """
+    与信号 K 线 t 对齐的持仓收益：open[t+2] / open[t+1] - 1（t 收盘出信号，t+1 开盘成交）
+    最后两根没有完整的持仓区间，记为 0
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    ret = np.zeros(len(open_))
+    if len(open_) > 2:
+        ret[:-2] = open_[2:] / open_[1:-1] - 1
+    return np.nan_to_num(ret)
+
+
+def _pair_pnl(pos: np.ndarray, ret: np.ndarray, fee: float):
+    """
+    单个交易对 (P × T) 持仓的逐 K 线收益（已扣手续费）和逐笔交易统计
+
+    Returns:
+        (逐 K 线收益 P × T, 交易笔数 (P,), 盈利笔数 (P,))
+    """
+    prev = np.zeros_like(pos)
+    prev[:, 1:] = pos[:, :-1]
+    opened = pos & ~prev
+    closed = ~pos & prev
+    # 末尾仍持仓的交易按最后一根结算
+    closed[:, -1] |= pos[:, -1]
+
+    pnl = np.where(pos, ret, 0.0) - fee * opened - fee * closed
+
+    # 逐笔收益：对数收益累加后在开平仓位置相减
+    growth = np.cumsum(np.log1p(np.maximum(pnl, -0.999999)), axis=1)
+    before = np.concatenate([np.zeros((len(pos), 1)), growth[:, :-1]], axis=1)
+    starts = np.flatnonzero(opened)
+    ends = np.flatnonzero(closed)
+    trade_row = starts // pos.shape[1]
+    trade_log = growth.ravel()[ends] - before.ravel()[starts]
+    trades = np.bincount(trade_row, minlength=len(pos))
+    wins = np.bincount(trade_row, weights=trade_log > 0, minlength=len(pos))
+    return pnl, trades, wins
+
+
+def score_returns(returns: np.ndarray, trades: np.ndarray, wins: np.ndarray,
+                  exposure: np.ndarray, periods_per_year: float = None) -> pd.DataFrame:
+    """(P × T) 组合逐 K 线收益 → 每组参数一行的绩效"""
+    equity = np.cumprod(1 + returns, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    mean = returns.mean(axis=1)
+    std = returns.std(axis=1, ddof=1) if returns.shape[1] > 1 else np.zeros(len(returns))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        sharpe = np.where(std > 0, mean / std, np.nan)
+        win_rate = np.where(trades > 0, wins / trades, np.nan)
+    if periods_per_year:
+        sharpe = sharpe * np.sqrt(periods_per_year)
+    return pd.DataFrame({
+        'total_return': equity[:, -1] - 1 if returns.shape[1] else np.zeros(len(returns)),
+        'sharpe': sharpe,
+        'max_drawdown': (1 - equity / peak).max(axis=1) if returns.shape[1] else 0.0,
+        'trades': trades.astype(np.int64),
+        'win_rate': win_rate,
+        'exposure': exposure,
+    })
+
+
+def evaluate_grid(grid, signal_fn, open_: np.ndarray, fee: float = 0.001,
+                  periods_per_year: float = None, max_cells: int = 20_000_000) -> pd.DataFrame:
+    """
+    单交易对的参数网格评估：整张网格按块广播成 (参数 × 时间) 信号矩阵，一次算出全部绩效
+
+    Args:
+        grid: {参数名: 取值列表}（做笛卡尔积）或已展开的 DataFrame
+        signal_fn: f(params) -> (entry, exit)，params 是 {参数名: (P, 1) 数组}，
+            返回可广播到 (P, T) 的布尔矩阵
+        open_: 开盘价（成交价）
+        max_cells: 每块的 P × T 上限，控制内存
+
+    Returns:
+        每组参数一行：参数列 + total_return / sharpe / max_drawdown / trades / win_rate / exposure
+
+    说明：只按信号在下一根开盘成交，不模拟 ROI / 止损。用来看参数敏感性曲面，
+    选出的区域再用 VectorBacktester 或 freqtrade 回测确认
+    """
+    params = grid if isinstance(grid, pd.DataFrame) else expand_grid(grid)
+    ret = next_open_returns(open_)
+    T = len(ret)
+    block = max(1, int(max_cells // max(T, 1)))
+
+    parts = []
+    for lo in range(0, len(params), block):
+        chunk = params.iloc[lo:lo + block]
+        cols = {k: chunk[k].to_numpy()[:, None] for k in chunk.columns}
+        entry, exit_ = signal_fn(cols)
+        entry = np.broadcast_to(entry, (len(chunk), T))
+        exit_ = np.broadcast_to(exit_, (len(chunk), T))
+        pos = positions_from_signals(entry, exit_)
+        pnl, trades, wins = _pair_pnl(pos, ret, fee)
+        parts.append(score_returns(pnl, trades, wins, pos.mean(axis=1), periods_per_year))
+
+    scores = pd.concat(parts, ignore_index=True) if parts else score_returns(
+        np.zeros((0, T)), np.zeros(0), np.zeros(0), np.zeros(0))
+    return pd.concat([params.reset_index(drop=True), scores], axis=1)
+
+
+def _column(dataframe: pd.DataFrame, name: str) -> np.ndarray:
+    return dataframe[name].to_numpy(dtype=np.float64)
+
+
+# ----------------------------------------------------------------------
+# 策略网格：输入策略自身算好指标的 dataframe
+# ----------------------------------------------------------------------
+
+def bollinger_grid(dataframe: pd.DataFrame, grid: dict, fee: float = 0.001,
+                   periods_per_year: float = None) -> pd.DataFrame:
+    """
+    BollingerMeanRevert 的 zscore_entry × zscore_exit 网格
+
+    dataframe 需已包含策略的指标（populate_indicators + _add_band_columns，
+    即某一组 bb_period / bb_std 下的 zscore、bb_width 等）
+
+    Example:
+        df = strategy.populate_indicators(df, {'pair': pair})
+        df = strategy._add_band_columns(df, {'pair': pair})
+        surface = bollinger_grid(df, {'zscore_entry': np.arange(-3.0, -1.45, 0.1),
+                                      'zscore_exit': np.arange(-0.5, 0.55, 0.1)})
+    """
+    z = _column(dataframe, 'zscore')
+    close = _column(dataframe, 'close')
+    volume = _column(dataframe, 'volume')
+    with np.errstate(invalid='ignore'):
+        base_entry = ((close > _column(dataframe, 'ema_200') * 0.92)
+                      & (_column(dataframe, 'bb_width') > 0.02)
+                      & (volume > _column(dataframe, 'volume_sma') * 1.2)
+                      & (volume > 0))
+        base_exit = _column(dataframe, 'rsi') > 72
+
+    def signals(p):
+        with np.errstate(invalid='ignore'):
+            entry = (z < p['zscore_entry']) & base_entry
+            exit_ = (z > p['zscore_exit']) | base_exit
+        return entry, exit_
+
+    return evaluate_grid(grid, signals, _column(dataframe, 'open'), fee, periods_per_year)
+
+
+def optimizable_grid(dataframe: pd.DataFrame, grid: dict, fee: float = 0.001,
+                     periods_per_year: float = None, pair: str = '',
+                     timeframe: str = '1h') -> pd.DataFrame:
+    """
+    OptimizableStrategy 的 buy_rsi / sell_rsi / buy_volume_factor / buy_ema_short / buy_ema_long 网格
+
+    dataframe 需已经过 populate_indicators（rsi、vol_ma）。EMA 周期也可以进网格：
+    网格里出现的每个周期只算一次（走指标登记表，pair / timeframe 与策略一致时可复用策略算过的值），
+    按参数行取用
+    """
+    from .indicator_cache import get_indicator_registry
+
+    params = grid if isinstance(grid, pd.DataFrame) else expand_grid(grid)
+    rsi = _column(dataframe, 'rsi')
+    volume = _column(dataframe, 'volume')
+    vol_ma = _column(dataframe, 'vol_ma')
+
+    periods = np.unique(np.concatenate([params['buy_ema_short'], params['buy_ema_long']])).astype(int)
+    registry = get_indicator_registry()
+    table = np.vstack([registry.get(dataframe, pair, timeframe, 'ema_ewm', {'period': int(p)})
+                       for p in periods])
+
+    def signals(p):
+        short = table[np.searchsorted(periods, p['buy_ema_short'][:, 0])]
+        long_ = table[np.searchsorted(periods, p['buy_ema_long'][:, 0])]
+        with np.errstate(invalid='ignore'):
+            entry = ((rsi < p['buy_rsi']) & (short > long_)
+                     & (volume > vol_ma * p['buy_volume_factor']) & (volume > 0))
+            exit_ = rsi > p['sell_rsi']
+        return entry, exit_
+
+    return evaluate_grid(params, signals, _column(dataframe, 'open'), fee, periods_per_year)
+
+
+def multifactor_grid(frames: dict, grid: dict, fee: float = 0.001,
+                     periods_per_year: float = None, max_cells: int = 20_000_000) -> pd.DataFrame:
+    """
+    MultiFactorStrategy 的因子权重（w_momentum / w_volatility / w_volume）和 top_n 网格
+
+    按 bot_loop_start 的口径逐 K 线计算三个因子（30 根动量、-30 根波动率、10/50 成交量比），
+    横截面百分位排名后按每组权重合成、取 Top N，再叠加策略自身的入场 / 出场条件。
+    每个持仓占 1/top_n 资金，输出组合层面的绩效
+
+    Args:
+        frames: {pair: 已 populate_indicators 的 dataframe}（rsi / ema_20 / ema_50 / adx）
+    """
+    params = grid if isinstance(grid, pd.DataFrame) else expand_grid(grid)
+    pairs = list(frames)
+    dates = pd.DatetimeIndex(sorted(set().union(*(frames[p]['date'] for p in pairs))))
+
+    def aligned(name):
+        return np.vstack([frames[p].set_index('date')[name].reindex(dates).to_numpy(dtype=np.float64)
+                          for p in pairs])
+
+    close = aligned('close')
+    volume = aligned('volume')
+    open_ = aligned('open')
+    ema20, ema50 = aligned('ema_20'), aligned('ema_50')
+    with np.errstate(invalid='ignore'):
+        static_entry = (ema20 > ema50) & (aligned('adx') > 20) & (aligned('rsi') < 65) & (volume > 0)
+        cross_down = (ema20 < ema50) & (np.roll(ema20, 1, axis=1) >= np.roll(ema50, 1, axis=1))
+        cross_down[:, 0] = False
+        static_exit = (aligned('rsi') > 75) | cross_down
+
+    # 因子（与 bot_loop_start 相同的定义，逐 K 线滚动计算）
+    close_df = pd.DataFrame(close.T)
+    volume_df = pd.DataFrame(volume.T)
+    momentum = close_df / close_df.shift(30) - 1
+    vol_score = -close_df.pct_change().rolling(30).std()
+    vol_ratio = volume_df.rolling(10).mean() / volume_df.rolling(50).mean()
+    history = close_df.notna().cumsum() >= 200
+    ranks = np.stack([f.where(history).rank(axis=1, pct=True).to_numpy().T
+                      for f in (momentum, vol_score, vol_ratio)])      # 3 × pairs × T
+    eligible = history.to_numpy().T
+
+    n_pairs, T = close.shape
+    ret = np.vstack([next_open_returns(o) for o in open_])
+    block = max(1, int(max_cells // max(n_pairs * T, 1)))
+
+    parts = []
+    for lo in range(0, len(params), block):
+        chunk = params.iloc[lo:lo + block]
+        w = chunk[['w_momentum', 'w_volatility', 'w_volume']].to_numpy(dtype=np.float64)
+        total = w.sum(axis=1, keepdims=True)
+        w = w / np.where(total == 0, 1, total)
+        top_n = chunk['top_n'].to_numpy()
+
+        composite = np.einsum('pk,knt->pnt', w, np.nan_to_num(ranks))
+        composite = np.where(eligible, composite, -np.inf)
+        # 每根 K 线按得分降序排名，名次 < top_n 的入选
+        order = np.argsort(-composite, axis=1, kind='stable')
+        place = np.empty_like(order)
+        np.put_along_axis(place, order, np.arange(n_pairs)[None, :, None], axis=1)
+        is_top = (place < top_n[:, None, None]) & eligible
+
+        port = np.zeros((len(chunk), T))
+        trades = np.zeros(len(chunk))
+        wins = np.zeros(len(chunk))
+        exposure = np.zeros(len(chunk))
+        for k in range(n_pairs):
+            pos = positions_from_signals(is_top[:, k] & static_entry[k], ~is_top[:, k] | static_exit[k])
+            pnl, n_tr, n_win = _pair_pnl(pos, ret[k], fee)
+            port += pnl / top_n[:, None]
+            trades += n_tr
+            wins += n_win
+            exposure += pos.mean(axis=1) / n_pairs
+        parts.append(score_returns(port, trades, wins, exposure, periods_per_year))
+
+    return pd.concat([params.reset_index(drop=True), pd.concat(parts, ignore_index=True)], axis=1)
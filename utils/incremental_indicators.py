@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+# Source: day20.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+
+class _GrowBuffer:
+    """只追加的一维数组，容量按倍数扩张（追加均摊 O(1)）；丢弃头部时原地整理"""
+
+    def __init__(self, dtype=np.float64, capacity: int = 1024):
+        self._data = np.empty(capacity, dtype=dtype)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, values: np.ndarray):
+        need = self._len + len(values)
+        if need > len(self._data):
+            grown = np.empty(max(need, 2 * len(self._data)), dtype=self._data.dtype)
+            grown[:self._len] = self._data[:self._len]
+            self._data = grown
+        self._data[self._len:need] = values
+        self._len = need
+
+    def discard(self, count: int):
+        """丢弃最旧的 count 个值"""
+        if count <= 0:
+            return
+        self._data[:self._len - count] = self._data[count:self._len]
+        self._len -= count
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._data[:self._len]
+
+
+class _RollingTail:
+    """
+    滚动窗口指标的可续算状态：只保留最近 window-1 个输入
+
+    新数据到来时把尾部缓冲和新值拼起来，只对新值所在的窗口求值。
+    口径与 pandas rolling(window) 默认参数一致：窗口内有 NaN 或不满 window 个值时输出 NaN；
+    rank 为 average 名次 / window（rank(pct=True)）
+    """
+
+    def __init__(self, window: int, method: str):
+        self.window = window
+        self.method = method
+        self.tail = np.empty(0)
+
+    def update(self, values: np.ndarray) -> np.ndarray:
+        from numpy.lib.stride_tricks import sliding_window_view
+        ext = np.concatenate([self.tail, values])
+        self.tail = ext[max(len(ext) - (self.window - 1), 0):]
+        out = np.full(len(values), np.nan)
+        skip = max(self.window - 1 - (len(ext) - len(values)), 0)
+        if skip >= len(values):
+            return out
+        windows = sliding_window_view(ext, self.window)[-(len(values) - skip):]
+        if self.method == 'mean':
+            out[skip:] = windows.mean(axis=1)
+        elif self.method == 'std':
+            out[skip:] = windows.std(axis=1, ddof=1)
+        else:
+            current = windows[:, -1:]
+            less = (windows < current).sum(axis=1)
+            equal = (windows == current).sum(axis=1)
+            rank = (less + (equal + 1) / 2) / self.window
+            out[skip:] = np.where(np.isnan(windows).any(axis=1), np.nan, rank)
+        return out
+
+
+class _EWMState:
+    """
+    pandas ewm(span, adjust=True) 的可续算状态
+
+    ewm 值 = N_t / D_t，N_t = w·N_{t-1} + x_t，D_t = w·D_{t-1} + 1（w = 1 - alpha）。
+    按行保存 N、D，数据窗口前端滑动（最旧的 K 线被挤掉）时用
+    N_t - w^(t-s+1)·N_{s-1} 去掉窗口之前的贡献，输出与在当前窗口上全量 ewm 一致
+    """
+
+    def __init__(self, span: int):
+        self.decay = 1.0 - 2.0 / (span + 1)
+        self.num = _GrowBuffer()
+        self.den = _GrowBuffer()
+
+    def update(self, values: np.ndarray):
+        from scipy.signal import lfilter
+        a = [1.0, -self.decay]
+        prev_num = self.num.values[-1] if len(self.num) else 0.0
+        prev_den = self.den.values[-1] if len(self.den) else 0.0
+        num, _ = lfilter([1.0], a, values, zi=[self.decay * prev_num])
+        den, _ = lfilter([1.0], a, np.ones(len(values)), zi=[self.decay * prev_den])
+        self.num.append(num)
+        self.den.append(den)
+
+    def window_values(self, offset: int) -> np.ndarray:
+        """从缓冲区第 offset 行起算的 ewm（offset 之前的历史不计入）"""
+        num = self.num.values[offset:]
+        den = self.den.values[offset:]
+        if offset == 0:
+            return num / den
+        factor = self.decay ** np.arange(1, len(num) + 1)
+        return ((num - factor * self.num.values[offset - 1])
+                / (den - factor * self.den.values[offset - 1]))
+
+    def discard(self, count: int):
+        self.num.discard(count)
+        self.den.discard(count)
+
+
+class CommonIndicatorEngine:
+    """
+    ResearchStrategy 通用指标的增量计算引擎（每个交易对一个）
+
+    实盘每根 K 线 dataprovider 给的是"旧窗口去掉头部若干根 + 末尾新增一根"，
+    引擎按日期对齐：已经算过的行直接取缓冲区，只计算末尾新增的行；
+    窗口前端滑动时 EMA 按窗口起点修正，输出与对当前窗口全量重算一致（浮点误差内）。
+    窗口头部 head_rows 行按当前窗口单独重算（滚动窗口在全量重算里的预热段）。
+    日期对不上（重连后补数据、重新加载历史等）时自动丢弃状态全量重算
+
+    产出的列与 ResearchStrategy._add_common_indicators 相同：
+        atr_14, volatility, vol_percentile, ema_{10,20,50,200},
+        vol_ma_20, vol_ratio, body_ratio, close_position
+
+    Example:
+        engine = CommonIndicatorEngine()
+        for col, values in engine.update(dataframe).items():
+            dataframe[col] = values
+    """
+
+    def __init__(self, ema_periods=(10, 20, 50, 200), atr_period: int = 14,
+                 vol_period: int = 20, rank_window: int = 120, volume_period: int = 20):
+        self.ema_periods = tuple(ema_periods)
+        self.atr_period = atr_period
+        self.vol_period = vol_period
+        self.rank_window = rank_window
+        self.volume_period = volume_period
+        self.reset()
+
+    @property
+    def columns(self) -> list:
+        return ([f'atr_{self.atr_period}', 'volatility', 'vol_percentile']
+                + [f'ema_{p}' for p in self.ema_periods]
+                + [f'vol_ma_{self.volume_period}', 'vol_ratio', 'body_ratio', 'close_position'])
+
+    def reset(self):
+        self._dates = _GrowBuffer(np.int64)
+        self._stored = {col: _GrowBuffer() for col in self.columns if not col.startswith('ema_')}
+        self._ema = {p: _EWMState(p) for p in self.ema_periods}
+        self._prev_close = np.nan
+        self._tr = _RollingTail(self.atr_period, 'mean')
+        self._ret = _RollingTail(self.vol_period, 'std')
+        self._rank = _RollingTail(self.rank_window, 'rank')
+        self._volume = _RollingTail(self.volume_period, 'mean')
+        self.rows_computed = 0
+
+    def _align(self, dates: np.ndarray):
+        """
+        返回 (dataframe 中第一根新 K 线的位置, dataframe 首行在缓冲区里的位置)；
+        对不上时重置状态并返回 (0, 0)
+        """
+        stored = self._dates.values
+        if len(stored) == 0 or len(dates) == 0:
+            self.reset()
+            return 0, 0
+        first_new = int(np.searchsorted(dates, stored[-1], side='right'))
+        offset = int(np.searchsorted(stored, dates[0], side='left'))
+        if (first_new == 0 or dates[first_new - 1] != stored[-1]
+                or offset >= len(stored) or stored[offset] != dates[0]
+                or len(stored) - offset != first_new):
+            self.reset()
+            return 0, 0
+        return first_new, offset
+
+    @property
+    def head_rows(self) -> int:
+        """窗口头部受"窗口之前没有数据"影响的行数（全量重算时这些行是 NaN 或不完整窗口）"""
+        return max(self.atr_period, self.vol_period + self.rank_window - 1, self.volume_period)
+
+    def _compute(self, ohlcv: dict) -> dict:
+        """计算新行（ohlcv 为各列 ndarray）并追加到缓冲区，返回新行的非 EMA 列"""
+        high, low, close = ohlcv['high'], ohlcv['low'], ohlcv['close']
+        open_, volume = ohlcv['open'], ohlcv['volume']
+
+        prev_close = np.concatenate([[self._prev_close], close[:-1]])
+        tr = np.maximum(high - low, np.maximum(np.abs(high - prev_close), np.abs(low - prev_close)))
+        volatility = self._ret.update(close / prev_close - 1)
+        vol_ma = self._volume.update(volume)
+        range_ = np.where(high - low == 0, 1e-8, high - low)
+
+        new = {
+            f'atr_{self.atr_period}': self._tr.update(tr),
+            'volatility': volatility,
+            'vol_percentile': self._rank.update(volatility),
+            f'vol_ma_{self.volume_period}': vol_ma,
+            'vol_ratio': volume / vol_ma,
+            'body_ratio': np.abs(close - open_) / range_,
+            'close_position': (close - low) / range_,
+        }
+        for col, values in new.items():
+            self._stored[col].append(values)
+        for state in self._ema.values():
+            state.update(close)
+        self._prev_close = close[-1]
+        self.rows_computed += len(close)
+        return new
+
+    def update(self, dataframe: pd.DataFrame) -> dict:
+        """
+        对齐 dataframe 并补算新增的行
+
+        Returns:
+            {列名: 与 dataframe 等长的 ndarray}
+        """
+        dates = pd.DatetimeIndex(dataframe['date']).as_unit('ns').asi8
+        ohlcv = {col: dataframe[col].to_numpy(dtype=np.float64)
+                 for col in ('open', 'high', 'low', 'close', 'volume')}
+        first_new, offset = self._align(dates)
+        if first_new < len(dates):
+            self._dates.append(dates[first_new:])
+            self._compute({col: values[first_new:] for col, values in ohlcv.items()})
+
+        # 缓冲区里窗口之前的部分超过一半时整理掉，内存不随运行时间增长；
+        # EMA 的窗口修正要用到窗口前一行，保留它
+        if offset - 1 > len(self._dates) // 2:
+            self._discard(offset - 1)
+            offset = 1
+
+        # 返回副本：缓冲区之后会原地整理，不能让已经交出去的列跟着变
+        out = {col: buf.values[offset:].copy() for col, buf in self._stored.items()}
+        for period, state in self._ema.items():
+            out[f'ema_{period}'] = state.window_values(offset)
+
+        # 窗口前端滑动后，头部几行在全量重算里看不到窗口之前的数据；
+        # 用一个临时引擎只对这几行按当前窗口重算，保证与全量结果逐值一致
+        if offset > 0:
+            head = min(self.head_rows, len(dates))
+            fresh = CommonIndicatorEngine(self.ema_periods, self.atr_period, self.vol_period,
+                                          self.rank_window, self.volume_period)
+            redo = fresh._compute({col: values[:head] for col, values in ohlcv.items()})
+            for col, values in redo.items():
+                out[col][:head] = values
+        return out
+
+    def _discard(self, count: int):
+        """丢弃最旧的 count 行"""
+        self._dates.discard(count)
+        for buf in self._stored.values():
+            buf.discard(count)
+        for state in self._ema.values():
+            state.discard(count)
@@ -0,0 +1,424 @@
+# -*- coding: utf-8 -*-
+# Source: day20.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import hashlib
+import json
+import os
+import weakref
+from collections import OrderedDict
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+
+_FINGERPRINT_COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+
+def candle_stamp(dataframe: pd.DataFrame) -> tuple:
+    """(行数, 首根时间, 末根时间)，O(1)，不读取价格数据"""
+    n = len(dataframe)
+    if n == 0:
+        return (0, None, None)
+    dates = dataframe['date'].array if 'date' in dataframe.columns else dataframe.index
+    return (n, pd.Timestamp(dates[0]).value, pd.Timestamp(dates[-1]).value)
+
+
+def _column_buffers(dataframe: pd.DataFrame) -> tuple:
+    """参与指纹的各列：(数据地址, 持有这块内存的最底层 ndarray)"""
+    buffers = []
+    for col in _FINGERPRINT_COLUMNS:
+        if col not in dataframe.columns:
+            continue
+        values = dataframe[col].values
+        if not isinstance(values, np.ndarray):
+            values = np.asarray(values)
+        owner = values
+        while isinstance(owner.base, np.ndarray):
+            owner = owner.base
+        buffers.append((values.__array_interface__['data'][0], owner))
+    return tuple(buffers)
+
+
+# (candle_stamp, 各列数据地址) → (各列内存持有者的弱引用, 指纹)
+_fingerprint_memo = OrderedDict()
+_FINGERPRINT_MEMO_SIZE = 256
+
+
+def data_fingerprint(dataframe: pd.DataFrame) -> str:
+    """
+    K 线数据的指纹（blake2b，OHLCV 全部参与）
+
+    哈希 10 万行约 10ms，比一次 rolling / ewm 还贵，所以按 (candle_stamp, 各列的数据地址)
+    记住结果：entry / exit 拿到的是同一块内存，直接命中；copy()、重新下载、改价格后
+    重建的 dataframe 数据地址不同，会重新哈希。记忆里保存各列内存持有者的弱引用，
+    只有这些数组还活着（地址不可能被别的数组复用）时才算命中。
+    唯一认不出来的是原地改写 OHLCV 列（df.loc[..., 'close'] = ...），改过之后请用副本
+    """
+    stamp = candle_stamp(dataframe)
+    buffers = _column_buffers(dataframe)
+    memo_key = (stamp, tuple(address for address, _ in buffers))
+    memo = _fingerprint_memo.get(memo_key)
+    if memo is not None:
+        refs, digest = memo
+        if all(ref() is owner for ref, (_, owner) in zip(refs, buffers)):
+            _fingerprint_memo.move_to_end(memo_key)
+            return digest
+
+    dates = dataframe['date'] if 'date' in dataframe.columns else dataframe.index.to_series()
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.DatetimeIndex(dates).as_unit('ns').asi8.tobytes())
+    for col in _FINGERPRINT_COLUMNS[1:]:
+        if col in dataframe.columns:
+            digest.update(np.ascontiguousarray(dataframe[col].to_numpy(dtype=np.float64)).tobytes())
+    digest = digest.hexdigest()
+
+    _fingerprint_memo[memo_key] = (tuple(weakref.ref(owner) for _, owner in buffers), digest)
+    while len(_fingerprint_memo) > _FINGERPRINT_MEMO_SIZE:
+        _fingerprint_memo.popitem(last=False)
+    return digest
+
+
+class IndicatorCache:
+    """
+    按参数值索引的指标缓存：(pair, timeframe, 数据指纹, 指标名, 参数) → ndarray
+
+    hyperopt 每个 epoch 只用到某一组参数值，指标在第一次用到时才计算，之后同一进程内
+    直接复用；给出 shared_dir（或环境变量 FT_INDICATOR_CACHE）时还会落盘成 .npy，
+    其他 hyperopt worker 以只读内存映射方式读取，不再重复计算。
+    内存里按 LRU 淘汰，总量不超过 max_bytes；共享目录同样按 LRU（文件 mtime，读盘命中时刷新）
+    淘汰，总量不超过 max_disk_bytes，几个 worker 共用一个目录时各自按目录实际大小清理
+
+    返回的数组是只读的，防止策略代码原地修改污染缓存
+
+    Example:
+        cache = get_indicator_cache()
+        ema = cache.get(dataframe, metadata['pair'], self.timeframe, 'ema_ewm',
+                        {'period': self.buy_ema_short.value}, ema_ewm)
+    """
+
+    def __init__(self, max_bytes: int = 512 * 1024 ** 2, shared_dir: str = None,
+                 max_disk_bytes: int = 4 * 1024 ** 3):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        shared_dir = shared_dir or os.environ.get('FT_INDICATOR_CACHE')
+        self.shared_dir = Path(shared_dir) if shared_dir else None
+        # 共享目录的大小：第一次写盘时扫描，之后累加本进程写入的字节，超限时重新扫描并清理
+        self._disk_bytes = None
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(pair: str, timeframe: str, fingerprint: str, name: str, params: dict) -> tuple:
+        return (pair, timeframe, fingerprint, name,
+                json.dumps(params or {}, sort_keys=True, default=str))
+
+    def _data_key(self, dataframe: pd.DataFrame):
+        return data_fingerprint(dataframe)
+
+    def _file(self, key: tuple) -> Path:
+        digest = hashlib.blake2b(repr(key).encode(), digest_size=16).hexdigest()
+        return self.shared_dir / f"{digest}.npy"
+
+    def _remember(self, key: tuple, values: np.ndarray):
+        if key in self._entries:
+            return
+        self._entries[key] = values
+        self._bytes += values.nbytes
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def lookup(self, key: tuple):
+        """命中返回数组（内存或共享目录），未命中返回 None"""
+        values = self._entries.get(key)
+        if values is not None:
+            self._entries.move_to_end(key)
+            return values
+        if self.shared_dir is not None:
+            path = self._file(key)
+            try:
+                values = np.load(path, mmap_mode='r')
+                os.utime(path)
+            except (FileNotFoundError, ValueError):
+                # 不存在，或刚被其他 worker 淘汰 / 还没写完
+                return None
+            self._remember(key, values)
+            return values
+        return None
+
+    def _disk_usage(self) -> list:
+        """共享目录里的缓存文件 [(mtime, 字节数, 路径), ...]"""
+        files = []
+        for path in self.shared_dir.glob('*.npy'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _evict_disk(self):
+        """共享目录超过 max_disk_bytes 时按 mtime 从旧到新删除，清到预算的 90%"""
+        files = self._disk_usage()
+        self._disk_bytes = sum(size for _, size, _ in files)
+        if self._disk_bytes <= self.max_disk_bytes:
+            return
+        target = self.max_disk_bytes * 0.9
+        for _, size, path in sorted(files, key=lambda f: f[0]):
+            if self._disk_bytes <= target:
+                break
+            try:
+                # 其他 worker 已经映射的文件删除后仍可读，下次查找时才会未命中
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            self._disk_bytes -= size
+
+    def store(self, key: tuple, values) -> np.ndarray:
+        values = np.array(values, dtype=np.float64)
+        values.setflags(write=False)
+        if self.shared_dir is not None:
+            self.shared_dir.mkdir(parents=True, exist_ok=True)
+            path = self._file(key)
+            tmp = path.with_name(f".{path.stem}.{os.getpid()}.npy")
+            np.save(tmp, values)
+            os.replace(tmp, path)
+            if self._disk_bytes is None:
+                self._evict_disk()
+            else:
+                self._disk_bytes += values.nbytes
+                if self._disk_bytes > self.max_disk_bytes:
+                    self._evict_disk()
+        self._remember(key, values)
+        return values
+
+    def get(self, dataframe: pd.DataFrame, pair: str, timeframe: str, name: str,
+            params: dict, compute) -> np.ndarray:
+        """
+        取指标值；未命中时调用 compute(dataframe, **params) 计算并缓存
+
+        name 必须唯一对应一种算法：同样叫 EMA 的 pandas ewm 和 talib 实现要用不同的名字
+        """
+        key = self.make_key(pair, timeframe, self._data_key(dataframe), name, params)
+        values = self.lookup(key)
+        if values is not None:
+            self.hits += 1
+            return values
+        self.misses += 1
+        return self.store(key, compute(dataframe, **(params or {})))
+
+    def series(self, dataframe: pd.DataFrame, pair: str, timeframe: str, name: str,
+               params: dict, compute) -> pd.Series:
+        """get() 的 Series 版本，index 与 dataframe 对齐"""
+        return pd.Series(self.get(dataframe, pair, timeframe, name, params, compute),
+                         index=dataframe.index, name=name)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+
+_default_cache = None
+
+
+def get_indicator_cache() -> IndicatorCache:
+    """进程内共享的默认缓存（hyperopt 每个 worker 进程各一个，靠 shared_dir 互通）"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = IndicatorCache()
+    return _default_cache
+
+
+class IndicatorRegistry(IndicatorCache):
+    """
+    跨策略共享的指标登记表：(pair, timeframe, 末根 K 线时间, 指标名, 参数) → 只读 ndarray
+
+    同一进程里并排运行的多个策略（--strategy-list 回测、MetaStrategy 的子策略）
+    拿到的是同一交易对、同一根 K 线的同一份数据，第一个策略算出来的 EMA / RSI / ATR
+    后面的策略直接复用。键里同时带上行数和首根时间：EMA 这类递归指标依赖起点，
+    startup_candle_count 不同的两份数据不会串用
+
+    与 IndicatorCache 的区别：不哈希价格数据（键是 O(1) 的），按条数和字节数双重限额。
+    前提是同一 (pair, timeframe, K 线范围) 在进程内只对应一份行情——
+    对改动过的数据做实验时请用 IndicatorCache 或先 clear()
+
+    用哪一个：策略里一律用 shared_indicator / 本登记表，固定参数和 hyperopt 参数都一样
+    （参数值在键里）。设置了 FT_INDICATOR_CACHE 时默认登记表以 get_indicator_cache() 为后备：
+    未命中的指标经它按数据指纹计算并落盘，其他 hyperopt worker 直接读盘。
+    IndicatorCache 只在脱离策略、数据可能被改动的研究代码里单独使用
+
+    name 对应 INDICATORS 里的一种具体算法：'ema_ewm' 与 'ema_talib'、
+    'rsi_sma' / 'rsi_wilder' / 'rsi_talib'、'atr_sma' 与 'atr_talib' 数值都不同，不能混用
+
+    Example:
+        registry = get_indicator_registry()
+        dataframe['ema_20'] = registry.get(dataframe, metadata['pair'], self.timeframe,
+                                           'ema_ewm', {'period': 20})
+        # 或者
+        dataframe['atr'] = shared_indicator(dataframe, metadata, self.timeframe, 'atr_talib', period=14)
+    """
+
+    def __init__(self, max_entries: int = 4096, max_bytes: int = 256 * 1024 ** 2,
+                 backing: IndicatorCache = None):
+        super().__init__(max_bytes=max_bytes)
+        self.shared_dir = None
+        self.max_entries = max_entries
+        self.backing = backing
+
+    def _data_key(self, dataframe: pd.DataFrame):
+        return candle_stamp(dataframe)
+
+    def _remember(self, key: tuple, values: np.ndarray):
+        super()._remember(key, values)
+        while len(self._entries) > self.max_entries:
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+
+    def get(self, dataframe: pd.DataFrame, pair: str, timeframe: str, name: str,
+            params: dict = None, compute=None) -> np.ndarray:
+        """取指标值；compute 缺省按 name 从 INDICATORS 里找"""
+        if compute is None:
+            if name not in INDICATORS:
+                raise KeyError(f"未登记的指标 {name!r}，请传入 compute 或加入 INDICATORS")
+            compute = INDICATORS[name]
+        if self.backing is None:
+            return super().get(dataframe, pair, timeframe, name, params, compute)
+
+        key = self.make_key(pair, timeframe, self._data_key(dataframe), name, params)
+        values = self.lookup(key)
+        if values is not None:
+            self.hits += 1
+            return values
+        self.misses += 1
+        values = self.backing.get(dataframe, pair, timeframe, name, params, compute)
+        self._remember(key, values)
+        return values
+
+    def series(self, dataframe: pd.DataFrame, pair: str, timeframe: str, name: str,
+               params: dict = None, compute=None) -> pd.Series:
+        return super().series(dataframe, pair, timeframe, name, params, compute)
+
+
+_default_registry = None
+
+
+def get_indicator_registry() -> IndicatorRegistry:
+    """进程内共享的默认登记表（设置了 FT_INDICATOR_CACHE 时以落盘的默认缓存为后备）"""
+    global _default_registry
+    if _default_registry is None:
+        backing = get_indicator_cache() if os.environ.get('FT_INDICATOR_CACHE') else None
+        _default_registry = IndicatorRegistry(backing=backing)
+    return _default_registry
+
+
+def shared_indicator(dataframe: pd.DataFrame, metadata: dict, timeframe: str,
+                     name: str, **params) -> np.ndarray:
+    """
+    策略里的简写：从默认登记表取 metadata['pair'] 的指标
+
+    Example:
+        dataframe['rsi'] = shared_indicator(dataframe, metadata, self.timeframe, 'rsi_talib', period=14)
+    """
+    return get_indicator_registry().get(dataframe, metadata['pair'], timeframe, name, params)
+
+
+# ----------------------------------------------------------------------
+# 常用指标的计算函数（compute 回调，签名 f(dataframe, **params)）
+# ----------------------------------------------------------------------
+
+def ema_ewm(dataframe: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
+    """pandas ewm(span=period) 版 EMA（从第一根起就有值，与 talib.EMA 不同）"""
+    return dataframe[column].ewm(span=period).mean()
+
+
+def ema_talib(dataframe: pd.DataFrame, period: int) -> np.ndarray:
+    """talib EMA（前 period-1 根为 NaN，以 SMA 作种子）"""
+    import talib.abstract as ta
+    return np.asarray(ta.EMA(dataframe, timeperiod=period), dtype=np.float64)
+
+
+def rsi_sma(dataframe: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
+    """涨跌幅用简单滚动均值平滑的 RSI（Cutler 版）"""
+    delta = dataframe[column].diff()
+    gain = delta.where(delta > 0, 0).rolling(period).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(period).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def rsi_wilder(dataframe: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
+    """Wilder 平滑（ewm alpha=1/period）的 RSI，同 indicator_utils.rsi_from_scratch"""
+    from .indicator_utils import rsi_from_scratch
+    return rsi_from_scratch(dataframe[column], period)
+
+
+def rsi_talib(dataframe: pd.DataFrame, period: int) -> np.ndarray:
+    """talib RSI（Wilder 平滑，以前 period 根的简单均值作种子）"""
+    import talib.abstract as ta
+    return np.asarray(ta.RSI(dataframe, timeperiod=period), dtype=np.float64)
+
+
+def atr_sma(dataframe: pd.DataFrame, period: int) -> pd.Series:
+    """真实波幅的简单滚动均值（手写版 ATR，与 talib 的 Wilder 平滑不同）"""
+    high = dataframe['high']
+    low = dataframe['low']
+    prev_close = dataframe['close'].shift(1)
+    tr = np.maximum(high - low, np.maximum(abs(high - prev_close), abs(low - prev_close)))
+    return tr.rolling(period).mean()
+
+
+def rolling_zscore(dataframe: pd.DataFrame, period: int, column: str = 'close') -> pd.Series:
+    """(close - 滚动均值) / 滚动样本标准差"""
+    price = dataframe[column]
+    return (price - price.rolling(period).mean()) / price.rolling(period).std()
+
+
+def bbands_band(dataframe: pd.DataFrame, period: int, std: float, band: str) -> np.ndarray:
+    """talib BBANDS 的某一条轨（'upperband' / 'middleband' / 'lowerband'）"""
+    import talib.abstract as ta
+    bb = ta.BBANDS(dataframe, timeperiod=period, nbdevup=std, nbdevdn=std)
+    return bb[band].to_numpy()
+
+
+def donchian_upper(dataframe: pd.DataFrame, period: int) -> pd.Series:
+    return dataframe['high'].rolling(period).max()
+
+
+def donchian_lower(dataframe: pd.DataFrame, period: int) -> pd.Series:
+    return dataframe['low'].rolling(period).min()
+
+
+def atr_talib(dataframe: pd.DataFrame, period: int) -> np.ndarray:
+    """talib ATR（Wilder 平滑）"""
+    import talib.abstract as ta
+    return np.asarray(ta.ATR(dataframe, timeperiod=period), dtype=np.float64)
+
+
+def adx_talib(dataframe: pd.DataFrame, period: int) -> np.ndarray:
+    """talib ADX"""
+    import talib.abstract as ta
+    return np.asarray(ta.ADX(dataframe, timeperiod=period), dtype=np.float64)
+
+
+# IndicatorRegistry 按名字查找的计算函数；同名必须是同一种算法
+INDICATORS = {
+    'ema_ewm': ema_ewm,
+    'ema_talib': ema_talib,
+    'rsi_sma': rsi_sma,
+    'rsi_wilder': rsi_wilder,
+    'rsi_talib': rsi_talib,
+    'atr_sma': atr_sma,
+    'atr_talib': atr_talib,
+    'adx_talib': adx_talib,
+    'bbands_band': bbands_band,
+    'rolling_zscore': rolling_zscore,
+    'donchian_upper': donchian_upper,
+    'donchian_lower': donchian_lower,
+}
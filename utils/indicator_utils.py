@@ -2,6 +2,8 @@
 # Source: day06.md - Utility functions
 # Freqtrade 21 天从入门到精通
 
+from collections import deque
+
 import numpy as np
 import talib.abstract as ta
 
@@ -38,29 +40,210 @@ def rsi_from_scratch(close, period=14):
     return rsi
 
 
+def _efficiency_ratio(close: np.ndarray, er_period: int) -> np.ndarray:
+    """效率比 |c_t - c_{t-n}| / Σ|Δc|；前 er_period 根为 NaN，价格完全不动时记为 0"""
+    n = len(close)
+    er = np.full(n, np.nan)
+    if n <= er_period:
+        return er
+    from numpy.lib.stride_tricks import sliding_window_view
+    direction = np.abs(close[er_period:] - close[:-er_period])
+    volatility = sliding_window_view(np.abs(np.diff(close)), er_period).sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        er[er_period:] = np.where(volatility > 0, direction / volatility, 0.0)
+    er[er_period:][np.isnan(volatility) | np.isnan(direction)] = np.nan
+    return er
+
+
+# 块内累乘 D 的下限（对数）：1e-150，drive / D 仍远在 float64 范围内
+_LOG_DECAY_FLOOR = 345.0
+
+
+def _linear_recursion(sc: np.ndarray, x: np.ndarray, seed: float, block: int = 256) -> np.ndarray:
+    """
+    a_t = a_{t-1} + sc_t * (x_t - a_{t-1}) 的分块向量化解
+
+    块内 a_t = D_t * (a_0 + Σ sc_k x_k / D_k)，D_t = Π(1 - sc)。块长按 min(1 - sc) 缩短，
+    保证块内 D 不低于 1e-150（fast_period=2 时 1 - sc ≥ 0.556，256 根也只到 1e-65）；
+    sc 达到或极接近 1（fast_period=1 的强趋势段）时块长不足 8，退回逐根递归。
+    块与块之间只传一个标量
+    """
+    n = len(sc)
+    if n == 0:
+        return np.empty(0)
+    with np.errstate(divide='ignore'):
+        # sc 的浮点误差可能略超过 1，按 0 处理
+        rate = -np.log(max(float(np.min(1.0 - sc)), 0.0))
+    block = int(min(block, _LOG_DECAY_FLOOR / rate)) if rate > 0 else block
+    if block < 8:
+        out = np.empty(n)
+        value = seed
+        for t in range(n):
+            value += sc[t] * (x[t] - value)
+            out[t] = value
+        return out
+
+    pad = (-n) % block
+    keep = np.concatenate([1.0 - sc, np.ones(pad)]).reshape(-1, block)
+    drive = np.concatenate([sc * x, np.zeros(pad)]).reshape(-1, block)
+
+    decay = np.cumprod(keep, axis=1)
+    forced = decay * np.cumsum(drive / decay, axis=1)
+
+    # 每块的起始值依赖上一块的末值：块数只有 n/block，逐块传递标量
+    start = np.empty(len(decay))
+    carry = seed
+    for j in range(len(decay)):
+        start[j] = carry
+        carry = decay[j, -1] * carry + forced[j, -1]
+    return (decay * start[:, None] + forced).ravel()[:n]
+
+
 def kaufman_ama(close, er_period=10, fast_period=2, slow_period=30):
     """
     Kaufman Adaptive Moving Average
     核心思想：市场趋势强时用快均线，震荡时用慢均线
+
+    递归 ama_t = ama_{t-1} + sc_t × (close_t - ama_{t-1}) 用分块累乘/累加整体求解，
+    1M 根 K 线约 0.13s（原来逐根 iloc 的循环约 64s）。
+    前 er_period 根（效率比无定义）输出 NaN，递归从第 er_period-1 根的收盘价起步；
+    收盘价为 NaN 的 K 线输出 NaN，状态保持不变。实盘逐根更新用 KAMAState
     """
-    # 效率比（Efficiency Ratio）
-    direction = abs(close - close.shift(er_period))
-    volatility = close.diff().abs().rolling(er_period).sum()
-    er = direction / volatility
+    index = getattr(close, 'index', None)
+    values = np.asarray(close, dtype=np.float64)
+    n = len(values)
+    ama = np.full(n, np.nan)
 
-    # 自适应平滑系数
-    fast_sc = 2 / (fast_period + 1)
-    slow_sc = 2 / (slow_period + 1)
-    sc = (er * (fast_sc - slow_sc) + slow_sc) ** 2
+    if n > er_period:
+        er = _efficiency_ratio(values, er_period)
 
-    # 递归计算
-    ama = close.copy()
-    for i in range(er_period, len(close)):
-        ama.iloc[i] = ama.iloc[i-1] + sc.iloc[i] * (close.iloc[i] - ama.iloc[i-1])
+        # 自适应平滑系数
+        fast_sc = 2 / (fast_period + 1)
+        slow_sc = 2 / (slow_period + 1)
+        sc = (er * (fast_sc - slow_sc) + slow_sc) ** 2
 
+        tail_sc = sc[er_period:]
+        tail_x = values[er_period:]
+        valid = ~(np.isnan(tail_sc) | np.isnan(tail_x))
+        seed = values[er_period - 1]
+        ama[er_period:] = _linear_recursion(np.where(valid, tail_sc, 0.0),
+                                            np.where(valid, tail_x, 0.0), seed)
+        ama[er_period:][~valid] = np.nan
+
+    if index is not None:
+        import pandas as pd
+        return pd.Series(ama, index=index, name=getattr(close, 'name', None))
     return ama
 
 
+class KAMAState:
+    """
+    KAMA 的逐根增量版本（实盘用）：每根新 K 线 O(er_period)，与 kaufman_ama 批量结果一致
+
+    Example:
+        state = KAMAState.from_history(dataframe['close'])
+        value = state.update(new_close)
+    """
+
+    def __init__(self, er_period=10, fast_period=2, slow_period=30):
+        self.er_period = er_period
+        self.fast_sc = 2 / (fast_period + 1)
+        self.slow_sc = 2 / (slow_period + 1)
+        self.closes = deque(maxlen=er_period + 1)
+        self.value = np.nan
+
+    @classmethod
+    def from_history(cls, close, er_period=10, fast_period=2, slow_period=30) -> "KAMAState":
+        """用历史收盘价批量算一遍，接上最后的状态"""
+        state = cls(er_period, fast_period, slow_period)
+        values = np.asarray(close, dtype=np.float64)
+        ama = np.asarray(kaufman_ama(values, er_period, fast_period, slow_period))
+        state.closes.extend(values[-(er_period + 1):])
+        if len(values) == er_period:
+            state.value = values[-1]
+        elif len(values) > er_period:
+            held = ama[er_period:][~np.isnan(ama[er_period:])]
+            state.value = held[-1] if len(held) else values[er_period - 1]
+        return state
+
+    def update(self, close: float) -> float:
+        """输入一根新收盘价，返回当根 KAMA（预热期为 NaN）"""
+        self.closes.append(close)
+        p = self.er_period
+        if len(self.closes) <= p:
+            if len(self.closes) == p:
+                self.value = close
+            return np.nan
+        if close != close:
+            return np.nan
+
+        window = list(self.closes)
+        direction = abs(window[-1] - window[0])
+        volatility = sum(abs(b - a) for a, b in zip(window[:-1], window[1:]))
+        if volatility != volatility or direction != direction:
+            return np.nan
+        er = direction / volatility if volatility > 0 else 0.0
+        sc = (er * (self.fast_sc - self.slow_sc) + self.slow_sc) ** 2
+        self.value = self.value + sc * (close - self.value)
+        return self.value
+
+
+def _as_matrix(prices):
+    """Series / DataFrame / 1-D / 2-D 输入 → (n × k 的 float 矩阵, 还原函数)"""
+    import pandas as pd
+
+    if isinstance(prices, pd.DataFrame):
+        return prices.to_numpy(dtype=np.float64), \
+            lambda m: pd.DataFrame(m, index=prices.index, columns=prices.columns)
+    if isinstance(prices, pd.Series):
+        return prices.to_numpy(dtype=np.float64)[:, None], \
+            lambda m: pd.Series(m[:, 0], index=prices.index, name=prices.name)
+    values = np.asarray(prices, dtype=np.float64)
+    if values.ndim == 1:
+        return values[:, None], lambda m: m[:, 0]
+    return values, lambda m: m
+
+
+def _hp_banded(lamb: float, weights: np.ndarray) -> np.ndarray:
+    """(W + λ D'D) 的上三角带状存储（solveh_banded 格式，3 × n）"""
+    n = len(weights)
+    # D 的每一行是 [1, -2, 1]；D'D 的各条对角线是每行贡献的叠加（n=3 时主对角线为 [1, 4, 1]）
+    rows = np.ones(n - 2)
+    ab = np.zeros((3, n))
+    ab[2] = weights + lamb * np.convolve(rows, [1.0, 4.0, 1.0])
+    ab[1, 1:] = lamb * np.convolve(rows, [-2.0, -2.0])
+    ab[0, 2:] = lamb * rows
+    return ab
+
+
+def hp_filter(prices, lamb=1600):
+    """
+    双边 HP 趋势：解五对角正定方程 (W + λD'D)τ = Wy，O(n) 时间和内存
+
+    prices 可以是 Series 或 DataFrame（每列一个交易对）；所有列缺失位置相同时
+    一次带状分解解全部列。NaN 的权重记为 0，趋势在缺口处自然插值。
+    注意：双边滤波使用未来数据，只能用于研究，不能直接做信号
+    """
+    from scipy.linalg import solveh_banded
+
+    y, wrap = _as_matrix(prices)
+    n, k = y.shape
+    if n < 3:
+        return wrap(y.copy())
+
+    valid = ~np.isnan(y)
+    trend = np.empty_like(y)
+    # 缺失模式相同的列共用一次分解
+    patterns = {}
+    for j in range(k):
+        patterns.setdefault(valid[:, j].tobytes(), []).append(j)
+    for cols in patterns.values():
+        w = valid[:, cols[0]].astype(np.float64)
+        rhs = np.where(valid[:, cols], y[:, cols], 0.0)
+        trend[:, cols] = solveh_banded(_hp_banded(lamb, w), rhs, check_finite=False)
+    return wrap(trend)
+
+
 def hp_decompose(close, lamb=1600):
     """
     HP 滤波器：把价格分解为趋势 + 周期成分
@@ -70,10 +253,173 @@ def hp_decompose(close, lamb=1600):
     - lamb=1600: 适合季度数据（默认）
     - lamb=129600: 适合月度数据
     对于 15 分钟 K 线，建议 lamb=10000-50000
+
+    双边滤波（有未来函数）；实盘信号请用 hp_one_sided / OneSidedHP
+    """
+    trend = hp_filter(close, lamb)
+    return trend, close - trend
+
+
+class OneSidedHP:
+    """
+    单边（因果）HP 滤波：局部线性趋势模型的 Kalman 滤波
+
+        y_t = τ_t + c_t,          Var(c) = 1
+        τ_t = 2τ_{t-1} - τ_{t-2} + η_t,  Var(η) = 1/λ
+
+    每个时刻的滤波值只用到截至当时的数据（Stock & Watson 的 one-sided HP），
+    每根 K 线 O(1)。NaN 输入按前值处理
+
+    Example:
+        hp = OneSidedHP.from_history(dataframe['close'], lamb=20000)
+        trend = hp.update(new_close)
+    """
+
+    _PRIOR = 1e6
+
+    def __init__(self, lamb=1600):
+        self.lamb = lamb
+        self.q = 1.0 / lamb
+        self.x = None
+        self.P = None
+        self.last_y = np.nan
+
+    def update(self, y: float) -> float:
+        if y != y:
+            y = self.last_y
+            if y != y:
+                return np.nan
+        self.last_y = y
+        if self.x is None:
+            self.x = np.array([y, y])
+            self.P = np.eye(2) * self._PRIOR
+        x, P = self.x, self.P
+        # 预测
+        x = np.array([2 * x[0] - x[1], x[0]])
+        P = _F @ P @ _F.T
+        P[0, 0] += self.q
+        # 更新
+        gain = P[:, 0] / (P[0, 0] + 1.0)
+        x = x + gain * (y - x[0])
+        P = P - np.outer(gain, P[0])
+        self.x, self.P = x, P
+        return x[0]
+
+    @classmethod
+    def from_history(cls, close, lamb=1600) -> "OneSidedHP":
+        """批量滤波历史数据，返回接在最后一根 K 线上的状态"""
+        state = cls(lamb)
+        y = np.asarray(close, dtype=np.float64)
+        _, last = _one_sided_column(y, lamb)
+        if last is not None:
+            state.x, state.P, state.last_y = last
+        return state
+
+
+_F = np.array([[2.0, -1.0], [1.0, 0.0]])
+
+
+def _hp_gains(lamb: float, n: int):
     """
-    from statsmodels.tsa.filters.hp_filter import hpfilter
-    cycle, trend = hpfilter(close, lamb=lamb)
-    return trend, cycle
+    Kalman 增益序列与数据无关，所有交易对共用；收敛后为常数
+
+    Returns:
+        (收敛前的增益列表, 收敛后的协方差)
+    """
+    q = 1.0 / lamb
+    P = np.eye(2) * OneSidedHP._PRIOR
+    gains = []
+    for _ in range(n):
+        P = _F @ P @ _F.T
+        P[0, 0] += q
+        gain = P[:, 0] / (P[0, 0] + 1.0)
+        P = P - np.outer(gain, P[0])
+        if gains and np.allclose(gain, gains[-1], rtol=1e-15, atol=0):
+            break
+        gains.append(gain)
+    return gains, P
+
+
+def _one_sided_block(z: np.ndarray, lamb: float, gains=None):
+    """
+    单边 HP 的核心（z 为 n × k，无 NaN）：前期逐根 Kalman（对所有列向量化），
+    增益收敛后消去第二个状态，转成二阶 IIR 用 lfilter 沿时间轴一次跑完
+
+    Returns:
+        (τ 矩阵, 末状态 x (2 × k), 末协方差)
+    """
+    from scipy.signal import lfilter, lfiltic
+
+    n, k = z.shape
+    if gains is None:
+        gains, P = _hp_gains(lamb, n)
+    else:
+        gains, P = gains
+    m = min(max(len(gains) + 1, 2), n)
+    x = np.vstack([z[0], z[0]])
+    tau = np.empty((n, k))
+    second = np.empty((n, k))
+    for t in range(m):
+        gain = gains[min(t, len(gains) - 1)]
+        x = np.vstack([2 * x[0] - x[1], x[0]])
+        x = x + gain[:, None] * (z[t] - x[0])
+        tau[t], second[t] = x
+
+    if m < n:
+        # 稳态 x_t = A x_{t-1} + K y_t；由 Cayley-Hamilton 得 τ 的 ARMA(2,1) 递推
+        k1, k2 = gains[-1]
+        A = _F - np.outer(gains[-1], _F[0])
+        b = [k1, A[0, 1] * k2 - A[1, 1] * k1]
+        a = [1.0, -np.trace(A), np.linalg.det(A)]
+        zi = np.vstack([lfiltic(b, a, y=[tau[m - 1, j], tau[m - 2, j]], x=[z[m - 1, j]])
+                        for j in range(k)])
+        # 转置成 (k × n) 连续内存，沿最后一维滤波
+        zt = np.ascontiguousarray(z[m:].T)
+        tau_t, _ = lfilter(b, a, zt, axis=-1, zi=zi)
+        tau[m:] = tau_t.T
+        # 第二个状态 x2_t = a21 τ_{t-1} + a22 x2_{t-1} + k2 y_t
+        u = A[1, 0] * np.ascontiguousarray(tau[m - 1:n - 1].T) + k2 * zt
+        second_t, _ = lfilter([1.0], [1.0, -A[1, 1]], u, axis=-1,
+                              zi=(A[1, 1] * second[m - 1])[:, None])
+        second[m:] = second_t.T
+    return tau, np.vstack([tau[-1], second[-1]]), P
+
+
+def _one_sided_column(y: np.ndarray, lamb: float):
+    """单列版本，返回 (趋势, 末状态)，供 OneSidedHP.from_history 接续"""
+    import pandas as pd
+
+    trend = np.full(len(y), np.nan)
+    valid = np.flatnonzero(~np.isnan(y))
+    if len(valid) == 0:
+        return trend, None
+    z = pd.Series(y[valid[0]:]).ffill().to_numpy()[:, None]
+    tau, x, P = _one_sided_block(z, lamb)
+    trend[valid[0]:] = tau[:, 0]
+    return trend, (x[:, 0], P.copy(), z[-1, 0])
+
+
+def hp_one_sided(prices, lamb=1600):
+    """
+    单边 HP 趋势（无未来函数），Series 或 DataFrame（每列一个交易对）
+
+    增益序列与数据无关，只算一次；起点相同的列放在一起，收敛后整段用
+    scipy.signal.lfilter 在 C 里跑完。与 OneSidedHP 逐根更新的结果一致（浮点误差内）。
+    中间的 NaN 按前值处理，开头的 NaN（指标预热期）保持 NaN
+    """
+    import pandas as pd
+
+    y, wrap = _as_matrix(prices)
+    n, k = y.shape
+    trend = np.full_like(y, np.nan)
+    valid = ~np.isnan(y)
+    starts = np.where(valid.any(axis=0), valid.argmax(axis=0), n)
+    gains = _hp_gains(lamb, n) if n else None
+    for start in np.unique(starts[starts < n]):
+        cols = np.flatnonzero(starts == start)
+        z = pd.DataFrame(y[start:, cols]).ffill().to_numpy()
+        trend[start:, cols], _, _ = _one_sided_block(z, lamb, gains)
+    return wrap(trend)
 
 
 def wavelet_denoise(close, wavelet='db4', level=3):
@@ -81,6 +427,7 @@ def wavelet_denoise(close, wavelet='db4', level=3):
     小波去噪：比移动平均更智能的滤波方法
 
     优势：在去噪的同时保留价格的突变特征
+    注意：整段分解，每个点都用到了未来数据；信号请用 RollingWaveletDenoiser
     """
     import pywt
 
@@ -92,3 +439,279 @@ def wavelet_denoise(close, wavelet='db4', level=3):
 
     denoised = pywt.waverec(coeffs, wavelet)
     return denoised[:len(close)]
+
+
+class RollingWaveletDenoiser:
+    """
+    因果滑动窗口小波去噪（实盘可用，多个交易对一次算）
+
+    wavelet_denoise 对整段序列分解，每个点都用到了未来数据。这里每根 K 线只对
+    最近 window 根做分解、阈值化、重构，并且只取重构后的最后一个点：
+    - 分解和重构都是线性的，启动时对单位矩阵做一次 wavedec / waverec，
+      得到"窗口 → 系数"的分析矩阵和"系数 → 最后一个点"的合成权重
+    - 最后一个点只依赖每层靠近窗口末端的少数系数（各层滤波器支撑内的子树），
+      每根 K 线只算这几十个系数：(交易对 × window) 矩阵乘 (window × 系数数)
+    - 阈值（最细一层细节系数的 MAD 估计）要用整层系数，每 refresh 根 K 线才重估一次并缓存
+
+    批量模式 batch() 与逐根 update() 的刷新节奏相同，结果一致，可直接用于回测
+
+    Example:
+        denoiser = RollingWaveletDenoiser(window=256)
+        dataframe['close_dn'] = denoiser.batch(dataframe['close'])
+        # 实盘：每轮把所有交易对的新收盘价一起送进去
+        values = denoiser.update({'BTC/USDT': 43000.0, 'ETH/USDT': 2300.0})
+    """
+
+    def __init__(self, window: int = 256, wavelet: str = 'db4', level: int = 3,
+                 refresh: int = 16, mode: str = 'symmetric'):
+        import pywt
+
+        self.window = window
+        self.refresh = refresh
+        eye = np.eye(window)
+        blocks = pywt.wavedec(eye, wavelet, level=level, mode=mode, axis=1)
+        sizes = [b.shape[1] for b in blocks]
+        analysis = np.hstack(blocks)                      # window × 系数数
+
+        # 每个系数对重构序列最后一个点的贡献
+        n_coef = analysis.shape[1]
+        unit = np.eye(n_coef)
+        splits = np.split(unit, np.cumsum(sizes)[:-1], axis=1)
+        last = pywt.waverec(splits, wavelet, mode=mode, axis=1)[:, window - 1]
+
+        is_detail = np.arange(n_coef) >= sizes[0]
+        support = np.flatnonzero(np.abs(last) > 1e-12)
+        self._rows = np.ascontiguousarray(analysis[:, support])
+        self._weights = last[support]
+        self._detail = is_detail[support]
+        self._finest = np.ascontiguousarray(analysis[:, -sizes[-1]:])
+        self._scale = np.sqrt(2 * np.log(window)) / 0.6745
+
+        self._buffers = {}
+        self._thresholds = {}
+        self._counts = {}
+
+    def thresholds(self, windows: np.ndarray) -> np.ndarray:
+        """每行一个窗口 → 通用阈值 sqrt(2 ln N) × median(|最细细节|) / 0.6745"""
+        finest = windows @ self._finest
+        return self._scale * np.median(np.abs(finest), axis=1)
+
+    def transform(self, windows: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+        """(k × window) 的窗口矩阵 → 每个窗口去噪后的最后一个点"""
+        coef = windows @ self._rows
+        t = thresholds[:, None]
+        shrunk = np.sign(coef) * np.maximum(np.abs(coef) - t, 0.0)
+        coef = np.where(self._detail, shrunk, coef)
+        return coef @ self._weights
+
+    def batch(self, prices, chunk: int = 8192):
+        """
+        Series / DataFrame（每列一个交易对）的因果去噪序列；前 window-1 根为 NaN，
+        含 NaN 的窗口输出 NaN。开头的 NaN（预热期）之后才开始计数
+        """
+        from numpy.lib.stride_tricks import sliding_window_view
+
+        y, wrap = _as_matrix(prices)
+        n, k = y.shape
+        w = self.window
+        out = np.full_like(y, np.nan)
+        for j in range(k):
+            col = y[:, j]
+            valid = np.flatnonzero(~np.isnan(col))
+            if len(valid) == 0 or n - valid[0] < w:
+                continue
+            start = valid[0]
+            windows = sliding_window_view(col[start:], w)
+            # 阈值在第 0, refresh, 2·refresh ... 个窗口上重估，之间沿用
+            at = np.arange(0, len(windows), self.refresh)
+            est = self.thresholds(windows[at])
+            for lo in range(0, len(windows), chunk):
+                hi = min(lo + chunk, len(windows))
+                thr = est[np.arange(lo, hi) // self.refresh]
+                res = self.transform(windows[lo:hi], thr)
+                out[start + w - 1 + lo:start + w - 1 + hi, j] = res
+        return wrap(out)
+
+    def update(self, closes: dict) -> dict:
+        """
+        每个交易对送入一根新收盘价，返回 {pair: 去噪值}（窗口未满的交易对为 NaN）
+
+        所有窗口已满的交易对叠成一个矩阵，一次矩阵乘完成
+        """
+        ready = []
+        for pair, price in closes.items():
+            buf = self._buffers.get(pair)
+            if buf is None:
+                if price != price:
+                    continue
+                buf = self._buffers[pair] = deque(maxlen=self.window)
+            buf.append(price)
+            if len(buf) == self.window:
+                ready.append(pair)
+
+        result = {pair: np.nan for pair in closes}
+        if not ready:
+            return result
+        windows = np.array([self._buffers[p] for p in ready], dtype=np.float64)
+
+        stale = [i for i, p in enumerate(ready) if self._counts.get(p, 0) % self.refresh == 0]
+        if stale:
+            est = self.thresholds(windows[stale])
+            for i, value in zip(stale, est):
+                self._thresholds[ready[i]] = value
+        thr = np.array([self._thresholds[p] for p in ready])
+        values = self.transform(windows, thr)
+        for pair, value in zip(ready, values):
+            self._counts[pair] = self._counts.get(pair, 0) + 1
+            result[pair] = value
+        return result
+
+
+def _cycle_bins(window: int, min_period: float, max_period: float) -> np.ndarray:
+    """周期落在 [min_period, max_period] 内的 DFT 频点 j（周期 = window / j）"""
+    lo = max(1, int(np.ceil(window / max_period)))
+    hi = min(window // 2, int(np.floor(window / min_period)))
+    if lo > hi:
+        raise ValueError(f"window={window} 下没有周期在 [{min_period}, {max_period}] 内的频点")
+    return np.arange(lo, hi + 1)
+
+
+def _dominant_from_power(power: np.ndarray, bins: np.ndarray, window: int):
+    """
+    (m × k) 频谱 → (主导周期, 能量占比)
+
+    主导频点附近做抛物线插值，周期不会只在 window/j 几个离散值之间跳；
+    能量占比 = 主导频点能量 / 跟踪频段总能量
+    """
+    m, k = power.shape
+    idx = np.argmax(power, axis=1)
+    rows = np.arange(m)
+    peak = power[rows, idx]
+    left = power[rows, np.maximum(idx - 1, 0)]
+    right = power[rows, np.minimum(idx + 1, k - 1)]
+    denom = left - 2 * peak + right
+    with np.errstate(invalid='ignore', divide='ignore'):
+        shift = np.where((idx > 0) & (idx < k - 1) & (denom < 0), 0.5 * (left - right) / denom, 0.0)
+        freq = bins[idx] + shift
+        period = window / freq
+        ratio = peak / power.sum(axis=1)
+    flat = ~(power.sum(axis=1) > 0)
+    period[flat] = np.nan
+    ratio[flat] = np.nan
+    return period, ratio
+
+
+def _cycle_gain(bins: np.ndarray, window: int) -> np.ndarray:
+    """一阶差分的功率增益 |2 sin(πj/N)|²：用来把收益率谱还原成价格谱"""
+    return (2 * np.sin(np.pi * bins / window)) ** 2
+
+
+def dominant_cycle(close, window: int = 64, min_period: float = 8, max_period: float = 48,
+                   compensate: bool = True, chunk: int = 16384):
+    """
+    主导周期指标（批量版，回测用）
+
+    对对数收益率的最近 window 根做 DFT，在周期 [min_period, max_period] 的频点里找能量最大者。
+    收益率是价格的一阶差分，会把高频放大 |2 sin(πj/N)|² 倍，compensate=True 时除掉，
+    结果对应价格本身的周期。用 sliding_window_view + rfft 分块批量计算，与 SlidingDFT 逐根结果一致
+
+    Returns:
+        DataFrame（close 为 Series 时）或 dict：
+        dc_period        主导周期（K 线根数）
+        dc_energy_ratio  主导频点能量 / 跟踪频段总能量（越接近 1 周期越清晰）
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    index = getattr(close, 'index', None)
+    values = np.asarray(close, dtype=np.float64)
+    n = len(values)
+    bins = _cycle_bins(window, min_period, max_period)
+    gain = _cycle_gain(bins, window) if compensate else np.ones(len(bins))
+    period = np.full(n, np.nan)
+    ratio = np.full(n, np.nan)
+
+    valid = np.flatnonzero(~np.isnan(values))
+    if len(valid) and n - valid[0] > window:
+        start = valid[0]
+        import pandas as pd
+        logp = np.log(pd.Series(values[start:]).ffill().to_numpy())
+        windows = sliding_window_view(np.diff(logp), window)
+        first = start + window              # 第一个完整窗口对应的 K 线
+        for lo in range(0, len(windows), chunk):
+            hi = min(lo + chunk, len(windows))
+            spectrum = np.fft.rfft(windows[lo:hi], axis=1)[:, bins]
+            power = (spectrum.real ** 2 + spectrum.imag ** 2) / gain
+            period[first + lo:first + hi], ratio[first + lo:first + hi] = \
+                _dominant_from_power(power, bins, window)
+
+    if index is not None:
+        import pandas as pd
+        return pd.DataFrame({'dc_period': period, 'dc_energy_ratio': ratio}, index=index)
+    return {'dc_period': period, 'dc_energy_ratio': ratio}
+
+
+class SlidingDFT:
+    """
+    滑动 DFT 主导周期（实盘逐根版）：每根 K 线 O(k)，k 为跟踪的频点数
+
+        X_j(t) = (X_j(t-1) + x_t - x_{t-N}) · e^{i2πj/N}
+
+    递推会累积舍入误差，每 resync 根用窗口缓存直接重算一次（O(N·k)）。
+    输出与 dominant_cycle 批量版一致
+
+    Example:
+        dft = SlidingDFT(window=64)
+        for close in dataframe['close']:
+            period, ratio = dft.update(close)
+    """
+
+    def __init__(self, window: int = 64, min_period: float = 8, max_period: float = 48,
+                 compensate: bool = True, resync: int = 1024):
+        self.window = window
+        self.bins = _cycle_bins(window, min_period, max_period)
+        self.gain = _cycle_gain(self.bins, window) if compensate else np.ones(len(self.bins))
+        self.twiddle = np.exp(2j * np.pi * self.bins / window)
+        self.resync = resync
+        self.returns = deque(maxlen=window)
+        self.spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+        self.last_log = None
+        self.steps = 0
+
+    def _recompute(self):
+        """直接按定义重算当前窗口的频谱（相位与 rfft 一致）"""
+        x = np.fromiter(self.returns, dtype=np.float64, count=len(self.returns))
+        m = np.arange(len(x))
+        kernel = np.exp(-2j * np.pi * np.outer(m, self.bins) / self.window)
+        self.spectrum = x @ kernel
+
+    def update(self, close: float):
+        """输入一根新收盘价，返回 (主导周期, 能量占比)；窗口未满时为 (NaN, NaN)"""
+        if close != close:
+            if self.last_log is None:
+                return np.nan, np.nan
+            log_close = self.last_log
+        else:
+            log_close = float(np.log(close))
+        if self.last_log is None:
+            self.last_log = log_close
+            return np.nan, np.nan
+        x = log_close - self.last_log
+        self.last_log = log_close
+
+        full = len(self.returns) == self.window
+        oldest = self.returns[0] if full else 0.0
+        self.returns.append(x)
+        if not full:
+            if len(self.returns) < self.window:
+                return np.nan, np.nan
+            self._recompute()
+        else:
+            self.steps += 1
+            if self.steps % self.resync == 0:
+                self._recompute()
+            else:
+                self.spectrum = (self.spectrum + x - oldest) * self.twiddle
+
+        power = (self.spectrum.real ** 2 + self.spectrum.imag ** 2) / self.gain
+        period, ratio = _dominant_from_power(power[None, :], self.bins, self.window)
+        return float(period[0]), float(ratio[0])
@@ -85,3 +85,24 @@ def find_cointegrated_pairs(price_data, significance=0.05):
                 })
 
     return sorted(pairs, key=lambda x: x['p_value'])
+
+
+def scan_cointegrated_pairs(pairs, timeframe, start=None, end=None, significance=0.05,
+                            store=None):
+    """
+    从 OHLCVStore 读收盘价宽表后做协整扫描（多个扫描进程共享同一份内存映射）
+
+    只读取 [start, end) 范围内的页；各交易对按时间对齐后丢掉有缺失的行
+
+    Args:
+        store: OHLCVStore，缺省按 FT_OHLCV_STORE / user_data/ohlcv_store 打开
+
+    Example:
+        pairs = [p for p, _ in OHLCVStore().available('1h')]
+        result = scan_cointegrated_pairs(pairs, '1h', start='2024-01-01')
+    """
+    from .ohlcv_store import OHLCVStore
+
+    store = store or OHLCVStore()
+    prices = store.close_panel(pairs, timeframe, start=start, end=end).dropna()
+    return find_cointegrated_pairs(prices, significance=significance)
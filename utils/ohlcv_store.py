@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+# Source: day04.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import json
+import os
+import shutil
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .data_quality import (OHLCV_COLUMNS, load_ohlcv_file, parse_data_filename,
+                           _is_candle_file)
+
+
+DEFAULT_STORE = "user_data/ohlcv_store"
+
+
+def _pair_key(pair: str) -> str:
+    """'BTC/USDT:USDT' → 'BTC_USDT_USDT'（与 freqtrade 数据文件命名一致）"""
+    return pair.replace('/', '_').replace(':', '_')
+
+
+def _utc_dates(values: np.ndarray):
+    """int64 纳秒 → UTC 日期数组，不复制（view 只换 dtype；不支持时回退，只复制日期这一列）"""
+    naive = values.view('datetime64[ns]')
+    try:
+        return pd.array(naive, copy=False).view(pd.DatetimeTZDtype('ns', 'UTC'))
+    except (AttributeError, TypeError, ValueError):
+        return pd.DatetimeIndex(naive).tz_localize('UTC')
+
+
+class OHLCVStore:
+    """
+    内存映射的列式 K 线存储，多进程共享、零拷贝只读
+
+    每个 (pair, timeframe) 一个目录，每列一个 .npy 文件（date 为 int64 纳秒）：
+        root/BTC_USDT-1h/date.npy, open.npy, ..., volume.npy, meta.json
+
+    读取用 np.load(mmap_mode='r')：所有进程映射同一份页缓存，
+    每个进程的 RSS 只包含实际访问到的页面。批量回测、协整扫描、walk-forward 各折、
+    docker-compose 里的多个机器人（共享 user_data 卷）都可以直接读同一个 store
+
+    写入先写到临时目录再整体 rename，读者永远看不到写了一半的数据
+
+    Example:
+        store = OHLCVStore()
+        store.build_from_datadir("user_data/data/binance", timeframes=['1h'])
+        close = store.column('BTC/USDT', '1h', 'close')           # np.memmap，只读
+        df = store.frame('ETH/USDT', '1h', start='2024-01-01')    # 列直接引用映射内存
+        prices = store.close_panel(['BTC/USDT', 'ETH/USDT'], '1h')
+        find_cointegrated_pairs(prices)
+
+    现成的接入点：mean_revert_utils.scan_cointegrated_pairs（协整扫描）、
+    backtest_utils.store_folds（CPCV / walk-forward 各折）
+    """
+
+    def __init__(self, root: str = None):
+        self.root = Path(root or os.environ.get('FT_OHLCV_STORE', DEFAULT_STORE))
+        self._maps = {}
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def _dir(self, pair: str, timeframe: str) -> Path:
+        return self.root / f"{_pair_key(pair)}-{timeframe}"
+
+    def write(self, pair: str, timeframe: str, dataframe: pd.DataFrame, source: dict = None):
+        """原子地写入（覆盖）一个交易对的完整历史"""
+        target = self._dir(pair, timeframe)
+        tmp = target.with_name(f".{target.name}.tmp{os.getpid()}")
+        shutil.rmtree(tmp, ignore_errors=True)
+        tmp.mkdir(parents=True)
+
+        dates = pd.DatetimeIndex(dataframe['date'])
+        if dates.tz is not None:
+            dates = dates.tz_convert('UTC').tz_localize(None)
+        np.save(tmp / 'date.npy', dates.as_unit('ns').asi8)
+        for col in OHLCV_COLUMNS[1:]:
+            np.save(tmp / f'{col}.npy', dataframe[col].to_numpy(dtype=np.float64))
+        meta = {'pair': pair, 'timeframe': timeframe, 'rows': len(dataframe),
+                'source': source or {}}
+        with open(tmp / 'meta.json', 'w') as fh:
+            json.dump(meta, fh)
+
+        # 旧目录先挪开再换上新目录；已经映射旧文件的进程不受影响（inode 仍有效）
+        old = target.with_name(f".{target.name}.old{os.getpid()}")
+        if target.exists():
+            os.replace(target, old)
+        os.replace(tmp, target)
+        shutil.rmtree(old, ignore_errors=True)
+        self._maps.pop((pair, timeframe), None)
+
+    def build_from_datadir(self, datadir: str = "user_data/data/binance",
+                           timeframes: list = None, pairs: list = None) -> list:
+        """
+        把 freqtrade 数据目录转换进 store；源文件大小和修改时间没变的跳过
+
+        Returns:
+            本次重写的 (pair, timeframe) 列表
+        """
+        written = []
+        for path in sorted(Path(datadir).rglob('*-*.*')):
+            if not path.name.endswith(('.feather', '.parquet', '.json', '.json.gz')):
+                continue
+            if not _is_candle_file(path):
+                continue
+            pair, timeframe = parse_data_filename(path)
+            if (timeframes and timeframe not in timeframes) or (pairs and pair not in pairs):
+                continue
+            stat = path.stat()
+            source = {'file': str(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+            if self.meta(pair, timeframe).get('source') == source:
+                continue
+            self.write(pair, timeframe, load_ohlcv_file(path), source=source)
+            written.append((pair, timeframe))
+        return written
+
+    # ------------------------------------------------------------------
+    # 读取（零拷贝）
+    # ------------------------------------------------------------------
+    def meta(self, pair: str, timeframe: str) -> dict:
+        path = self._dir(pair, timeframe) / 'meta.json'
+        if not path.exists():
+            return {}
+        with open(path) as fh:
+            return json.load(fh)
+
+    def available(self, timeframe: str = None) -> list:
+        """store 里已有的 (pair, timeframe)"""
+        out = []
+        if not self.root.exists():
+            return out
+        for path in sorted(self.root.glob('*/meta.json')):
+            with open(path) as fh:
+                meta = json.load(fh)
+            if timeframe is None or meta['timeframe'] == timeframe:
+                out.append((meta['pair'], meta['timeframe']))
+        return out
+
+    def arrays(self, pair: str, timeframe: str) -> dict:
+        """全部列的只读 memmap（每个进程内缓存映射句柄）"""
+        key = (pair, timeframe)
+        if key not in self._maps:
+            base = self._dir(pair, timeframe)
+            if not (base / 'meta.json').exists():
+                raise KeyError(f"store 中没有 {pair} {timeframe}")
+            self._maps[key] = {col: np.load(base / f'{col}.npy', mmap_mode='r')
+                               for col in OHLCV_COLUMNS}
+        return self._maps[key]
+
+    def _bounds(self, dates: np.ndarray, start, end):
+        lo = 0 if start is None else int(np.searchsorted(dates, _ns(start), side='left'))
+        hi = len(dates) if end is None else int(np.searchsorted(dates, _ns(end), side='left'))
+        return lo, hi
+
+    def column(self, pair: str, timeframe: str, column: str,
+               start=None, end=None) -> np.ndarray:
+        """单列的只读视图，[start, end) 时间范围用二分定位"""
+        maps = self.arrays(pair, timeframe)
+        lo, hi = self._bounds(maps['date'], start, end)
+        return maps[column][lo:hi]
+
+    def frame(self, pair: str, timeframe: str, start=None, end=None,
+              columns: list = None) -> pd.DataFrame:
+        """
+        [start, end) 范围的 DataFrame，列直接引用映射内存
+
+        各列是只读的：df.loc[0, 'close'] = 5 之类的原地修改会抛
+        ValueError: assignment destination is read-only。
+        新增列（df['ema'] = ...）不受影响；需要改原有列请先 .copy()
+        """
+        maps = self.arrays(pair, timeframe)
+        lo, hi = self._bounds(maps['date'], start, end)
+        data = {}
+        for col in columns or OHLCV_COLUMNS:
+            view = maps[col][lo:hi]
+            data[col] = _utc_dates(view) if col == 'date' else view
+        return pd.DataFrame(data, copy=False)
+
+    def close_panel(self, pairs: list, timeframe: str, start=None, end=None,
+                    column: str = 'close') -> pd.DataFrame:
+        """
+        多个交易对按时间对齐成宽表（index=date，列=pair），供协整扫描 / 因子截面使用
+
+        对齐必须产生新数组，但只读取 [start, end) 范围内的页
+        """
+        series = {}
+        for pair in pairs:
+            maps = self.arrays(pair, timeframe)
+            lo, hi = self._bounds(maps['date'], start, end)
+            index = pd.DatetimeIndex(_utc_dates(maps['date'][lo:hi]))
+            series[pair] = pd.Series(maps[column][lo:hi], index=index, copy=False)
+        return pd.DataFrame(series)
+
+
+def _ns(ts) -> np.int64:
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert('UTC').tz_localize(None)
+    return np.int64(ts.as_unit('ns').value)
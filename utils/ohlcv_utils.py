@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+# Source: day04.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+from .data_quality import OHLCV_COLUMNS, timeframe_to_minutes
+
+
+_NS_PER_MINUTE = 60 * 10**9
+FILL_POLICIES = ('ffill', 'interpolate', 'drop')
+
+
+def _to_ns(dates) -> np.ndarray:
+    """日期列 → int64 纳秒（与 pandas 内部分辨率无关）"""
+    return pd.DatetimeIndex(dates).as_unit('ns').asi8
+
+
+def _from_ns(values: np.ndarray, tz) -> pd.DatetimeIndex:
+    index = pd.DatetimeIndex(values.astype('datetime64[ns]'))
+    return index.tz_localize('UTC').tz_convert(tz) if tz is not None else index
+
+
+def infer_timeframe_minutes(dates) -> int:
+    """从 K 线时间戳推断周期：相邻时间差的众数（缺口和重复不影响结果）"""
+    ns = _to_ns(dates)
+    diffs = np.diff(ns)
+    diffs = diffs[diffs > 0]
+    if len(diffs) == 0:
+        raise ValueError("至少需要两根不同时间的 K 线才能推断周期")
+    values, counts = np.unique(diffs, return_counts=True)
+    return int(round(values[np.argmax(counts)] / _NS_PER_MINUTE))
+
+
+def _stack(frames: dict):
+    """多个交易对拼成一组扁平数组 + 每个交易对的起止位置"""
+    pairs = list(frames)
+    lengths = np.array([len(frames[p]) for p in pairs], dtype=np.int64)
+    bounds = np.concatenate([[0], np.cumsum(lengths)])
+    arrays = {'date': np.concatenate([_to_ns(frames[p]['date']) for p in pairs])
+              if pairs else np.empty(0, np.int64)}
+    for col in OHLCV_COLUMNS[1:]:
+        arrays[col] = (np.concatenate([frames[p][col].to_numpy(dtype=np.float64) for p in pairs])
+                       if pairs else np.empty(0))
+    codes = np.repeat(np.arange(len(pairs)), lengths)
+    return pairs, bounds, codes, arrays
+
+
+def _unstack(pairs, bounds, arrays, tz, extra=None) -> dict:
+    out = {}
+    for k, pair in enumerate(pairs):
+        sl = slice(bounds[k], bounds[k + 1])
+        df = pd.DataFrame({col: arrays[col][sl] for col in OHLCV_COLUMNS[1:]})
+        df.insert(0, 'date', _from_ns(arrays['date'][sl], tz))
+        for name, values in (extra or {}).items():
+            df[name] = values[sl]
+        out[pair] = df
+    return out
+
+
+def _frames_tz(frames: dict):
+    for df in frames.values():
+        return pd.DatetimeIndex(df['date']).tz
+    return None
+
+
+def repair_gaps_multi(frames: dict, timeframe_minutes: int = None, policy: str = 'ffill',
+                      max_gap: int = None, flag_column: str = None) -> dict:
+    """
+    把所有交易对一次性对齐到完整的 K 线网格并按策略修补缺口
+
+    全部交易对拼成扁平数组，每根 K 线用 (时间 - 该交易对起点) // 周期 算出它在网格上的位置，
+    网格上的"最近一根真实 K 线"用累计最大值求得，没有任何逐缺口的 Python 循环
+
+    Args:
+        frames: {pair: OHLCV DataFrame}
+        timeframe_minutes: 缺省从第一个交易对的数据推断
+        policy:
+            'ffill'       缺失 K 线 open=high=low=close=前收盘，volume=0（与交易所停牌表现一致）
+            'interpolate' 收盘价按时间线性插值，open=前一根 close，volume=0
+            'drop'        不补，只做排序、去重、对齐网格
+        max_gap: 超过这么多根的缺口不补（保持缺失），None 表示全补
+        flag_column: 给出则增加该布尔列，标记补出来的 K 线
+
+    Returns:
+        {pair: 修补后的 DataFrame}
+
+    说明：不在网格上的时间戳向下取整到网格；同一格子重复的 K 线保留最后一根
+    """
+    if policy not in FILL_POLICIES:
+        raise ValueError(f"policy 必须是 {FILL_POLICIES} 之一，收到 {policy!r}")
+    frames = {p: df for p, df in frames.items() if len(df)}
+    tz = _frames_tz(frames)
+    if timeframe_minutes is None and frames:
+        timeframe_minutes = infer_timeframe_minutes(next(iter(frames.values()))['date'])
+    step = np.int64(timeframe_minutes) * _NS_PER_MINUTE
+
+    pairs, bounds, codes, src = _stack(frames)
+    ns = src['date']
+
+    # 每个交易对在网格上的起点 / 长度
+    pair_start = np.full(len(pairs), np.iinfo(np.int64).max)
+    pair_end = np.full(len(pairs), np.iinfo(np.int64).min)
+    np.minimum.at(pair_start, codes, ns)
+    np.maximum.at(pair_end, codes, ns)
+    pair_start = pair_start // step * step
+    grid_len = (pair_end - pair_start) // step + 1
+    grid_bounds = np.concatenate([[0], np.cumsum(grid_len)])
+
+    # 每根原始 K 线在全局网格上的位置；原顺序里靠后的重复 K 线覆盖靠前的
+    pos = grid_bounds[codes] + (ns - pair_start[codes]) // step
+    total = int(grid_bounds[-1])
+    grid_code = np.repeat(np.arange(len(pairs)), grid_len)
+    grid_ns = pair_start[grid_code] + (np.arange(total) - grid_bounds[grid_code]) * step
+
+    observed = np.zeros(total, dtype=bool)
+    observed[pos] = True
+    out = {'date': grid_ns}
+    for col in OHLCV_COLUMNS[1:]:
+        values = np.full(total, np.nan)
+        values[pos] = src[col]
+        out[col] = values
+
+    missing = ~observed
+    if policy != 'drop' and missing.any():
+        # 每个格子之前 / 之后最近的真实 K 线（每个交易对第一格和最后一格必然是真实的）
+        idx = np.arange(total)
+        prev_obs = np.maximum.accumulate(np.where(observed, idx, -1))
+        next_obs = np.minimum.accumulate(np.where(observed, idx, total)[::-1])[::-1]
+        gap_len = next_obs - prev_obs - 1
+        fill = missing if max_gap is None else missing & (gap_len <= max_gap)
+
+        prev_close = out['close'][prev_obs]
+        if policy == 'ffill':
+            close = prev_close
+            open_ = prev_close
+        else:
+            span = np.maximum(next_obs - prev_obs, 1)
+            delta = out['close'][next_obs] - prev_close
+            close = prev_close + (idx - prev_obs) / span * delta
+            open_ = prev_close + np.maximum(idx - 1 - prev_obs, 0) / span * delta
+        out['close'] = np.where(fill, close, out['close'])
+        out['open'] = np.where(fill, open_, out['open'])
+        out['high'] = np.where(fill, np.maximum(open_, close), out['high'])
+        out['low'] = np.where(fill, np.minimum(open_, close), out['low'])
+        out['volume'] = np.where(fill, 0.0, out['volume'])
+        observed = observed | fill
+    filled = observed & missing
+
+    # 只保留真实或已补的格子
+    keep = np.flatnonzero(observed)
+    new_bounds = np.searchsorted(keep, grid_bounds)
+    result = {col: values[keep] for col, values in out.items()}
+    extra = {flag_column: filled[keep]} if flag_column else None
+    return _unstack(pairs, new_bounds, result, tz, extra)
+
+
+def repair_gaps(dataframe: pd.DataFrame, timeframe_minutes: int = None,
+                policy: str = 'ffill', max_gap: int = None,
+                flag_column: str = None) -> pd.DataFrame:
+    """单个交易对的 repair_gaps_multi"""
+    if len(dataframe) == 0:
+        return dataframe.copy()
+    return repair_gaps_multi({'_': dataframe}, timeframe_minutes, policy,
+                             max_gap, flag_column)['_']
+
+
+def resample_ohlcv_multi(frames: dict, timeframe: str, drop_incomplete: bool = True,
+                         source_minutes: int = None) -> dict:
+    """
+    把低周期 K 线合成高周期（如 1m → 1h / 4h），所有交易对一次完成
+
+    open 取首根、high 取最大、low 取最小、close 取末根、volume 求和；
+    用 (交易对, 目标周期起点) 的变化位置切段后 ufunc.reduceat 聚合
+
+    Args:
+        frames: {pair: OHLCV DataFrame}，每个都需按时间升序
+        timeframe: 目标周期，如 '1h'、'4h'、'1d'
+        drop_incomplete: 丢弃源 K 线不足的桶（首尾的半截 K 线、以及含缺口的桶）
+        source_minutes: 源周期，缺省自动推断（drop_incomplete 需要它）
+
+    说明：桶按 UNIX 纪元对齐（与 freqtrade 的 m/h/d 周期一致）；周线的起点是周四，不是周一
+    """
+    frames = {p: df for p, df in frames.items() if len(df)}
+    tz = _frames_tz(frames)
+    target = np.int64(timeframe_to_minutes(timeframe)) * _NS_PER_MINUTE
+    pairs, bounds, codes, src = _stack(frames)
+    if len(codes) == 0:
+        return {}
+
+    bucket = src['date'] // target
+    starts = np.flatnonzero(np.r_[True, (bucket[1:] != bucket[:-1]) | (codes[1:] != codes[:-1])])
+    ends = np.r_[starts[1:], len(bucket)]
+
+    out = {
+        'date': bucket[starts] * target,
+        'open': src['open'][starts],
+        'high': np.maximum.reduceat(src['high'], starts),
+        'low': np.minimum.reduceat(src['low'], starts),
+        'close': src['close'][ends - 1],
+        'volume': np.add.reduceat(src['volume'], starts),
+    }
+    bucket_code = codes[starts]
+
+    keep = np.ones(len(starts), dtype=bool)
+    if drop_incomplete:
+        if source_minutes is None:
+            source_minutes = infer_timeframe_minutes(next(iter(frames.values()))['date'])
+        expected = target // (np.int64(source_minutes) * _NS_PER_MINUTE)
+        keep = (ends - starts) >= expected
+    out = {col: values[keep] for col, values in out.items()}
+    new_bounds = np.searchsorted(np.flatnonzero(keep), np.searchsorted(bucket_code, np.arange(len(pairs) + 1)))
+    return _unstack(pairs, new_bounds, out, tz)
+
+
+def resample_ohlcv(dataframe: pd.DataFrame, timeframe: str, drop_incomplete: bool = True,
+                   source_minutes: int = None) -> pd.DataFrame:
+    """单个交易对的 resample_ohlcv_multi"""
+    if len(dataframe) == 0:
+        return dataframe.copy()
+    return resample_ohlcv_multi({'_': dataframe}, timeframe, drop_incomplete, source_minutes)['_']
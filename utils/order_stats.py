@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+# Source: day04.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+from collections import deque
+from math import log
+from random import random
+
+
+class _Node:
+    __slots__ = ('value', 'next', 'width')
+
+    def __init__(self, value, next_, width):
+        self.value = value
+        self.next = next_
+        self.width = width
+
+
+class _End:
+    """尾哨兵：比任何有限值都大"""
+    value = float('inf')
+
+
+_NIL = _End()
+
+
+class IndexableSkiplist:
+    """
+    可按下标访问的跳表（R. Hettinger 的经典实现）
+
+    insert / remove / 第 k 小 / 计数（小于某值的个数）都是 O(log n) 期望复杂度，
+    用作滑动窗口的顺序统计结构。只接受有限浮点数
+    """
+
+    def __init__(self, expected_size: int = 100):
+        self.size = 0
+        self.maxlevels = int(1 + log(max(expected_size, 2), 2))
+        self.head = _Node('HEAD', [_NIL] * self.maxlevels, [1] * self.maxlevels)
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, i):
+        node = self.head
+        i += 1
+        for level in reversed(range(self.maxlevels)):
+            while node.width[level] <= i:
+                i -= node.width[level]
+                node = node.next[level]
+        return node.value
+
+    def insert(self, value):
+        chain = [None] * self.maxlevels
+        steps_at_level = [0] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                steps_at_level[level] += node.width[level]
+                node = node.next[level]
+            chain[level] = node
+
+        d = min(self.maxlevels, 1 - int(log(1.0 - random(), 2.0)))
+        newnode = _Node(value, [None] * d, [None] * d)
+        steps = 0
+        for level in range(d):
+            prevnode = chain[level]
+            newnode.next[level] = prevnode.next[level]
+            prevnode.next[level] = newnode
+            newnode.width[level] = prevnode.width[level] - steps
+            prevnode.width[level] = steps + 1
+            steps += steps_at_level[level]
+        for level in range(d, self.maxlevels):
+            chain[level].width[level] += 1
+        self.size += 1
+
+    def remove(self, value):
+        chain = [None] * self.maxlevels
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                node = node.next[level]
+            chain[level] = node
+        if value != chain[0].next[0].value:
+            raise KeyError(f"{value} 不在跳表中")
+
+        d = len(chain[0].next[0].next)
+        for level in range(d):
+            prevnode = chain[level]
+            prevnode.width[level] += prevnode.next[level].width[level] - 1
+            prevnode.next[level] = prevnode.next[level].next[level]
+        for level in range(d, self.maxlevels):
+            chain[level].width[level] -= 1
+        self.size -= 1
+
+    def count_less(self, value) -> int:
+        """严格小于 value 的元素个数"""
+        rank = 0
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value < value:
+                rank += node.width[level]
+                node = node.next[level]
+        return rank
+
+    def count_less_equal(self, value) -> int:
+        """小于等于 value 的元素个数"""
+        rank = 0
+        node = self.head
+        for level in reversed(range(self.maxlevels)):
+            while node.next[level].value <= value:
+                rank += node.width[level]
+                node = node.next[level]
+        return rank
+
+
+class RollingOrderStatistics:
+    """
+    固定长度滑动窗口上的顺序统计（中位数 / 分位数 / MAD / 排名）
+
+    push() 插入新值并淘汰最旧的值，O(log w)；NaN 占位但不参与统计
+    （与 pandas rolling 的口径一致：窗口内有效值个数单独计数）
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.skiplist = IndexableSkiplist(window)
+
+    def __len__(self):
+        """窗口内有效（非 NaN）值的个数"""
+        return len(self.skiplist)
+
+    @property
+    def full(self) -> bool:
+        return len(self.values) == self.window
+
+    def push(self, value: float):
+        """追加一个值；返回被挤出窗口的值（窗口未满时为 None）"""
+        evicted = None
+        if len(self.values) == self.window:
+            evicted = self.values.popleft()
+            if evicted == evicted:
+                self.skiplist.remove(evicted)
+        self.values.append(value)
+        if value == value:
+            self.skiplist.insert(value)
+        return evicted
+
+    def kth(self, k: int) -> float:
+        """第 k 小（0 起）"""
+        return self.skiplist[k]
+
+    def quantile(self, q: float) -> float:
+        """线性插值分位数（pandas 默认的 interpolation='linear'）"""
+        n = len(self.skiplist)
+        if n == 0:
+            return float('nan')
+        pos = q * (n - 1)
+        lo = int(pos)
+        hi = min(lo + 1, n - 1)
+        v_lo = self.skiplist[lo]
+        if hi == lo or pos == lo:
+            return v_lo
+        return v_lo + (pos - lo) * (self.skiplist[hi] - v_lo)
+
+    def median(self) -> float:
+        return self.quantile(0.5)
+
+    def count_within(self, center: float, radius: float) -> int:
+        """窗口内满足 |x - center| < radius 的个数，O(log w)"""
+        return (self.skiplist.count_less(center + radius)
+                - self.skiplist.count_less_equal(center - radius))
+
+    def mad(self) -> float:
+        """
+        中位数绝对偏差 median(|x - median|)，O(log² w)
+
+        中位数左右两侧到中位数的距离各自有序，
+        问题化为"两个有序序列的第 k 小"，用二分 + 跳表下标访问求解
+        """
+        n = len(self.skiplist)
+        if n == 0:
+            return float('nan')
+        m = self.median()
+        sl = self.skiplist
+        p = sl.count_less(m)
+
+        def left(i):
+            return m - sl[p - 1 - i]
+
+        def right(j):
+            return sl[p + j] - m
+
+        lo_k, hi_k = (n - 1) // 2, n // 2
+        a = _kth_of_two(left, p, right, n - p, lo_k)
+        if hi_k == lo_k:
+            return a
+        return (a + _kth_of_two(left, p, right, n - p, hi_k)) / 2
+
+
+def _kth_of_two(get_a, len_a, get_b, len_b, k):
+    """两个升序序列（按下标函数访问）合并后的第 k 小（0 起）"""
+    lo = max(0, k + 1 - len_b)
+    hi = min(k + 1, len_a)
+    while lo < hi:
+        i = (lo + hi) // 2
+        j = k + 1 - i
+        if j > 0 and i < len_a and get_b(j - 1) > get_a(i):
+            lo = i + 1
+        else:
+            hi = i
+    i = lo
+    j = k + 1 - i
+    candidates = []
+    if i > 0:
+        candidates.append(get_a(i - 1))
+    if j > 0:
+        candidates.append(get_b(j - 1))
+    return max(candidates)
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+# Source: day20.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import hashlib
+import json
+import zipfile
+from pathlib import Path
+
+import pandas as pd
+
+
+# 固定列与类型，保证不同版本 freqtrade 的导出落到同一个 schema
+TRADE_COLUMNS = {
+    'pair': 'string', 'open_date': 'datetime64[ns, UTC]', 'close_date': 'datetime64[ns, UTC]',
+    'open_rate': 'float64', 'close_rate': 'float64', 'amount': 'float64',
+    'profit_ratio': 'float64', 'profit_abs': 'float64', 'trade_duration': 'float64',
+    'exit_reason': 'string', 'enter_tag': 'string', 'is_short': 'boolean',
+}
+
+RUN_METRICS = [
+    'total_trades', 'wins', 'losses', 'profit_mean', 'profit_total', 'profit_total_abs',
+    'max_drawdown_account', 'max_relative_drawdown', 'sharpe', 'sortino', 'calmar',
+    'cagr', 'expectancy', 'profit_factor', 'holding_avg_s',
+]
+
+PARTITION_KEYS = ['strategy', 'timerange', 'param_hash']
+
+
+def param_hash(params: dict) -> str:
+    """参数字典的稳定哈希（键排序后 md5 前 12 位）"""
+    payload = json.dumps(params or {}, sort_keys=True, default=str)
+    return hashlib.md5(payload.encode()).hexdigest()[:12]
+
+
+def load_export(path) -> dict:
+    """读取 freqtrade 的回测导出（.json 或新版的 .zip）"""
+    path = Path(path)
+    if path.suffix == '.zip':
+        with zipfile.ZipFile(path) as zf:
+            names = [n for n in zf.namelist()
+                     if n.endswith('.json') and not n.endswith(('_config.json', '.meta.json'))]
+            if not names:
+                raise ValueError(f"{path} 里没有回测结果 JSON")
+            with zf.open(names[0]) as fh:
+                return json.load(fh)
+    with open(path) as fh:
+        return json.load(fh)
+
+
+class BacktestResultsStore:
+    """
+    回测结果列式存储（Parquet，按 strategy / timerange / param_hash 分区）
+
+    目录结构：
+        root/runs/strategy=X/timerange=Y/param_hash=Z/<run_id>.parquet    每次回测一行汇总指标
+        root/trades/strategy=X/timerange=Y/param_hash=Z/<run_id>.parquet  该次回测的全部交易
+
+    导出文件逐个读入、逐个写出，任何时候内存里只有一份导出；
+    查询走 pyarrow.dataset，分区裁剪 + 列裁剪，聚合按 batch 流式累加
+    """
+
+    def __init__(self, root: str = "user_data/backtest_store"):
+        self.root = Path(root)
+        # 已导入的 run_id（第一次导入时扫描 runs/ 得到，之后随写入更新）
+        self._run_ids = None
+
+    # ------------------------------------------------------------------
+    # 写入
+    # ------------------------------------------------------------------
+    def ingest(self, export_path, params: dict = None, timerange: str = None) -> list:
+        """
+        把一个回测导出写入存储
+
+        run_id 只由导出文件路径和策略名决定；已导入过的 run_id 不论在哪个分区都会被跳过，
+        所以 BacktestRunner.run_single 导入过的文件再被 ingest_dir 扫到时不会重复写入
+
+        Args:
+            export_path: freqtrade --export-filename 生成的文件
+            params: 本次回测的参数（用于 param_hash），缺省取导出里的 params
+            timerange: 缺省取导出里的 timerange
+
+        Returns:
+            写入的 run_id 列表（一个导出可能包含多个策略）
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        export_path = Path(export_path)
+        content = load_export(export_path)
+        run_ids = []
+        ingested = self._ingested_run_ids()
+
+        for strategy, stats in content.get('strategy', {}).items():
+            run_id = hashlib.md5(f"{export_path.resolve()}:{strategy}".encode()).hexdigest()[:16]
+            if run_id in ingested:
+                continue
+            run_params = params if params is not None else stats.get('params', {})
+            part = {
+                'strategy': strategy,
+                'timerange': timerange or stats.get('timerange', 'unknown'),
+                'param_hash': param_hash(run_params),
+            }
+            run_file = self._partition_dir('runs', part) / f"{run_id}.parquet"
+
+            trades = pd.DataFrame(stats.get('trades', [])).reindex(columns=list(TRADE_COLUMNS))
+            for col in ('open_date', 'close_date'):
+                trades[col] = pd.to_datetime(trades[col], utc=True)
+            trades = trades.astype(TRADE_COLUMNS)
+            trades.insert(0, 'run_id', run_id)
+
+            run = {'run_id': run_id, 'export_file': str(export_path),
+                   'params': json.dumps(run_params, sort_keys=True, default=str),
+                   'timeframe': stats.get('timeframe'),
+                   'backtest_start': stats.get('backtest_start'),
+                   'backtest_end': stats.get('backtest_end')}
+            run.update({m: pd.to_numeric(stats.get(m), errors='coerce') for m in RUN_METRICS})
+
+            trade_file = self._partition_dir('trades', part) / f"{run_id}.parquet"
+            pq.write_table(pa.Table.from_pandas(trades, preserve_index=False), trade_file)
+            # 汇总行最后写：它的存在代表这次导入已完整完成
+            runs = pd.DataFrame([run]).astype({m: 'float64' for m in RUN_METRICS})
+            pq.write_table(pa.Table.from_pandas(runs, preserve_index=False), run_file)
+            ingested.add(run_id)
+            run_ids.append(run_id)
+
+        return run_ids
+
+    def ingest_dir(self, results_dir: str = "user_data/backtest_results",
+                   pattern=("*.zip", "*.json")) -> list:
+        """
+        导入目录下所有导出：新版 .zip（读其中的结果 JSON）和旧版 .json；
+        跳过 .meta.json 边车文件、.last_result.json 和已导入的
+
+        Args:
+            pattern: glob 模式，一个字符串或若干个
+        """
+        patterns = [pattern] if isinstance(pattern, str) else pattern
+        paths = {path for p in patterns for path in Path(results_dir).glob(p)}
+        run_ids = []
+        for path in sorted(paths):
+            if path.name.endswith('.meta.json') or path.name.startswith('.last_result'):
+                continue
+            run_ids.extend(self.ingest(path))
+        return run_ids
+
+    def _ingested_run_ids(self) -> set:
+        """所有分区里已有汇总行的 run_id"""
+        if self._run_ids is None:
+            pattern = '/'.join(['*'] * len(PARTITION_KEYS) + ['*.parquet'])
+            self._run_ids = {path.stem for path in (self.root / 'runs').glob(pattern)}
+        return self._run_ids
+
+    def _partition_dir(self, table: str, part: dict) -> Path:
+        path = self.root / table
+        for key in PARTITION_KEYS:
+            path = path / f"{key}={part[key]}"
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+    def dataset(self, table: str = 'runs'):
+        """底层 pyarrow Dataset（'runs' 或 'trades'）"""
+        import pyarrow.dataset as ds
+        return ds.dataset(self.root / table, format='parquet', partitioning='hive')
+
+    @staticmethod
+    def _expression(filters):
+        """{'strategy': 'X', 'timerange': ['a', 'b']} → pyarrow 表达式；已是表达式则原样返回"""
+        import pyarrow.dataset as ds
+
+        if filters is None or not isinstance(filters, dict):
+            return filters
+        expr = None
+        for key, value in filters.items():
+            if isinstance(value, (list, tuple, set)):
+                cond = ds.field(key).isin(list(value))
+            else:
+                cond = ds.field(key) == value
+            expr = cond if expr is None else expr & cond
+        return expr
+
+    def query(self, table: str = 'runs', filters=None, columns: list = None) -> pd.DataFrame:
+        """按分区 / 列过滤后读出为 DataFrame（只读需要的文件和列）"""
+        tbl = self.dataset(table).to_table(columns=columns, filter=self._expression(filters))
+        return tbl.to_pandas()
+
+    def aggregate(self, by: list, metrics: dict, table: str = 'runs',
+                  filters=None) -> pd.DataFrame:
+        """
+        流式分组聚合，内存只和分组数有关
+
+        Args:
+            by: 分组列，如 ['strategy', 'param_hash']
+            metrics: {列名: 'mean' | 'sum' | 'count' | 'min' | 'max'}
+
+        Example:
+            store.aggregate(['strategy'], {'sharpe': 'mean', 'profit_total': 'max'})
+            store.aggregate(['param_hash'], {'profit_ratio': 'mean'}, table='trades',
+                            filters={'strategy': 'BollingerMeanRevert'})
+        """
+        partial_ops = {'mean': ('sum', 'count'), 'sum': ('sum',), 'count': ('count',),
+                       'min': ('min',), 'max': ('max',)}
+        combine = {'sum': 'sum', 'count': 'sum', 'min': 'min', 'max': 'max'}
+
+        columns = list(dict.fromkeys(list(by) + list(metrics)))
+        scanner = self.dataset(table).scanner(columns=columns, filter=self._expression(filters))
+
+        spec = {f"{col}__{op}": (col, op)
+                for col, how in metrics.items() for op in partial_ops[how]}
+        folds = {name: combine[op] for name, (_, op) in spec.items()}
+        levels = list(range(len(by)))
+
+        merged = None
+        for batch in scanner.to_batches():
+            if batch.num_rows == 0:
+                continue
+            part = batch.to_pandas().groupby(by, observed=True).agg(**spec)
+            # 每个 batch 的部分结果立即并入累加器
+            merged = part if merged is None else pd.concat([merged, part]).groupby(level=levels).agg(folds)
+
+        if merged is None:
+            return pd.DataFrame(columns=list(by) + list(metrics))
+
+        result = pd.DataFrame(index=merged.index)
+        for col, how in metrics.items():
+            if how == 'mean':
+                result[col] = merged[f"{col}__sum"] / merged[f"{col}__count"]
+            else:
+                result[col] = merged[f"{col}__{how}"]
+        return result.reset_index()
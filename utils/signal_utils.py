@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+# Source: day14.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+
+# 位掩码查表的上限：2^16 项标签表
+MAX_TAG_SIGNALS = 16
+
+
+def tag_table(labels, prefix: str = '', sep: str = '_') -> np.ndarray:
+    """
+    2^k 项的标签表：第 m 项是位掩码 m 中置位的信号标签按顺序拼接
+
+    Example:
+        tag_table(['MR', 'TF', 'BO'], prefix='meta_')
+        # ['meta_', 'meta_MR', 'meta_TF', 'meta_MR_TF', 'meta_BO', ...]
+    """
+    labels = list(labels)
+    if len(labels) > MAX_TAG_SIGNALS:
+        raise ValueError(f"最多 {MAX_TAG_SIGNALS} 个信号列，收到 {len(labels)} 个")
+    table = np.empty(1 << len(labels), dtype=object)
+    for mask in range(len(table)):
+        table[mask] = prefix + sep.join(label for bit, label in enumerate(labels) if mask >> bit & 1)
+    return table
+
+
+def signal_bitmask(dataframe: pd.DataFrame, columns) -> np.ndarray:
+    """多个信号列（> 0 视为触发，NaN 视为未触发）编码成位掩码，第 i 列对应第 i 位"""
+    mask = np.zeros(len(dataframe), dtype=np.int64)
+    for bit, col in enumerate(columns):
+        mask |= (dataframe[col].to_numpy(dtype=np.float64) > 0).astype(np.int64) << bit
+    return mask
+
+
+def compose_tags(dataframe: pd.DataFrame, signals: dict, prefix: str = '',
+                 sep: str = '_') -> pd.Series:
+    """
+    由多个布尔信号列组合 enter_tag / exit_tag，不做逐行循环
+
+    信号列编码成位掩码后查 tag_table，整列一次完成
+
+    Args:
+        signals: {信号列名: 标签}，按插入顺序拼接
+
+    Returns:
+        与 dataframe 同 index 的标签 Series（object）
+
+    Example:
+        tags = compose_tags(dataframe, {'signal_mr': 'MR', 'signal_trend': 'TF'}, prefix='meta_')
+        entry = dataframe['enter_long'] == 1
+        dataframe.loc[entry, 'enter_tag'] = tags[entry]
+    """
+    table = tag_table(signals.values(), prefix=prefix, sep=sep)
+    return pd.Series(table[signal_bitmask(dataframe, signals.keys())],
+                     index=dataframe.index, dtype=object)
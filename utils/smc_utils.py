@@ -0,0 +1,572 @@
+# -*- coding: utf-8 -*-
+# Source: day13.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+from bisect import bisect_left, bisect_right
+from heapq import heappop, heappush
+from math import exp, floor, log, log1p
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .swing_utils import SWING_HIGH, SWING_LOW, swing_events
+
+
+def last_true_index(mask) -> np.ndarray:
+    """
+    每一行之前（含本行）最近一个 True 的位置，没有则为 -1
+
+    np.maximum.accumulate(np.where(mask, 位置, -1))，O(n) 一次算完
+    """
+    mask = np.asarray(mask, dtype=bool)
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+
+def order_blocks(open_, high, low, close, trigger, lookback: int = 10,
+                 side: str = 'bull') -> tuple:
+    """
+    订单块：结构突破（trigger）之前最后一根反向 K 线的高低点
+
+    看涨订单块取 trigger 之前最后一根阴线（close < open），看跌取最后一根阳线。
+    搜索范围是 i-1 往前到 max(i-lookback, 0)+1（与逐行循环
+    range(i-1, max(i-lookback, 0), -1) 一致），范围内没有反向 K 线时不产生订单块
+
+    "最后一根反向 K 线的位置"用 last_true_index 对前一行求得，
+    再判断它是否落在搜索范围内，整段只做几次数组运算
+
+    Args:
+        trigger: 结构突破标记（bull_bos / bear_bos），非零即触发
+        side: 'bull' 或 'bear'
+
+    Returns:
+        (ob_high, ob_low)：触发行上为订单块的高 / 低点，其余为 NaN（需要延续时自行 ffill）
+
+    Example:
+        ob_high, ob_low = order_blocks(df['open'], df['high'], df['low'], df['close'],
+                                       df['bull_bos'], lookback=10, side='bull')
+        df['bull_ob_high'] = pd.Series(ob_high, index=df.index).ffill()
+    """
+    if side not in ('bull', 'bear'):
+        raise ValueError(f"side 必须是 'bull' 或 'bear'，收到 {side!r}")
+    open_ = np.asarray(open_, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    trigger = np.nan_to_num(np.asarray(trigger, dtype=np.float64)) != 0
+    n = len(close)
+
+    opposite = close < open_ if side == 'bull' else close > open_
+    # 第 i 行可用的是 i-1 及之前的反向 K 线
+    last = np.concatenate([[-1], last_true_index(opposite)[:-1]])
+    position = np.arange(n)
+    lower = np.maximum(position - lookback, 0) + 1
+    hit = trigger & (last >= lower)
+
+    ob_high = np.full(n, np.nan)
+    ob_low = np.full(n, np.nan)
+    ob_high[hit] = high[last[hit]]
+    ob_low[hit] = low[last[hit]]
+    return ob_high, ob_low
+
+
+def fvg_zones(high, low, side: str = 'bull', min_gap: float = 0.0) -> dict:
+    """
+    三根 K 线的公允价值缺口（FVG）：第 t 根与第 t-2 根之间没有成交的价格区间
+
+    看涨：low[t] > high[t-2]，区间 [high[t-2], low[t]]；看跌：high[t] < low[t-2]，区间 [high[t], low[t-2]]。
+    缺口在第 t 根收盘时才成立，所以 start = t+1（从下一根起参与触及 / 回补判断）
+
+    Args:
+        min_gap: 最小缺口（相对第 t 根的 low / high），过滤掉太窄的缺口
+
+    Returns:
+        {'start', 'bottom', 'top'}，可直接传给 track_zones / ZoneTracker
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    prev_high = np.concatenate([[np.nan, np.nan], high[:-2]])[:len(high)]
+    prev_low = np.concatenate([[np.nan, np.nan], low[:-2]])[:len(low)]
+    if side == 'bull':
+        bottom, top, ref = prev_high, low, low
+    elif side == 'bear':
+        bottom, top, ref = high, prev_low, high
+    else:
+        raise ValueError(f"side 必须是 'bull' 或 'bear'，收到 {side!r}")
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rows = np.flatnonzero((top > bottom) & ((top - bottom) / ref > min_gap))
+    return {'start': rows + 1, 'bottom': bottom[rows], 'top': top[rows]}
+
+
+# 线段树里未激活叶子的值
+_NEG_INF = float('-inf')
+
+
+def marked_zones(top, bottom, delay: int = 1) -> dict:
+    """
+    把"标记行上有值、其余为 NaN"的区间列（如 order_blocks 的输出）转成区间列表
+
+    Args:
+        delay: 区间从标记行之后第几根开始生效；标记行本身参与定义区间时用 1
+
+    Returns:
+        {'start', 'bottom', 'top'}，可直接传给 track_zones
+    """
+    top = np.asarray(top, dtype=np.float64)
+    bottom = np.asarray(bottom, dtype=np.float64)
+    rows = np.flatnonzero(~np.isnan(top) & ~np.isnan(bottom))
+    return {'start': rows + delay, 'bottom': bottom[rows], 'top': top[rows]}
+
+
+class ZoneIndex:
+    """
+    一组价格区间 [bottom, top] 的静态索引（看涨口径：支撑区，价格从上方回落触及）
+
+    区间按下沿排序后建一棵最大值线段树，叶子存区间上沿（未激活为 -inf）：
+        - 触及：下沿 <= hi 的区间是排序后的一段前缀，前缀里上沿最大的一个 >= lo 即有区间与 [lo, hi] 相交；
+          不相交时它就是 hi 下方最近的区间
+        - 退役：下沿 >= x 的区间是一段后缀，逐个找出第一个激活的区间并置为 -inf
+    激活 / 退役 / 查询都是 O(log z)；区间集合变化时由 ZoneTracker 重建（numpy 向量化建树）
+    """
+
+    def __init__(self, bottom, top, active=True):
+        bottom = np.asarray(bottom, dtype=np.float64)
+        top = np.asarray(top, dtype=np.float64)
+        self.order = np.argsort(bottom, kind='stable')
+        self.bottom = bottom[self.order]
+        self.top = top[self.order]
+        self._bottoms = self.bottom.tolist()
+        self._tops = self.top.tolist()
+        self.rank = np.empty(len(bottom), dtype=np.int64)
+        self.rank[self.order] = np.arange(len(bottom))
+
+        size = 1
+        while size < len(bottom):
+            size *= 2
+        self._size = size
+        flags = np.broadcast_to(np.asarray(active, dtype=bool), (len(bottom),))[self.order]
+        val = np.full(2 * size, -np.inf)
+        arg = np.full(2 * size, -1, dtype=np.int64)
+        val[size:size + len(bottom)] = np.where(flags, self.top, -np.inf)
+        arg[size:size + len(bottom)] = np.arange(len(bottom))
+        width = size
+        while width > 1:
+            lo = width // 2
+            left, right = val[2 * lo:2 * width:2], val[2 * lo + 1:2 * width:2]
+            take = right > left
+            val[lo:width] = np.where(take, right, left)
+            arg[lo:width] = np.where(take, arg[2 * lo + 1:2 * width:2], arg[2 * lo:2 * width:2])
+            width = lo
+        self._val = val.tolist()
+        self._arg = arg.tolist()
+        self.count = int(flags.sum())
+
+    def __len__(self):
+        return len(self._bottoms)
+
+    def _set(self, rank: int, value: float):
+        val, arg = self._val, self._arg
+        node = rank + self._size
+        val[node] = value
+        node >>= 1
+        while node:
+            left, right = 2 * node, 2 * node + 1
+            best = right if val[right] > val[left] else left
+            val[node] = val[best]
+            arg[node] = arg[best]
+            node >>= 1
+
+    def activate(self, rank: int):
+        if self._val[rank + self._size] == _NEG_INF:
+            self._set(rank, self._tops[rank])
+            self.count += 1
+
+    def deactivate(self, rank: int):
+        if self._val[rank + self._size] != _NEG_INF:
+            self._set(rank, _NEG_INF)
+            self.count -= 1
+
+    def is_active(self, rank: int) -> bool:
+        return self._val[rank + self._size] != _NEG_INF
+
+    def touch(self, lo: float, hi: float) -> tuple:
+        """
+        Returns:
+            (是否与 [lo, hi] 相交, 区间名次)：相交时为上沿最高的相交区间，
+            否则为 hi 下方最近的激活区间；没有时名次为 -1
+        """
+        val, arg = self._val, self._arg
+        l, r = self._size, self._size + bisect_right(self._bottoms, hi)
+        best, rank = _NEG_INF, -1
+        while l < r:
+            if l & 1:
+                if val[l] > best:
+                    best, rank = val[l], arg[l]
+                l += 1
+            if r & 1:
+                r -= 1
+                if val[r] > best:
+                    best, rank = val[r], arg[r]
+            l >>= 1
+            r >>= 1
+        return best >= lo, rank
+
+    def _first_active(self, start: int) -> int:
+        """名次 >= start 的第一个激活区间，没有时 -1（从叶子往上找右侧兄弟，再往下找最左）"""
+        val, size = self._val, self._size
+        node = start + size
+        if node >= 2 * size:
+            return -1
+        if val[node] != _NEG_INF:
+            return start
+        while node > 1:
+            if not node & 1 and val[node + 1] != _NEG_INF:
+                node += 1
+                while node < size:
+                    node = 2 * node if val[2 * node] != _NEG_INF else 2 * node + 1
+                return node - size
+            node >>= 1
+        return -1
+
+    def retire(self, threshold: float, inclusive: bool = True) -> list:
+        """退役下沿 >= threshold（inclusive=False 时 > threshold）的激活区间，返回它们的名次"""
+        if threshold != threshold or self.count == 0:
+            return []
+        start = (bisect_left if inclusive else bisect_right)(self._bottoms, threshold)
+        retired = []
+        rank = self._first_active(start)
+        while rank >= 0:
+            self.deactivate(rank)
+            retired.append(rank)
+            rank = self._first_active(rank + 1)
+        return retired
+
+
+def _mirror(side: str, bottom, top, lo, hi, threshold):
+    """看跌区（阻力区）取负号后按看涨口径处理：上下沿互换，触及区间与退役阈值同样取负"""
+    if side == 'bull':
+        return bottom, top, lo, hi, threshold
+    if side == 'bear':
+        return -top, -bottom, -hi, -lo, -threshold
+    raise ValueError(f"side 必须是 'bull' 或 'bear'，收到 {side!r}")
+
+
+def track_zones(start, bottom, top, price_low, price_high, retire,
+                side: str = 'bull', inclusive: bool = True) -> dict:
+    """
+    多区间跟踪（回测批量口径）：记住所有未退役的 FVG / 订单块，而不是只看最近一个
+
+    每根 K 线 t 依次：
+        1. 激活 start == t 的区间
+        2. 触及判断：[price_low[t], price_high[t]] 与任一激活区间相交
+        3. 退役：看涨区下沿 >= retire[t]（inclusive=False 时 >）即退役，
+           看跌区上沿 <= retire[t]（<）即退役
+    每根 K 线 O(log z)，z 为区间总数，几千个未退役区间也不影响速度
+
+    常用口径（看涨）：
+        FVG 回补：price_low=low, price_high=close, retire=low（low 跌到下沿即回补）
+        订单块失效：price_low=low, price_high=close, retire=close, inclusive=False（收盘跌破下沿）
+
+    Args:
+        start / bottom / top: 各区间开始生效的 K 线位置与上下沿（如 fvg_zones 的输出）
+        side: 'bull' 支撑区（价格从上方回落触及）或 'bear' 阻力区（从下方上涨触及）
+
+    Returns:
+        {'in_zone': 0/1, 'zone_top', 'zone_bottom': 相交的区间（看涨取上沿最高的一个）或价格方向上最近的区间，
+         'zone_id': 该区间在输入中的序号（-1 为无）, 'zone_count': 触及判断时的激活区间数}
+
+    Example:
+        fvg = fvg_zones(df['high'], df['low'])
+        out = track_zones(fvg['start'], fvg['bottom'], fvg['top'],
+                          df['low'], df['close'], df['low'])
+        df['in_fvg'] = out['in_zone']
+    """
+    start = np.asarray(start, dtype=np.int64)
+    price_low = np.asarray(price_low, dtype=np.float64)
+    price_high = np.asarray(price_high, dtype=np.float64)
+    n = len(price_low)
+    bottom, top, lo, hi, threshold = _mirror(
+        side, np.asarray(bottom, dtype=np.float64), np.asarray(top, dtype=np.float64),
+        price_low, price_high, np.asarray(retire, dtype=np.float64))
+
+    index = ZoneIndex(bottom, top, active=False)
+    ranks = index.rank[np.argsort(start, kind='stable')].tolist()
+    starts = np.sort(start, kind='stable').tolist()
+
+    in_zone = np.zeros(n, dtype=np.int8)
+    zone_rank = np.full(n, -1, dtype=np.int64)
+    zone_count = np.zeros(n, dtype=np.int64)
+    lo_list, hi_list, th_list = lo.tolist(), hi.tolist(), threshold.tolist()
+    k = 0
+    for t in range(n):
+        while k < len(starts) and starts[k] <= t:
+            index.activate(ranks[k])
+            k += 1
+        if index.count == 0:
+            continue
+        zone_count[t] = index.count
+        if lo_list[t] == lo_list[t] and hi_list[t] == hi_list[t]:
+            hit, rank = index.touch(lo_list[t], hi_list[t])
+            in_zone[t] = hit
+            zone_rank[t] = rank
+        index.retire(th_list[t], inclusive)
+
+    found = zone_rank >= 0
+    zone_bottom = np.full(n, np.nan)
+    zone_top = np.full(n, np.nan)
+    zone_bottom[found] = index.bottom[zone_rank[found]]
+    zone_top[found] = index.top[zone_rank[found]]
+    if side == 'bear':
+        zone_bottom, zone_top = -zone_top, -zone_bottom
+    zone_id = np.full(n, -1, dtype=np.int64)
+    zone_id[found] = index.order[zone_rank[found]]
+    return {'in_zone': in_zone, 'zone_top': zone_top, 'zone_bottom': zone_bottom,
+            'zone_id': zone_id, 'zone_count': zone_count}
+
+
+class ZoneTracker:
+    """
+    多区间跟踪（实盘逐根口径），与 track_zones 逐根一致
+
+    新区间先放进一个小的待合并列表（线性扫描），攒满 buffer 个后连同仍然有效的区间
+    一起重建 ZoneIndex（numpy 建树，O(z)，按 buffer 摊薄）；已退役的区间在重建时丢弃，
+    索引大小只跟未退役区间数有关
+
+    Example:
+        tracker = ZoneTracker(side='bull')
+        tracker.add(bottom, top)                  # 在区间开始生效的那根 K 线之前加入
+        state = tracker.update(low, close, low)   # 每根新 K 线调用一次
+        if state['in_zone']:
+            ...
+    """
+
+    def __init__(self, side: str = 'bull', inclusive: bool = True, buffer: int = 32):
+        _mirror(side, 0.0, 0.0, 0.0, 0.0, 0.0)
+        self.side = side
+        self.inclusive = inclusive
+        self.buffer = buffer
+        self.reset()
+
+    def reset(self):
+        self._index = ZoneIndex([], [])
+        self._ids = np.empty(0, dtype=np.int64)
+        self._pending = []
+        self.next_id = 0
+
+    def __len__(self):
+        return self._index.count + len(self._pending)
+
+    def add(self, bottom: float, top: float) -> int:
+        """加入一个区间，返回区间编号（从 0 递增）"""
+        bottom, top, _, _, _ = _mirror(self.side, bottom, top, 0.0, 0.0, 0.0)
+        zone_id = self.next_id
+        self.next_id += 1
+        self._pending.append((bottom, top, zone_id))
+        if len(self._pending) >= self.buffer:
+            self._rebuild()
+        return zone_id
+
+    def _rebuild(self):
+        index = self._index
+        keep = [rank for rank in range(len(index)) if index.is_active(rank)]
+        bottom = np.concatenate([index.bottom[keep], [z[0] for z in self._pending]])
+        top = np.concatenate([index.top[keep], [z[1] for z in self._pending]])
+        ids = np.concatenate([self._ids[index.order[keep]],
+                              np.array([z[2] for z in self._pending], dtype=np.int64)])
+        self._index = ZoneIndex(bottom, top)
+        self._ids = ids.astype(np.int64)
+        self._pending = []
+
+    def _retire_pending(self, threshold: float):
+        if threshold == threshold:
+            self._pending = [z for z in self._pending
+                             if not (z[0] >= threshold if self.inclusive else z[0] > threshold)]
+
+    def update(self, price_low: float, price_high: float, retire: float) -> dict:
+        """
+        处理一根 K 线：先判断触及，再按 retire 退役区间
+
+        Returns:
+            {'in_zone', 'zone_top', 'zone_bottom', 'zone_id', 'zone_count'}，口径同 track_zones
+        """
+        _, _, lo, hi, threshold = _mirror(self.side, 0.0, 0.0, float(price_low),
+                                          float(price_high), float(retire))
+        index = self._index
+        count = len(self)
+        if lo != lo or hi != hi:
+            index.retire(threshold, self.inclusive)
+            self._retire_pending(threshold)
+            return {'in_zone': 0, 'zone_top': np.nan, 'zone_bottom': np.nan,
+                    'zone_id': -1, 'zone_count': count}
+        hit, rank = index.touch(lo, hi)
+        best = (index.top[rank], index.bottom[rank], int(self._ids[index.order[rank]])) \
+            if rank >= 0 else (-np.inf, np.nan, -1)
+        # 待合并的区间线性比较：先比是否相交，再比上沿
+        for bottom, top, zone_id in self._pending:
+            if bottom > hi:
+                continue
+            pending_hit = top >= lo
+            if (pending_hit, top) > (hit, best[0]):
+                hit, best = pending_hit, (top, bottom, zone_id)
+
+        index.retire(threshold, self.inclusive)
+        self._retire_pending(threshold)
+
+        top, bottom, zone_id = best
+        if zone_id < 0:
+            top = np.nan
+        elif self.side == 'bear':
+            bottom, top = -top, -bottom
+        return {'in_zone': int(hit and zone_id >= 0), 'zone_top': top, 'zone_bottom': bottom,
+                'zone_id': zone_id, 'zone_count': count}
+
+
+class _Pool:
+    __slots__ = ('kind', 'key', 'anchor', 'threshold', 'touches', 'last', 'alive')
+
+    def __init__(self, kind, key, anchor, threshold, index):
+        self.kind = kind
+        self.key = key
+        self.anchor = anchor
+        self.threshold = threshold
+        self.touches = 1
+        self.last = index
+        self.alive = True
+
+
+class LiquidityPools:
+    """
+    流动性池（等高点 / 等低点）的增量维护
+
+    摆动高（低）点按对数价格量化到宽度为 log(1+tolerance) 的桶里，哈希表以 (类型, 桶号) 为键：
+    新摆动点只需查本桶和相邻两个桶（与池的锚定价相差不超过 tolerance 即加入该池，触及次数 +1），
+    否则新建一个池，O(1)；不必把每个新摆动点与所有历史摆动点两两比较（O(s²)）
+
+    价格越过池的容差带（高点池：high > 锚定价·(1+tolerance)，低点池对称）即视为流动性被扫掉，池退役。
+    未退役的高点池都在价格上方、低点池都在下方，"最近的池"用两个堆按阈值维护，惰性删除已退役的池
+
+    Example:
+        pools = LiquidityPools(tolerance=0.001, min_touches=2)
+        pools.sweep(high, low)                         # 每根 K 线先处理扫单
+        pools.add_swing(SWING_HIGH, price, index)      # 再加入本根确认的摆动点
+        above, above_touches, below, below_touches = pools.nearest()
+    """
+
+    def __init__(self, tolerance: float = 0.001, min_touches: int = 2):
+        if tolerance <= 0:
+            raise ValueError(f"tolerance 必须为正数，收到 {tolerance}")
+        self.tolerance = tolerance
+        self.width = log1p(tolerance)
+        self.min_touches = min_touches
+        self.reset()
+
+    def reset(self):
+        self._buckets = {}
+        # 全部池（用于扫单）与达到 min_touches 的池（用于最近池查询），高点池按阈值小顶堆，低点池取负
+        self._all = {SWING_HIGH: [], SWING_LOW: []}
+        self._ready = {SWING_HIGH: [], SWING_LOW: []}
+        self._seq = 0
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def _push(self, heap: list, pool: _Pool):
+        self._seq += 1
+        heappush(heap, (pool.threshold * pool.kind, self._seq, pool))
+
+    def add_swing(self, kind: int, price: float, index: int = -1) -> Optional[_Pool]:
+        """
+        加入一个确认的摆动点（kind 为 SWING_HIGH / SWING_LOW），返回它所在的池
+
+        价格非正（分桶取不了对数）时忽略，返回 None
+        """
+        if not price > 0:
+            return None
+        position = log(price) / self.width
+        key = floor(position)
+        for probe in (key, key - 1, key + 1):
+            pool = self._buckets.get((kind, probe))
+            if pool is not None and abs(position - log(pool.anchor) / self.width) <= 1.0:
+                pool.touches += 1
+                pool.last = index
+                if pool.touches == self.min_touches:
+                    self._push(self._ready[kind], pool)
+                return pool
+
+        pool = _Pool(kind, key, price, price * exp(self.width * kind), index)
+        self._buckets[(kind, key)] = pool
+        self._push(self._all[kind], pool)
+        if self.min_touches <= 1:
+            self._push(self._ready[kind], pool)
+        return pool
+
+    def sweep(self, high: float, low: float) -> list:
+        """价格越过容差带的池退役（被扫掉），返回本根 K 线扫掉的、达到 min_touches 的池"""
+        swept = []
+        for kind, price in ((SWING_HIGH, high), (SWING_LOW, low)):
+            if price != price:
+                continue
+            heap = self._all[kind]
+            while heap and heap[0][0] < price * kind:
+                pool = heappop(heap)[2]
+                pool.alive = False
+                del self._buckets[(kind, pool.key)]
+                if pool.touches >= self.min_touches:
+                    swept.append(pool)
+        return swept
+
+    def _top(self, kind: int):
+        heap = self._ready[kind]
+        while heap and not heap[0][2].alive:
+            heappop(heap)
+        return heap[0][2] if heap else None
+
+    def nearest(self) -> tuple:
+        """(上方最近的等高点池价格, 触及次数, 下方最近的等低点池价格, 触及次数)，没有时为 NaN / 0"""
+        out = []
+        for kind in (SWING_HIGH, SWING_LOW):
+            pool = self._top(kind)
+            out += [pool.anchor, pool.touches] if pool is not None else [np.nan, 0]
+        return tuple(out)
+
+
+def liquidity_pools(high, low, left: int = 2, right: int = None, strict: bool = True,
+                    tolerance: float = 0.001, min_touches: int = 2) -> pd.DataFrame:
+    """
+    逐根 K 线的最近流动性池（回测批量口径，与逐根调用 LiquidityPools 一致）
+
+    摆动点用 swing_events（在确认 K 线上才加入），每根 K 线先处理扫单再加入新摆动点，
+    输出的是该根 K 线收盘后已知的池
+
+    Returns:
+        DataFrame(columns=['liq_above', 'liq_above_touches', 'liq_below', 'liq_below_touches',
+                           'liq_swept_above', 'liq_swept_below'])，
+        index 与 high 相同；liq_swept_* 为本根 K 线扫掉的等高 / 等低点池个数
+    """
+    index = high.index if isinstance(high, pd.Series) else None
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    events = swing_events(high, low, left, right, strict)
+    pools = LiquidityPools(tolerance, min_touches)
+
+    out = np.full((n, 4), np.nan)
+    swept = np.zeros((n, 2), dtype=np.int64)
+    confirm = events['index'].tolist()
+    kinds = events['kind'].tolist()
+    prices = events['price'].tolist()
+    high_list, low_list = high.tolist(), low.tolist()
+    k = 0
+    for t in range(n):
+        for pool in pools.sweep(high_list[t], low_list[t]):
+            swept[t, 0 if pool.kind == SWING_HIGH else 1] += 1
+        while k < len(confirm) and confirm[k] == t:
+            pools.add_swing(kinds[k], prices[k], t)
+            k += 1
+        out[t] = pools.nearest()
+
+    return pd.DataFrame({
+        'liq_above': out[:, 0], 'liq_above_touches': out[:, 1].astype(np.int64),
+        'liq_below': out[:, 2], 'liq_below_touches': out[:, 3].astype(np.int64),
+        'liq_swept_above': swept[:, 0], 'liq_swept_below': swept[:, 1],
+    }, index=index)
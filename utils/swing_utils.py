@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+# Source: day13.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+
+SWING_HIGH = 1
+SWING_LOW = -1
+
+EVENT_FIELDS = ('index', 'pivot', 'price', 'kind')
+
+
+def _pivot_rows(values: np.ndarray, left: int, right: int, strict: bool) -> np.ndarray:
+    """
+    每个完整窗口 [p-left, p+right] 的中心是否为窗口最大值
+
+    返回长度 n-left-right 的布尔数组，第 r 个对应枢轴 p = r+left（确认 K 线 r+left+right）。
+    窗口内有 NaN 时不算摆动点（与 rolling().apply 和 shift 比较的口径一致）
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+    width = left + right + 1
+    if len(values) < width:
+        return np.zeros(0, dtype=bool)
+    windows = sliding_window_view(values, width)
+    center = windows[:, left]
+    others = np.maximum(windows[:, :left].max(axis=1), windows[:, left + 1:].max(axis=1))
+    with np.errstate(invalid='ignore'):
+        return (center > others) if strict else (center >= others)
+
+
+def _check_sides(left: int, right):
+    right = left if right is None else right
+    if left < 1 or right < 1:
+        raise ValueError(f"left / right 至少为 1，收到 left={left}, right={right}")
+    return left, right
+
+
+def swing_events(high, low, left: int = 2, right: int = None, strict: bool = True) -> dict:
+    """
+    摆动高低点的稀疏事件（按确认 K 线排序）
+
+    枢轴 K 线 p 的 high 是 [p-left, p+right] 内的最大值即为摆动高点（低点同理取最小值），
+    要等到右侧 right 根 K 线走完才能确认，所以事件记在确认 K 线 p+right 上，
+    在任何一根 K 线上都只用到了当时已经收盘的数据
+
+    Args:
+        left / right: 枢轴左右两侧的 K 线数，right 缺省等于 left
+        strict: True 要求严格大于（小于）两侧所有 K 线；False 允许与两侧持平
+
+    Returns:
+        {'index': 确认 K 线位置, 'pivot': 枢轴 K 线位置,
+         'price': 枢轴价格, 'kind': SWING_HIGH(1) / SWING_LOW(-1)}，各为 ndarray
+
+    Example:
+        events = swing_events(df['high'], df['low'], left=5, strict=False)
+        highs = events['price'][events['kind'] == SWING_HIGH]
+    """
+    left, right = _check_sides(left, right)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    lag = left + right
+
+    parts = []
+    for kind, values in ((SWING_HIGH, high), (SWING_LOW, -low)):
+        rows = np.flatnonzero(_pivot_rows(values, left, right, strict))
+        parts.append((rows + lag, rows + left, kind * values[rows + left],
+                      np.full(len(rows), kind, dtype=np.int8)))
+
+    index = np.concatenate([p[0] for p in parts])
+    order = np.argsort(index, kind='stable')
+    return {field: np.concatenate([p[k] for p in parts])[order]
+            for k, field in enumerate(EVENT_FIELDS)}
+
+
+def swing_points(high, low, left: int = 2, right: int = None, strict: bool = True) -> pd.DataFrame:
+    """
+    摆动高低点的稠密列：确认 K 线上为枢轴价格，其余为 NaN
+
+    口径见 swing_events。ffill() 之后即"截至当前已确认的最近摆动高 / 低点"
+
+    Returns:
+        DataFrame(columns=['swing_high', 'swing_low'])，index 与 high 相同（ndarray 输入时为 RangeIndex）
+    """
+    index = high.index if isinstance(high, pd.Series) else None
+    n = len(high)
+    events = swing_events(high, low, left, right, strict)
+    out = {}
+    for name, kind in (('swing_high', SWING_HIGH), ('swing_low', SWING_LOW)):
+        column = np.full(n, np.nan)
+        hit = events['kind'] == kind
+        column[events['index'][hit]] = events['price'][hit]
+        out[name] = column
+    return pd.DataFrame(out, index=index)
+
+
+def zigzag(events: dict) -> dict:
+    """
+    把摆动事件整理成高低交替的折线：连续同向的点只保留最极端的一个（持平时保留较早的）
+
+    注意：同向点里较早的一个被后面更极端的点替换，是事后才知道的；
+    折线只适合做结构统计和画图，生成信号请直接用 swing_events / swing_points
+
+    Returns:
+        与 swing_events 相同结构的事件字典
+    """
+    kind = events['kind']
+    price = events['price']
+    keep = []
+    for i in range(len(kind)):
+        if keep and kind[keep[-1]] == kind[i]:
+            last = keep[-1]
+            better = price[i] > price[last] if kind[i] == SWING_HIGH else price[i] < price[last]
+            if better:
+                keep[-1] = i
+        else:
+            keep.append(i)
+    keep = np.asarray(keep, dtype=np.int64)
+    return {field: events[field][keep] for field in EVENT_FIELDS}
+
+
+class SwingTracker:
+    """
+    逐根（或逐批）K 线更新的摆动点检测（实盘用），与 swing_events 逐个事件一致
+
+    只保留最近 left+right 根的 high / low，新数据到来时与缓冲拼接后只检查
+    以新 K 线为确认 K 线的窗口，每根 K 线 O(left+right)
+
+    Example:
+        tracker = SwingTracker(left=2)
+        tracker.update(history['high'], history['low'])      # 预热
+        events = tracker.update(high, low)                  # 新 K 线上确认的摆动点
+        if len(events['index']):
+            ...
+    """
+
+    def __init__(self, left: int = 2, right: int = None, strict: bool = True):
+        self.left, self.right = _check_sides(left, right)
+        self.strict = strict
+        self.reset()
+
+    def reset(self):
+        self._high = np.empty(0)
+        self._low = np.empty(0)
+        self.bars = 0
+
+    def update(self, high, low) -> dict:
+        """
+        追加 K 线（标量或数组），返回其中确认的摆动事件；
+        index / pivot 是自第一根 K 线起的绝对位置
+        """
+        high = np.atleast_1d(np.asarray(high, dtype=np.float64))
+        low = np.atleast_1d(np.asarray(low, dtype=np.float64))
+        ext_high = np.concatenate([self._high, high])
+        ext_low = np.concatenate([self._low, low])
+        start = self.bars - len(self._high)
+
+        events = swing_events(ext_high, ext_low, self.left, self.right, self.strict)
+        events['index'] += start
+        events['pivot'] += start
+
+        keep = self.left + self.right
+        self._high = ext_high[max(len(ext_high) - keep, 0):]
+        self._low = ext_low[max(len(ext_low) - keep, 0):]
+        self.bars += len(high)
+        return events
@@ -13,15 +13,27 @@ from datetime import datetime
 class BacktestRunner:
     """批量回测运行器"""
 
-    def __init__(self, config_path: str, data_dir: str = "user_data/data"):
+    def __init__(self, config_path: str, data_dir: str = "user_data/data",
+                 results_store=None):
+        """
+        Args:
+            results_store: 可选的 BacktestResultsStore，回测成功后自动导入导出文件
+        """
         self.config_path = config_path
         self.data_dir = data_dir
         self.results_dir = "user_data/backtest_results"
+        self.results_store = results_store
         os.makedirs(self.results_dir, exist_ok=True)
 
     def run_single(self, strategy: str, timerange: str,
-                   extra_args: list = None) -> dict:
-        """运行单个策略回测"""
+                   extra_args: list = None, params: dict = None) -> dict:
+        """
+        运行单个策略回测
+
+        Args:
+            params: 只用于结果存储的 param_hash；缺省时和 ingest_dir 一样取导出里的
+                    params / timerange，同一导出经两条路径导入落到同一分区
+        """
         cmd = [
             "freqtrade", "backtesting",
             "--config", self.config_path,
@@ -36,6 +48,11 @@ class BacktestRunner:
 
         result = subprocess.run(cmd, capture_output=True, text=True)
 
+        if result.returncode == 0 and self.results_store is not None:
+            export = self._latest_export(strategy, timerange)
+            if export is not None:
+                self.results_store.ingest(export, params=params)
+
         return {
             'strategy': strategy,
             'timerange': timerange,
@@ -44,6 +61,12 @@ class BacktestRunner:
             'stderr': result.stderr
         }
 
+    def _latest_export(self, strategy: str, timerange: str):
+        """freqtrade 可能在导出文件名后追加时间戳，取最新的一个"""
+        candidates = [p for p in Path(self.results_dir).glob(f"{strategy}_{timerange}*")
+                      if not p.name.endswith('.meta.json')]
+        return max(candidates, key=lambda p: p.stat().st_mtime) if candidates else None
+
     def run_batch(self, strategies: list, timerange: str) -> list:
         """批量回测多个策略"""
         results = []
@@ -101,37 +124,26 @@ def deflated_sharpe_ratio(observed_sharpe: float,
                           n_trials: int,
                           n_observations: int,
                           skewness: float = 0,
-                          kurtosis: float = 3) -> dict:
+                          kurtosis: float = 3,
+                          sharpe_variance: float = 1.0) -> dict:
     """
     Deflated Sharpe Ratio (Bailey & López de Prado, 2014)
 
     校正多重比较偏差：你试了 100 个策略，最好的那个 Sharpe 可能只是运气
+    计算委托给 backtest_utils（同一套公式）；sharpe_variance 是各试验夏普的方差，
+    批量评估全部试验请用 backtest_utils.evaluate_trials
     """
-    from scipy.stats import norm
-
-    euler_mascheroni = 0.5772
-    expected_max_sharpe = (
-        (1 - euler_mascheroni) * norm.ppf(1 - 1 / n_trials) +
-        euler_mascheroni * norm.ppf(1 - (n_trials * np.e))
-    )
-
-    sharpe_se = np.sqrt(
-        (1 + 0.5 * observed_sharpe**2 -
-         skewness * observed_sharpe +
-         (kurtosis - 3) / 4 * observed_sharpe**2) /
-        (n_observations - 1)
-    )
-
-    if sharpe_se > 0:
-        dsr = norm.cdf((observed_sharpe - expected_max_sharpe) / sharpe_se)
-    else:
-        dsr = 0
+    from .backtest_utils import expected_max_sharpe, probabilistic_sharpe_ratio
+
+    expected_max = float(expected_max_sharpe(n_trials, sharpe_variance))
+    dsr = float(probabilistic_sharpe_ratio(observed_sharpe, expected_max,
+                                           n_observations, skewness, kurtosis))
 
     return {
         'observed_sharpe': observed_sharpe,
-        'expected_max_sharpe': expected_max_sharpe,
+        'expected_max_sharpe': expected_max,
         'dsr': dsr,
         'is_significant': dsr > 0.95,
         'n_trials': n_trials,
-        'sharpe_haircut': observed_sharpe - expected_max_sharpe
+        'sharpe_haircut': observed_sharpe - expected_max
     }
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+# Source: day05.md - Utility functions
+# Freqtrade 21 天从入门到精通
+
+import numpy as np
+import pandas as pd
+
+
+class VectorBacktester:
+    """
+    进程内向量化回测（用于大批量策略筛选）
+
+    输入 populate_entry_trend / populate_exit_trend 之后的 dataframe，
+    按 freqtrade 的回测规则用数组运算模拟单个交易对：
+    - 信号 K 线收盘确认，下一根 K 线开盘入场 / 出场；最后一根 K 线不入场，
+      数据结束时仍未平仓的按最后一根 K 线的开盘价 force_exit
+    - 持仓中的每根 K 线按 freqtrade should_exit 的顺序判断：
+      出场信号（以开盘价成交，freqtrade 假设信号在开盘触发，优先于止损）→ 止损 → ROI → 追踪止损；
+      即止损已被追踪上调过时，同一根 K 线上 ROI 先于它成交
+    - 止损先用当根 high 上调（追踪止损），再用当根 low 判断触发；
+      上调比例和 trailing_only_offset_is_reached 的门槛都按当根 high 的收益（含手续费）计算，
+      没有设置 trailing_stop_positive 时也遵守 offset 门槛
+    - ROI 按当根 high 的收益（含手续费）严格大于该档 ROI 时触发；成交价与 freqtrade 相同：
+      新一档 ROI 在开盘生效且开盘价更高时按开盘价，否则按 ROI 价格并截在当根 high / low 之内
+    - 止损位高于当根 high（跳空）时按开盘价成交；入场 K 线上触发追踪止损时按 freqtrade 的最坏情况估价
+    - 出场信号与入场信号在同一根 K 线上同时出现时，出场信号不生效、也不入场；
+      平仓后下一根 K 线才能再入场
+
+    与 freqtrade 回测的差异（筛选够用，定稿前仍需跑一遍 freqtrade）：
+    - 不支持 custom_stoploss / custom_exit / custom_roi / custom_stake_amount / 仓位调整、
+      exit_profit_only、ignore_roi_if_entry_signal
+    - 只模拟单交易对、单仓位，不考虑 max_open_trades 和资金占用
+    - 价格不按交易所精度取整
+    在上述功能都不用的策略上，交易的开平仓 K 线和平仓原因应与 freqtrade 一致，
+    单笔 profit_ratio 的误差在 1e-6 量级（来自价格精度处理）
+    """
+
+    def __init__(self, minimal_roi: dict = None, stoploss: float = -0.10,
+                 trailing_stop: bool = False, trailing_stop_positive: float = None,
+                 trailing_stop_positive_offset: float = 0.0,
+                 trailing_only_offset_is_reached: bool = False,
+                 fee: float = 0.001, use_exit_signal: bool = True):
+        roi = minimal_roi if minimal_roi else {"0": 10.0}
+        # 哨兵：第一档之前（如只有 {"60": 0.01} 时的前 60 分钟）没有 ROI，记为 +inf
+        items = [(-np.inf, np.inf)] + sorted((int(k), float(v)) for k, v in roi.items())
+        self.roi_minutes = np.array([k for k, _ in items], dtype=np.float64)
+        self.roi_values = np.array([v for _, v in items], dtype=np.float64)
+        self.stoploss = stoploss
+        self.trailing_stop = trailing_stop
+        self.trailing_stop_positive = trailing_stop_positive
+        self.trailing_stop_positive_offset = trailing_stop_positive_offset or 0.0
+        self.trailing_only_offset_is_reached = trailing_only_offset_is_reached
+        self.fee = fee
+        self.use_exit_signal = use_exit_signal
+
+    @classmethod
+    def from_strategy(cls, strategy, fee: float = 0.001) -> "VectorBacktester":
+        """读取策略类/实例上的 minimal_roi、stoploss 和追踪止损设置"""
+        return cls(
+            minimal_roi=getattr(strategy, 'minimal_roi', None),
+            stoploss=getattr(strategy, 'stoploss', -0.10),
+            trailing_stop=getattr(strategy, 'trailing_stop', False),
+            trailing_stop_positive=getattr(strategy, 'trailing_stop_positive', None),
+            trailing_stop_positive_offset=getattr(strategy, 'trailing_stop_positive_offset', 0.0),
+            trailing_only_offset_is_reached=getattr(strategy, 'trailing_only_offset_is_reached', False),
+            fee=fee,
+            use_exit_signal=getattr(strategy, 'use_exit_signal', True),
+        )
+
+    def run(self, dataframe: pd.DataFrame, pair: str = "") -> dict:
+        """
+        Returns:
+            {'trades': DataFrame, 'equity': Series（按 date 索引的净值，初始 1.0）}
+        """
+        n = len(dataframe)
+        dates = pd.DatetimeIndex(dataframe['date'])
+        minutes = np.asarray((dates - dates[0]) / pd.Timedelta(minutes=1)) if n else np.empty(0)
+        open_ = dataframe['open'].to_numpy(dtype=np.float64)
+        high = dataframe['high'].to_numpy(dtype=np.float64)
+        low = dataframe['low'].to_numpy(dtype=np.float64)
+
+        enter = self._signal(dataframe, 'enter_long')
+        exit_ = self._signal(dataframe, 'exit_long') if self.use_exit_signal else np.zeros(n, bool)
+        tags = (dataframe['enter_tag'].to_numpy(dtype=object)
+                if 'enter_tag' in dataframe.columns else np.full(n, None, dtype=object))
+        exit_tags = (dataframe['exit_tag'].to_numpy(dtype=object)
+                     if 'exit_tag' in dataframe.columns else np.full(n, None, dtype=object))
+
+        # 信号在 i 收盘确认 → i+1 开盘成交；同时有入场信号的那根 K 线上出场信号不生效
+        entry_candles = np.flatnonzero(enter[:-1] & ~exit_[:-1]) + 1
+        entry_candles = entry_candles[entry_candles < n - 1]
+        exit_candles = np.flatnonzero(exit_[:-1] & ~enter[:-1]) + 1
+
+        # 先对每个候选入场并行求出"如果在这里入场会在哪里平仓"，再按时间串起不重叠的交易
+        exit_at, exit_rate, exit_reason = self._resolve_exits(
+            entry_candles, exit_candles, minutes, open_, high, low)
+
+        taken = []
+        cursor = 0
+        while True:
+            k = np.searchsorted(entry_candles, cursor)
+            if k >= len(entry_candles):
+                break
+            taken.append(k)
+            cursor = exit_at[k] + 1
+
+        taken = np.asarray(taken, dtype=np.int64)
+        i = entry_candles[taken]
+        j = exit_at[taken]
+        open_rate = open_[i]
+        close_rate = exit_rate[taken]
+        # 和 freqtrade 一样，出场信号带 exit_tag 时以它作为平仓原因
+        reason = exit_reason[taken]
+        tag = exit_tags[np.maximum(j - 1, 0)]
+        tagged = (reason == 'exit_signal') & np.array([isinstance(t, str) and t != '' for t in tag], dtype=bool)
+        reason[tagged] = tag[tagged]
+        trades = pd.DataFrame({
+            'pair': pair,
+            'open_date': dates[i],
+            'close_date': dates[j],
+            'open_rate': open_rate,
+            'close_rate': close_rate,
+            'profit_ratio': (close_rate * (1 - self.fee)) / (open_rate * (1 + self.fee)) - 1,
+            'exit_reason': reason,
+            'enter_tag': tags[i - 1],
+            'trade_duration': (minutes[j] - minutes[i]).astype(np.int64),
+        })
+
+        equity = np.ones(n)
+        if len(trades):
+            growth = np.ones(n)
+            np.multiply.at(growth, j, 1 + trades['profit_ratio'].to_numpy())
+            equity = np.cumprod(growth)
+
+        return {'trades': trades, 'equity': pd.Series(equity, index=dates, name='equity')}
+
+    @staticmethod
+    def _signal(dataframe: pd.DataFrame, column: str) -> np.ndarray:
+        if column not in dataframe.columns:
+            return np.zeros(len(dataframe), dtype=bool)
+        return dataframe[column].fillna(0).to_numpy() == 1
+
+    def _resolve_exits(self, entries, exit_candles, minutes, open_, high, low):
+        """
+        对所有候选入场 K 线同时求平仓点：每轮取 (候选数 × chunk) 的价格窗口，
+        未触发的候选进入下一轮并把窗口加倍
+
+        Returns:
+            (平仓 K 线, 平仓价, 原因) 三个与 entries 等长的数组
+        """
+        n = len(open_)
+        m = len(entries)
+        fee = self.fee
+        exit_at = np.zeros(m, dtype=np.int64)
+        exit_rate = np.zeros(m)
+        exit_reason = np.empty(m, dtype=object)
+        if m == 0:
+            return exit_at, exit_rate, exit_reason
+
+        open_rate = open_[entries]
+        initial_stop = open_rate * (1 - abs(self.stoploss))
+        # 下一个出场信号成交的 K 线：之前的 K 线才需要检查止损 / ROI（信号 K 线上信号优先）
+        k = np.searchsorted(exit_candles, entries + 1)
+        # 没有任何出场信号（或 use_exit_signal=False）时 exit_candles 为空，不能按 k 取值
+        padded = np.append(exit_candles, n)
+        signal_at = padded[k]
+        limit = np.minimum(signal_at, n)
+
+        rows = np.arange(m)
+        offset = np.zeros(m, dtype=np.int64)
+        stop_prev = initial_stop.copy()
+        chunk = 16
+        sl_offset = self.trailing_stop_positive_offset
+
+        while len(rows):
+            ent = entries[rows][:, None]
+            orate = open_rate[rows][:, None]
+            idx = ent + offset[rows][:, None] + np.arange(chunk)[None, :]
+            valid = idx < limit[rows][:, None]
+            idx = np.minimum(idx, n - 1)
+            h = high[idx]
+
+            # 止损位：追踪止损按当根 high 上调，只升不降
+            stop = np.broadcast_to(stop_prev[rows][:, None], h.shape)
+            pct = np.full(h.shape, abs(self.stoploss))
+            if self.trailing_stop:
+                high_profit = h * (1 - fee) / (orate * (1 + fee)) - 1
+                if self.trailing_stop_positive is not None:
+                    pct = np.where(high_profit > sl_offset, self.trailing_stop_positive, pct)
+                candidate = h * (1 - pct)
+                if self.trailing_only_offset_is_reached:
+                    candidate = np.where(high_profit < sl_offset, -np.inf, candidate)
+                stop = np.maximum.accumulate(np.maximum(candidate, stop), axis=1)
+            stop_hit = (low[idx] <= stop) & valid
+            trailing = stop > initial_stop[rows][:, None]
+
+            # ROI：按持仓分钟数查表，当根 high 的收益（含手续费）严格大于 ROI 才触发
+            dur = minutes[idx] - minutes[ent]
+            step = np.searchsorted(self.roi_minutes, dur, side='right') - 1
+            roi = self.roi_values[step]
+            roi_rate = orate * (1 + fee) * (1 + roi) / (1 - fee)
+            roi_hit = (h > roi_rate) & valid
+
+            hit = stop_hit | roi_hit
+            any_hit = hit.any(axis=1)
+            p = np.argmax(hit, axis=1)
+            r = np.arange(len(rows))
+            j = idx[r, p]
+            done = rows[any_hit]
+            jd = j[any_hit]
+            # 普通止损先于 ROI；追踪过的止损排在 ROI 之后
+            is_stop = (stop_hit & ~(roi_hit & trailing))[r, p][any_hit]
+            is_trailing = trailing[r, p][any_hit]
+            entry_bar = jd == entries[done]
+            stop_p = stop[r, p][any_hit]
+            roi_p = roi_rate[r, p][any_hit]
+            exit_at[done] = jd
+            exit_rate[done] = np.where(is_stop,
+                                       self._stop_rate(stop_p, pct[r, p][any_hit], entry_bar & is_trailing,
+                                                       open_[jd], high[jd], low[jd]),
+                                       self._roi_rate(roi_p, roi[r, p][any_hit], dur[r, p][any_hit],
+                                                      self.roi_minutes[step[r, p][any_hit]],
+                                                      open_[jd], high[jd], low[jd]))
+            exit_reason[done] = np.where(
+                is_stop,
+                np.where(is_trailing, 'trailing_stop_loss', 'stop_loss'),
+                'roi',
+            )
+
+            # 窗口已覆盖到出场信号 / 数据末尾仍未触发
+            exhausted = ~any_hit & ~valid[:, -1]
+            sig = rows[exhausted]
+            by_signal = signal_at[sig] < n
+            exit_at[sig] = np.where(by_signal, signal_at[sig], n - 1)
+            exit_rate[sig] = open_[np.minimum(signal_at[sig], n - 1)]
+            exit_reason[sig] = np.where(by_signal, 'exit_signal', 'force_exit')
+
+            keep = ~any_hit & ~exhausted
+            stop_prev[rows[keep]] = stop[keep, -1]
+            offset[rows[keep]] += chunk
+            rows = rows[keep]
+            chunk *= 2
+
+        return exit_at, exit_rate, exit_reason
+
+    def _stop_rate(self, stop, pct, trailing_on_entry, open_, high, low):
+        """止损成交价（freqtrade _get_close_rate_for_stoploss）"""
+        if (self.trailing_only_offset_is_reached and self.trailing_stop_positive
+                and self.trailing_stop_positive_offset is not None):
+            # 入场 K 线上的追踪止损：最坏情况是刚涨到 offset 就回落到止损
+            worst = open_ * (1 + self.trailing_stop_positive_offset - abs(self.trailing_stop_positive))
+        else:
+            worst = open_ * (1 - pct)
+        rate = np.where(trailing_on_entry, np.maximum(low, worst), stop)
+        return np.where(stop > high, open_, rate)
+
+    @staticmethod
+    def _roi_rate(rate, roi, dur, roi_entry, open_, high, low):
+        """ROI 成交价（freqtrade _get_close_rate_for_roi）"""
+        # 新一档 ROI 在这根 K 线开盘生效、开盘价已高于 ROI 价格：按开盘价
+        new_step = (dur > 0) & (dur == roi_entry) & (open_ > rate)
+        rate = np.where(new_step | (roi == -1), open_, np.minimum(np.maximum(rate, low), high))
+        return rate
+
+
+def run_vector_backtest(strategy, dataframe: pd.DataFrame, pair: str,
+                        fee: float = 0.001) -> dict:
+    """
+    用策略自身的 populate_* 产生信号，再做向量化回测
+
+    Args:
+        strategy: 已实例化的 IStrategy（只用到 populate_* 和风控属性）
+        dataframe: 原始 OHLCV
+    """
+    metadata = {'pair': pair}
+    df = strategy.populate_indicators(dataframe.copy(), metadata)
+    df = strategy.populate_entry_trend(df, metadata)
+    df = strategy.populate_exit_trend(df, metadata)
+    return VectorBacktester.from_strategy(strategy, fee=fee).run(df, pair)